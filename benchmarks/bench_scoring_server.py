@@ -0,0 +1,124 @@
+"""Load generator for src/scoring_server.py.
+
+Starts the scoring server on a temporary Unix socket, then for each
+concurrency level runs that many clients, each sending requests of
+`--batch` records back to back for `--seconds`. Reports client-side
+p50/p99 latency and records/s per level, plus the server's own stats
+(mean coalesced batch size shows how much request batching happened).
+
+Records are synthetic KDD lines drawn from the fixed vocabularies, so the
+benchmark needs only a trained artifact, not the dataset.
+
+Usage:
+    python benchmarks/bench_scoring_server.py --model models/kdd_classifier.npz
+    python benchmarks/bench_scoring_server.py --batch 32 --concurrency 1 8 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+SRC = os.path.join(os.path.dirname(__file__), '..', 'src')
+sys.path.insert(0, SRC)
+from kdd_features import COLUMNS, NUMERIC_COLUMNS, VOCABULARIES
+from kdd_model import DEFAULT_MODEL_PATH
+
+def make_record_lines(n, seed=0):
+    """`n` synthetic raw KDD lines (bytes, newline-terminated)."""
+    rng = np.random.default_rng(seed)
+    records = pd.DataFrame({col: rng.integers(0, 100, n) for col in NUMERIC_COLUMNS})
+    for col, vocab in VOCABULARIES.items():
+        records[col] = np.asarray(vocab)[rng.integers(0, len(vocab), n)]
+    text = records[COLUMNS].to_csv(header=False, index=False)
+    return [line.encode() + b'\n' for line in text.splitlines()]
+
+async def request(reader, writer, payload):
+    writer.write(payload)
+    await writer.drain()
+    lines = []
+    while True:
+        line = await reader.readline()
+        if not line.strip():
+            return lines
+        lines.append(line)
+
+async def client(path, lines, batch, until, latencies, seed):
+    reader, writer = await asyncio.open_unix_connection(path, limit=2 ** 20)
+    rng = np.random.default_rng(seed)
+    sent = 0
+    while time.perf_counter() < until:
+        start = int(rng.integers(0, len(lines) - batch))
+        payload = b''.join(lines[start:start + batch]) + b'\n'
+        t0 = time.perf_counter()
+        reply = await request(reader, writer, payload)
+        latencies.append(time.perf_counter() - t0)
+        if len(reply) != batch:
+            raise RuntimeError(f"Expected {batch} scores, got {reply[:3]}...")
+        sent += batch
+    writer.close()
+    return sent
+
+async def run_level(path, lines, batch, concurrency, seconds):
+    latencies = []
+    t0 = time.perf_counter()
+    sent = await asyncio.gather(*[client(path, lines, batch, t0 + seconds, latencies, seed)
+                                  for seed in range(concurrency)])
+    elapsed = time.perf_counter() - t0
+    lat = np.array(latencies) * 1000
+    return sum(sent) / elapsed, np.percentile(lat, 50), np.percentile(lat, 99)
+
+async def server_stats(path):
+    reader, writer = await asyncio.open_unix_connection(path)
+    reply = await request(reader, writer, b'#stats\n\n')
+    writer.close()
+    return json.loads(reply[0])
+
+def wait_for_socket(path, proc, timeout=30):
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(path):
+        if proc.poll() is not None or time.monotonic() > deadline:
+            raise RuntimeError('Scoring server did not start')
+        time.sleep(0.05)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH)
+    parser.add_argument('--batch', type=int, default=16, help='Records per client request')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16, 64])
+    parser.add_argument('--seconds', type=float, default=5.0, help='Duration of each concurrency level')
+    parser.add_argument('--max-batch', type=int, default=4096)
+    parser.add_argument('--linger-ms', type=float, default=2.0)
+    args = parser.parse_args()
+
+    lines = make_record_lines(max(100_000, args.batch * 10))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'score.sock')
+        proc = subprocess.Popen([sys.executable, os.path.join(SRC, 'scoring_server.py'), '--model', args.model,
+                                 '--unix', path, '--max-batch', str(args.max_batch),
+                                 '--linger-ms', str(args.linger_ms), '--stats-interval', '3600'],
+                                stderr=subprocess.DEVNULL)
+        try:
+            wait_for_socket(path, proc)
+            print(f"{args.batch} records per request, {args.seconds:g} s per level, "
+                  f"max batch {args.max_batch}, linger {args.linger_ms:g} ms")
+            print(f"{'clients':>8} {'records/s':>11} {'p50 ms':>8} {'p99 ms':>8}")
+            for concurrency in args.concurrency:
+                rate, p50, p99 = asyncio.run(run_level(path, lines, args.batch, concurrency, args.seconds))
+                print(f"{concurrency:>8} {rate:>11,.0f} {p50:>8.2f} {p99:>8.2f}")
+            stats = asyncio.run(server_stats(path))
+            print(f"Server: {stats['records']:,} records in {stats['batches']:,} model calls "
+                  f"(mean batch {stats['mean_batch']}), latency p50 {stats['latency_ms_p50']} ms, "
+                  f"p99 {stats['latency_ms_p99']} ms")
+        finally:
+            proc.terminate()
+            proc.wait()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+"""Benchmark suite for the threat finder and the classifier, with regression checks.
+
+Times each benchmark at several data sizes and compares the results with
+a baseline recorded on the same machine (benchmarks/baseline.json by
+default, not under version control): a benchmark more than `--tolerance`
+and more than MIN_REGRESSION_SECONDS slower than its baseline is flagged
+as a REGRESSION and makes the suite exit with status 1. Record the
+baseline with --save-baseline before making changes.
+
+Each time is the median of `--repeat` samples taken after a warm-up call;
+fast benchmarks are called in a loop so that every sample lasts at least
+MIN_SAMPLE_SECONDS, which keeps millisecond timings out of the timer and
+scheduler noise. Sizes of 5M rows and more are timed with a single run.
+
+Finder benchmarks run on logs from task2/src/log_generator.py (parsing on
+the same logs written as CSV); classifier benchmarks on the first N rows of
+the cached KDD dataset (src/kdd_cache.py) and are skipped when it is not
+available.
+
+Usage:
+    python benchmarks/suite.py --save-baseline # record this machine's baseline
+    python benchmarks/suite.py                 # compare with it
+    python benchmarks/suite.py --quick         # small sizes only
+    python benchmarks/suite.py --only finder_detect --sizes 1000000
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.join(ROOT, 'task2', 'src'))
+from log_generator import generate_logs, write_logs
+from threat_detection import ThreatDetector, default_rules, threat_table, top_threats
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+FINDER_SIZES = [100_000, 1_000_000, 10_000_000]
+CLASSIFIER_SIZES = [50_000, 200_000, 494_021]
+QUICK_SIZES = {'finder': [100_000, 1_000_000], 'classifier': [50_000]}
+SINGLE_RUN_SIZE = 5_000_000
+MIN_SAMPLE_SECONDS = 0.2
+# Slowdowns below this are noise on a shared machine, whatever their ratio
+MIN_REGRESSION_SECONDS = 0.01
+
+def finder_cases(size, workdir):
+    """(name, setup, run) for the finder benchmarks at one size; setup results are shared."""
+    state = {}
+
+    def logs():
+        if 'logs' not in state:
+            state['logs'] = generate_logs(size, n_ips=max(size // 100, 1000), seed=1)
+        return state['logs']
+
+    def csv_path():
+        path = os.path.join(workdir, f'logs_{size}.csv')
+        if not os.path.exists(path):
+            write_logs(logs(), path)
+        return path
+
+    fixed, sliding = ThreatDetector(default_rules()), ThreatDetector(default_rules(), sliding=True)
+    return [
+        ('finder_parse', csv_path, lambda path: pd.read_csv(path, parse_dates=['timestamp'])),
+        ('finder_detect', logs, fixed.detect),
+        ('finder_detect_sliding', logs, sliding.detect),
+        ('finder_report', lambda: fixed.detect(logs()), lambda result: top_threats(threat_table(result), 10)),
+    ]
+
+def classifier_cases(size, dataset):
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import StandardScaler
+
+    state = {}
+
+    def train_data():
+        X, y = dataset.X[:size], np.asarray(dataset.y[:size])
+        return StandardScaler(with_mean=False).fit_transform(X), y
+
+    def fit(data):
+        state['model'] = LogisticRegression(max_iter=1000, random_state=42).fit(*data)
+
+    def fitted():
+        if 'model' not in state:
+            fit(train_data())
+        return train_data()[0]
+
+    return [
+        ('classifier_train', train_data, fit),
+        ('classifier_predict', fitted, lambda X: state['model'].predict(X)),
+    ]
+
+def time_case(setup, run, repeat):
+    """Median seconds per call over `repeat` samples (a single timed call if `repeat` is 1)."""
+    arg = setup()
+    t0 = time.perf_counter()
+    run(arg)
+    first = time.perf_counter() - t0
+    if repeat == 1:
+        return first
+    # The first call was the warm-up; it also sizes the loop of each sample
+    loops = max(1, int(MIN_SAMPLE_SECONDS / max(first, 1e-6)))
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            run(arg)
+        samples.append((time.perf_counter() - t0) / loops)
+    return float(np.median(samples))
+
+def machine_info():
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+            'cpus': os.cpu_count(), 'machine': platform.machine(), 'system': platform.system()}
+
+def compare(results, baseline, tolerance):
+    """Print current vs baseline times; returns the list of regressed (name, size)."""
+    regressions = []
+    print(f"{'benchmark':<24} {'rows':>11} {'seconds':>9} {'baseline':>9} {'ratio':>7}")
+    for name, sizes in results.items():
+        for size, seconds in sizes.items():
+            base = baseline.get(name, {}).get(size)
+            if base is None:
+                print(f"{name:<24} {int(size):>11,} {seconds:>9.4f} {'-':>9} {'':>7}  (no baseline)")
+                continue
+            ratio = seconds / base
+            flag = ''
+            if ratio > 1 + tolerance and seconds - base > MIN_REGRESSION_SECONDS:
+                flag = '  REGRESSION'
+                regressions.append((name, size))
+            elif ratio < 1 - tolerance and base - seconds > MIN_REGRESSION_SECONDS:
+                flag = '  faster'
+            print(f"{name:<24} {int(size):>11,} {seconds:>9.4f} {base:>9.4f} {ratio:>7.2f}{flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--quick', action='store_true', help='Small sizes only')
+    parser.add_argument('--sizes', type=int, nargs='+', help='Override the sizes for every benchmark')
+    parser.add_argument('--only', help='Comma-separated benchmark names or prefixes (e.g. finder, classifier_train)')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed samples per benchmark (median is reported)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown before flagging a regression')
+    parser.add_argument('--output', help='Also write the results as JSON here')
+    args = parser.parse_args(argv)
+
+    def sizes_for(group, default):
+        return args.sizes or (QUICK_SIZES[group] if args.quick else default)
+
+    def selected(name):
+        return not args.only or any(name.startswith(prefix) for prefix in args.only.split(','))
+
+    results = {}
+
+    def record(name, size, seconds):
+        results.setdefault(name, {})[str(size)] = round(seconds, 6)
+        print(f"  {name} @ {size:,} rows: {seconds:.4f} s", flush=True)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sizes_for('finder', FINDER_SIZES):
+            cases = [case for case in finder_cases(size, workdir) if selected(case[0])]
+            for name, setup, run in cases:
+                record(name, size, time_case(setup, run, 1 if size >= SINGLE_RUN_SIZE else args.repeat))
+
+    classifier_names = [name for name in ('classifier_train', 'classifier_predict') if selected(name)]
+    if classifier_names:
+        from kdd_cache import load_dataset
+        try:
+            dataset = load_dataset()
+        except Exception as e:
+            print(f"Skipping classifier benchmarks: KDD dataset unavailable ({e})")
+            dataset = None
+        for size in sizes_for('classifier', CLASSIFIER_SIZES) if dataset is not None else []:
+            if size > dataset.X.shape[0]:
+                continue
+            for name, setup, run in classifier_cases(size, dataset):
+                if name in classifier_names:
+                    record(name, size, time_case(setup, run, args.repeat))
+
+    report = {'machine': machine_info(), 'tolerance': args.tolerance, 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=1)
+    print()
+    if args.save_baseline:
+        baseline = {'machine': machine_info(), 'results': {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        # Merge, so a partial run (--only, --quick) updates just what it measured
+        for name, sizes in results.items():
+            baseline['results'].setdefault(name, {}).update(sizes)
+        baseline['machine'] = machine_info()
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=1, sort_keys=True)
+        print(f"Saved baseline to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; record one on this machine with --save-baseline")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get('machine') != machine_info():
+        print(f"Baseline was recorded on a different setup ({baseline.get('machine')}); "
+              f"re-record it here with --save-baseline to compare")
+        return
+    regressions = compare(results, baseline['results'], args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+        sys.exit(1)
+    print("\nNo regressions")
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,26 @@
 import os
+import sys
+import json
+import hashlib
+import argparse
+from datetime import datetime
 from fpdf import FPDF, XPos, YPos
 
+# Rendered charts, keyed by a hash of their data (see cached_chart)
+CHART_CACHE_DIR = 'results/.chart_cache'
+CHART_CACHE_ENTRIES = 32
+# Markdown tables longer than this use the fast text renderer
+LARGE_TABLE_ROWS = 200
+# Monospaced table text: courier glyphs are 0.6 em wide
+TABLE_FONT_SIZE = 7.5
+TABLE_LINE_HEIGHT = 3.6
+MAX_COLUMN_CHARS = 40
+
+def latin1(text):
+    """Core PDF fonts only cover Latin-1; replace anything else."""
+    text = text.replace('—', '-').replace('’', "'").replace('“', '"').replace('”', '"')
+    return text.encode('latin-1', 'replace').decode('latin-1')
+
 class CYBReportPDF(FPDF):
     def header(self):
         if self.page_no() == 1:
@@ -35,33 +55,32 @@ class CYBReportPDF(FPDF):
         if level == 1:
             self.ln(10)
             self.set_font("helvetica", 'B', 16)
-            self.cell(0, 10, title, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+            self.cell(0, 10, latin1(title), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
             self.line(self.get_x(), self.get_y(), self.get_x() + 190, self.get_y())
             self.ln(5)
         elif level == 2:
             self.ln(6)
             self.set_font("helvetica", 'B', 14)
-            self.cell(0, 10, title, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+            self.cell(0, 10, latin1(title), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
             self.ln(2)
         else:
             self.ln(4)
             self.set_font("helvetica", 'B', 12)
-            self.cell(0, 8, title, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+            self.cell(0, 8, latin1(title), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
 
     def add_bullet(self, text):
         self.set_x(15)
         self.set_font("helvetica", '', 11)
         self.set_text_color(0, 0, 0)
         # Use ASCII bullet and multi_cell for wrapping
-        self.multi_cell(0, 7, f"* {text.strip()}")
+        self.multi_cell(0, 7, latin1(f"* {text.strip()}"))
         self.ln(2)
 
     def add_paragraph(self, text):
         self.set_font("helvetica", '', 11)
         self.set_text_color(0, 0, 0)
         # Replace problematic Unicode characters
-        text = text.replace('—', '-').replace('’', "'").replace('“', '"').replace('”', '"')
-        self.multi_cell(0, 7, text)
+        self.multi_cell(0, 7, latin1(text))
         self.ln(2) # Reduced spacing
 
     def add_alert(self, text, type="NOTE"):
@@ -73,15 +92,35 @@ class CYBReportPDF(FPDF):
             self.set_text_color(200, 100, 0)
         else:
             self.set_text_color(0, 100, 150)
-            
+
         self.set_font("helvetica", 'B', 10)
         self.cell(0, 8, f"[{type}]", new_x=XPos.LMARGIN, new_y=YPos.NEXT, fill=True)
         self.set_font("helvetica", 'I', 10)
-        self.multi_cell(0, 6, text.strip(), fill=True)
+        self.multi_cell(0, 6, latin1(text.strip()), fill=True)
         self.ln(2) # Reduced trailing spacing
         self.set_text_color(0, 0, 0)
 
+    def add_figure(self, img_path, caption=None):
+        # Check for space
+        if self.get_y() > 180:
+            self.add_page()
+        self.ln(2)
+        self.image(img_path, w=140, x=35)
+        # Caption
+        if caption:
+            self.set_font("helvetica", 'I', 9)
+            self.set_text_color(100, 100, 100)
+            self.cell(0, 8, latin1(caption), new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
+            self.set_text_color(0, 0, 0)
+        self.ln(2)
+
     def draw_table(self, header, data):
+        if len(data) > LARGE_TABLE_ROWS:
+            import pandas as pd
+            rows = [(list(r) + [''] * len(header))[:len(header)] for r in data]
+            frame = pd.DataFrame(rows, columns=header).replace(r'\*\*|`', '', regex=True)
+            self.draw_frame(frame)
+            return
         self.ln(2)
         # Use fpdf2 built-in table component (v2.6+)
         with self.table(
@@ -96,99 +135,283 @@ class CYBReportPDF(FPDF):
             row = table.row()
             self.set_font("helvetica", 'B', 10)
             for h in header:
-                row.cell(h)
-            
+                row.cell(latin1(h))
+
             # Data Rows
             self.set_font("helvetica", '', 9)
             for d_row in data:
                 row = table.row()
                 for item in d_row:
                     clean_item = str(item).replace('**', '').replace('`', '').strip()
-                    row.cell(clean_item)
+                    row.cell(latin1(clean_item))
         self.ln(2) # Reduced trailing spacing
 
+    def draw_frame(self, frame, block_rows=2000):
+        """Render a DataFrame of any length as a paginated monospaced table.
+
+        Rows are formatted a block at a time with vectorized string
+        operations and placed as whole lines, instead of one layout call
+        per cell; the header repeats on every page.
+        """
+        self.ln(2)
+        chars_per_line = int((self.w - self.l_margin - self.r_margin) / (0.6 * TABLE_FONT_SIZE * 25.4 / 72))
+        sample = frame.head(block_rows).astype(str)
+        widths = [min(max(len(str(col)), sample[col].str.len().max() if len(sample) else 0), MAX_COLUMN_CHARS)
+                  for col in frame.columns]
+        while sum(widths) + 2 * (len(widths) - 1) > chars_per_line and max(widths) > 4:
+            widths[widths.index(max(widths))] -= 1
+        header = latin1('  '.join(str(col)[:w].ljust(w) for col, w in zip(frame.columns, widths)))
+        self.set_text_color(0, 0, 0)
+
+        pending = []
+        for start in range(0, len(frame), block_rows):
+            block = frame.iloc[start:start + block_rows].astype(str)
+            line = None
+            for col, w in zip(block.columns, widths):
+                cell = block[col].str.slice(0, w).str.ljust(w)
+                line = cell if line is None else line + '  ' + cell
+            pending.extend(latin1(text) for text in line)
+            # Write out whole pages; keep the remainder for the next block
+            while len(pending) >= self._page_rows():
+                pending = self._table_page(header, pending)
+        while pending:
+            pending = self._table_page(header, pending)
+        self.ln(2)
+
+    def _page_rows(self):
+        """Table rows that fit below the header on the current page (at least a few)."""
+        rows = int((self.h - self.b_margin - self.get_y()) / TABLE_LINE_HEIGHT) - 1
+        if rows < 3:
+            self.add_page()
+            rows = int((self.h - self.b_margin - self.get_y()) / TABLE_LINE_HEIGHT) - 1
+        return rows
+
+    def _table_page(self, header, lines):
+        """Write the header and as many lines as fit on this page; returns the rest."""
+        rows = self._page_rows()
+        self.set_font("courier", 'B', TABLE_FONT_SIZE)
+        self.cell(0, TABLE_LINE_HEIGHT, header, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        self.set_font("courier", '', TABLE_FONT_SIZE)
+        # Lines are already cut to the page width: place them directly, skipping line breaking
+        y = self.get_y() + 0.75 * TABLE_LINE_HEIGHT
+        for i, line in enumerate(lines[:rows]):
+            self.text(self.l_margin, y + i * TABLE_LINE_HEIGHT, line)
+        self.set_y(self.get_y() + min(rows, len(lines)) * TABLE_LINE_HEIGHT)
+        rest = lines[rows:]
+        if rest:
+            self.add_page()
+        return rest
+
+def with_next(lines):
+    """Yield (line, next line or '') pairs from an iterator without reading ahead further."""
+    lines = iter(lines)
+    current = next(lines, None)
+    while current is not None:
+        following = next(lines, None)
+        yield current.rstrip('\n'), '' if following is None else following.rstrip('\n')
+        current = following
+
 def generate_premium_pdf(md_path, pdf_path):
     if not os.path.exists(md_path):
         return
 
-    with open(md_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-
     pdf = CYBReportPDF()
     pdf.set_auto_page_break(auto=True, margin=20)
     pdf.add_page()
-    
-    lines = content.split('\n')
-    
+
     in_table = False
     table_header = []
     table_data = []
 
-    for i, line in enumerate(lines):
-        line = line.strip()
-        if not line: continue
-            
-        if line.startswith('# '):
-            pdf.chapter_title(line[2:], 1)
-        elif line.startswith('## '):
-            pdf.chapter_title(line[3:], 2)
-        elif line.startswith('### '):
-            pdf.chapter_title(line[4:], 3)
-        elif line.startswith('- ') or line.startswith('* '):
-            pdf.add_bullet(line[2:])
-        elif line.startswith('> [!'):
-            type_end = line.find(']')
-            alert_type = line[4:type_end]
-            alert_content = ""
-            if i + 1 < len(lines) and lines[i+1].startswith('> '):
-                 alert_content = lines[i+1][2:].strip()
-            pdf.add_alert(alert_content, alert_type)
-        elif line.startswith('|'):
-            if '---' in line: continue
-            parts = [p.strip() for p in line.split('|') if p.strip()]
-            if not in_table:
-                in_table = True
-                table_header = parts
+    # Read the markdown line by line (one line of lookahead) instead of whole
+    with open(md_path, 'r', encoding='utf-8') as f:
+        for line, next_line in with_next(f):
+            line = line.strip()
+            if not line: continue
+
+            if line.startswith('# '):
+                pdf.chapter_title(line[2:], 1)
+            elif line.startswith('## '):
+                pdf.chapter_title(line[3:], 2)
+            elif line.startswith('### '):
+                pdf.chapter_title(line[4:], 3)
+            elif line.startswith('- ') or line.startswith('* '):
+                pdf.add_bullet(line[2:])
+            elif line.startswith('> [!'):
+                type_end = line.find(']')
+                alert_type = line[4:type_end]
+                alert_content = ""
+                if next_line.startswith('> '):
+                     alert_content = next_line[2:].strip()
+                pdf.add_alert(alert_content, alert_type)
+            elif line.startswith('|'):
+                if '---' in line: continue
+                parts = [p.strip() for p in line.split('|') if p.strip()]
+                if not in_table:
+                    in_table = True
+                    table_header = parts
+                else:
+                    table_data.append(parts)
+            elif line.startswith('!['):
+                if in_table:
+                    pdf.draw_table(table_header, table_data)
+                    in_table = False
+                    table_data = []
+
+                start = line.find('(') + 1
+                end = line.find(')')
+                img_path = line[start:end]
+                if img_path.startswith('file://'):
+                    img_path = img_path[7:]
+
+                if os.path.exists(img_path):
+                    pdf.add_figure(img_path, next_line.strip('*') if next_line.startswith('*Figure') else None)
             else:
-                table_data.append(parts)
-        elif line.startswith('!['):
-            if in_table:
-                pdf.draw_table(table_header, table_data)
-                in_table = False
-                table_data = []
-            
-            start = line.find('(') + 1
-            end = line.find(')')
-            img_path = line[start:end]
-            if img_path.startswith('file://'):
-                img_path = img_path[7:]
-            
-            if os.path.exists(img_path):
-                # Check for space
-                if pdf.get_y() > 180:
-                    pdf.add_page()
-                pdf.ln(2)
-                pdf.image(img_path, w=140, x=35)
-                # Caption
-                if i + 1 < len(lines) and lines[i+1].startswith('*Figure'):
-                    pdf.set_font("helvetica", 'I', 9)
-                    pdf.set_text_color(100, 100, 100)
-                    pdf.cell(0, 8, lines[i+1].strip('*'), new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
-                    pdf.set_text_color(0, 0, 0)
-                pdf.ln(2)
-        else:
-            if in_table:
-                pdf.draw_table(table_header, table_data)
-                in_table = False
-                table_data = []
-            
-            if not line.startswith('*Figure') and not line.startswith('---') and not line.startswith('> '):
-                pdf.add_paragraph(line)
+                if in_table:
+                    pdf.draw_table(table_header, table_data)
+                    in_table = False
+                    table_data = []
+
+                if not line.startswith('*Figure') and not line.startswith('---') and not line.startswith('> '):
+                    pdf.add_paragraph(line)
 
     if in_table:
         pdf.draw_table(table_header, table_data)
 
     pdf.output(pdf_path)
 
+def cached_chart(kind, data, title, xlabel, ylabel, cache_dir=CHART_CACHE_DIR):
+    """PNG bar chart of a Series, rendered once per distinct (kind, data) and reused afterwards."""
+    key = hashlib.sha256(f"{kind}|{title}|{xlabel}|{ylabel}|{data.to_json()}".encode()).hexdigest()[:16]
+    path = os.path.join(cache_dir, f"{kind}-{key}.png")
+    if os.path.exists(path):
+        os.utime(path)  # Recently used charts survive pruning
+        return path
+    # matplotlib is only imported when a chart actually has to be drawn
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    os.makedirs(cache_dir, exist_ok=True)
+    fig, ax = plt.subplots(figsize=(8, 4.5))
+    data.plot(kind='bar', ax=ax)
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    plt.xticks(rotation=45, ha='right')
+    fig.tight_layout()
+    tmp = path + '.tmp.png'
+    fig.savefig(tmp, dpi=100)
+    plt.close(fig)
+    os.replace(tmp, path)
+    charts = sorted((os.path.join(cache_dir, name) for name in os.listdir(cache_dir) if name.endswith('.png')),
+                    key=os.path.getmtime, reverse=True)
+    for stale in charts[CHART_CACHE_ENTRIES:]:
+        os.remove(stale)
+    return path
+
+def format_metric(value):
+    if isinstance(value, float):
+        return f"{value:.4f}"
+    if isinstance(value, int):
+        return f"{value:,}"
+    return str(value)
+
+def generate_threat_report(pdf_path, threats, metrics=None, deny_counts=None, title="Threat Detection Report",
+                           top_n=25, max_rows=5000, attach_csv=True, chart_dir=CHART_CACHE_DIR):
+    """Report built from structured results rather than markdown.
+
+    `threats` is a threat table (type, ip, port, count, window, as from
+    threat_table), `metrics` a flat dict of name -> value and `deny_counts`
+    a Series of denies per IP. The report has the metrics, detections per
+    type, cached charts, the top `top_n` detections and a paginated list of
+    the first `max_rows`; with `attach_csv` every detection is also written
+    next to the PDF as a gzip-compressed CSV and embedded in it.
+    """
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'task2', 'src'))
+    from threat_detection import top_threats
+
+    pdf = CYBReportPDF()
+    pdf.set_auto_page_break(auto=True, margin=20)
+    pdf.add_page()
+    pdf.chapter_title(title, 1)
+    pdf.add_paragraph(f"Generated {datetime.now().strftime('%Y-%m-%d %H:%M')}: {len(threats):,} detections"
+                      + (f" from {int(deny_counts.sum()):,} denied connections." if deny_counts is not None else "."))
+
+    if metrics:
+        pdf.chapter_title("Metrics", 2)
+        pdf.draw_table(["Metric", "Value"], [(name, format_metric(value)) for name, value in metrics.items()])
+
+    pdf.chapter_title("Detections by Type", 2)
+    by_type = threats.groupby('type').agg(detections=('count', 'size'), events=('count', 'sum'),
+                                          max_count=('count', 'max'), sources=('ip', 'nunique'))
+    pdf.draw_table(["Type", "Detections", "Events", "Max count", "Sources"],
+                   [(name, *(f"{int(v):,}" for v in row)) for name, row in by_type.iterrows()])
+    if len(by_type):
+        pdf.add_figure(cached_chart('types', by_type['detections'], 'Detections per Threat Type', 'Type',
+                                    'Detections', chart_dir), "Figure: detections per threat type")
+    if deny_counts is not None and len(deny_counts):
+        top_denies = deny_counts.sort_values(ascending=False).head(10)
+        pdf.add_figure(cached_chart('denies', top_denies, 'Top 10 IPs by Number of Denies', 'Source IP',
+                                    'Deny Count', chart_dir), "Figure: top 10 source IPs by denies")
+
+    pdf.chapter_title(f"Top {min(top_n, len(threats))} Detections by Count", 2)
+    pdf.draw_frame(top_threats(threats, top_n))
+
+    attachment = None
+    if attach_csv:
+        attachment = os.path.splitext(pdf_path)[0] + '_threats.csv.gz'
+        threats.to_csv(attachment, index=False, compression='gzip')
+        # fpdf2 >= 2.7 can embed files; the CSV is already compressed
+        if hasattr(pdf, 'embed_file'):
+            pdf.embed_file(attachment, desc="All detections (gzip-compressed CSV)", compress=False)
+
+    pdf.chapter_title("All Detections", 2)
+    if len(threats) > max_rows:
+        where = f" See {os.path.basename(attachment)} for all of them." if attachment else ""
+        pdf.add_alert(f"Listing the first {max_rows:,} of {len(threats):,} detections.{where}")
+    pdf.draw_frame(threats.head(max_rows))
+
+    pdf.output(pdf_path)
+    return pdf_path
+
+def structured_results(log_path, model_path, summary_path):
+    """(threats, metrics, deny counts) for a firewall log, plus saved classifier and run metrics."""
+    root = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, os.path.join(root, 'task2', 'src'))
+    from log_cache import load_logs
+    from threat_detection import ThreatDetector, default_rules, threat_table
+
+    # The column cache makes re-reporting on the same log skip parsing
+    logs, _ = load_logs(log_path)
+    result = ThreatDetector(default_rules()).detect(logs)
+    metrics = {'Log entries': len(logs), 'Denied connections': int(result.deny_counts.sum())}
+    if model_path and os.path.exists(model_path):
+        sys.path.insert(0, os.path.join(root, 'src'))
+        from kdd_model import load_model
+        meta = load_model(model_path).meta
+        metrics.update({f"Classifier {name}": value for name, value in meta['metrics'].items()})
+        metrics['Classifier trained at'] = meta['trained_at']
+    if summary_path and os.path.exists(summary_path):
+        with open(summary_path) as f:
+            for task in json.load(f)['tasks']:
+                metrics[f"{task['task']} wall time (s)"] = task['wall_s']
+                metrics[f"{task['task']} peak memory (MB)"] = task['peak_rss_mb']
+    return threat_table(result), metrics, result.deny_counts
+
 if __name__ == "__main__":
-    generate_premium_pdf("results/defense_report.md", "results/defense_report.pdf")
+    parser = argparse.ArgumentParser(description="Render the markdown report, or a threat report from structured results")
+    parser.add_argument('--log', help='Build a threat report for this firewall log instead of rendering the markdown report')
+    parser.add_argument('--markdown', default="results/defense_report.md")
+    parser.add_argument('--output', help='PDF path (default: results/defense_report.pdf, or results/threat_report.pdf with --log)')
+    parser.add_argument('--model', default='models/kdd_classifier.npz', help='With --log, include this classifier\'s metrics')
+    parser.add_argument('--summary', default='results/performance_summary.json', help='With --log, include these run metrics')
+    parser.add_argument('--top', type=int, default=25, help='With --log, detections in the top-N table')
+    parser.add_argument('--max-rows', type=int, default=5000, help='With --log, detections listed in the PDF (all go to the CSV)')
+    args = parser.parse_args()
+    if args.log:
+        threats, metrics, deny_counts = structured_results(args.log, args.model, args.summary)
+        path = generate_threat_report(args.output or "results/threat_report.pdf", threats, metrics, deny_counts,
+                                      top_n=args.top, max_rows=args.max_rows)
+        print(f"Saved threat report to {path}")
+    else:
+        generate_premium_pdf(args.markdown, args.output or "results/defense_report.pdf")
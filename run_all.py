@@ -1,42 +1,238 @@
 import os
 import sys
+import glob
+import json
+import shutil
+import hashlib
+import argparse
+import threading
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from time import perf_counter
+
+sys.path.insert(0, 'src')
+from kdd_cache import source_files
+
+CACHE_DIR = 'data/.cache/run_all'
+# Cached runs kept per task, so switching back and forth (e.g. --profile) stays cheap
+KEEP_PER_TASK = 4
+
+TASKS = [
+    {
+        'name': 'task1',
+        'description': 'Task 1: Basic Network Threat Classifier',
+        'script': 'src/network_threat_classifier.py',
+        'output': 'results/task1_output.txt',
+        'code': ['src/*.py'],
+        'data': lambda: source_files()[1],
+        'artifacts': ['confusion_matrix.png', 'models/kdd_classifier.npz'],
+    },
+    {
+        'name': 'task2',
+        'description': 'Task 2: Firewall Log Threat Pattern Finder',
+        'script': 'task2/src/firewall_threat_finder.py',
+        'output': 'results/task2_output.txt',
+        'code': ['task2/src/*.py', 'src/stage_profiler.py'],
+        'data': lambda: ['task2/data/sample_firewall_logs.csv'],
+        'artifacts': ['task2/deny_counts_plot.png'],
+    },
+]
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--profile', action='store_true', help='Profile each task per stage and write results/performance_summary.json')
+parser.add_argument('--jobs', type=int, default=len(TASKS), help='Tasks to run at the same time (1 = one after the other)')
+parser.add_argument('--force', action='store_true', help='Rerun every task even when a cached result matches')
+parser.add_argument('--timeout', type=int, default=300, help='Seconds before a task is stopped')
+args = parser.parse_args()
 
 # Create results folder
 os.makedirs('results', exist_ok=True)
 
 print(f"Running CYB 213 Tasks - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
 
-def run_task(script_path, output_file, description, timeout=300):
-    """Run a script in batch mode with timeout and output redirection."""
-    print(f"=== {description} ===")
+print_lock = threading.Lock()
+
+def status(name, message):
+    with print_lock:
+        print(f"[{name}] {message}", flush=True)
+
+class FileHasher:
+    """SHA-256 of files, remembered by (size, mtime) so unchanged inputs are not reread."""
+
+    def __init__(self, path=os.path.join(CACHE_DIR, 'file_hashes.json')):
+        self.path = path
+        self.known = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.known = json.load(f)
+
+    def digest(self, path):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return 'missing'
+        key = os.path.abspath(path)
+        entry = self.known.get(key)
+        if entry and entry[:2] == [st.st_size, st.st_mtime_ns]:
+            return entry[2]
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+        self.known[key] = [st.st_size, st.st_mtime_ns, h.hexdigest()]
+        return h.hexdigest()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'w') as f:
+            json.dump(self.known, f)
+
+def task_key(task, command, hasher):
+    """Content hash of everything a task's results depend on: code, input data and parameters."""
+    code = sorted({path for pattern in task['code'] for path in glob.glob(pattern)})
+    inputs = {
+        'command': command,
+        'python': sys.version,
+        'code': {path: hasher.digest(path) for path in code},
+        'data': {path: hasher.digest(path) for path in task['data']()},
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()[:16]
+
+def task_files(task, profile_file):
+    """Files a run produces, all of which a cached result must restore."""
+    return [task['output']] + task['artifacts'] + ([profile_file] if profile_file else [])
+
+def restore_cached(task, key, files):
+    entry = os.path.join(CACHE_DIR, task['name'], key)
+    if not all(os.path.exists(os.path.join(entry, path)) for path in files):
+        return False
+    for path in files:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        shutil.copy2(os.path.join(entry, path), path)
+    os.utime(entry)  # Most recently used entries survive pruning
+    return True
+
+def store_cached(task, key, files):
+    task_dir = os.path.join(CACHE_DIR, task['name'])
+    entry = os.path.join(task_dir, key)
+    # Build the entry aside and swap it in, so a crash never leaves a partial entry
+    tmp = entry + '.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    for path in files:
+        os.makedirs(os.path.join(tmp, os.path.dirname(path)), exist_ok=True)
+        shutil.copy2(path, os.path.join(tmp, path))
+    shutil.rmtree(entry, ignore_errors=True)
+    os.replace(tmp, entry)
+    entries = sorted((os.path.join(task_dir, e) for e in os.listdir(task_dir) if not e.endswith('.tmp')),
+                     key=os.path.getmtime, reverse=True)
+    for stale in entries[KEEP_PER_TASK:]:
+        shutil.rmtree(stale, ignore_errors=True)
+
+def run_task(task, key, command, profile_file=None, timeout=300):
+    """Run one task's script in batch mode, streaming its output live (prefixed) and into its output file.
+
+    Returns True when the task succeeded; successful runs are stored in the result cache.
+    """
+    name = task['name']
+    status(name, f"{task['description']}: started")
+    started = perf_counter()
     try:
-        with open(output_file, 'w') as f:
+        with open(task['output'], 'w') as f:
             # Use sys.executable to ensure we use the same python interpreter (venv)
-            result = subprocess.run([sys.executable, script_path, '--batch'], stdout=f, stderr=subprocess.STDOUT, cwd=os.getcwd(), timeout=timeout)
-        if result.returncode == 0:
-            print(f"{description} complete. Output saved to {output_file}")
-            # Preview last 5 lines
-            with open(output_file, 'r') as f:
-                lines = f.readlines()
-                print("Preview (last 5 lines):")
-                for line in lines[-5:]:
-                    print(line.strip())
-        else:
-            print(f"Warning: {description} exited with code {result.returncode}. Check {output_file}.")
-    except subprocess.TimeoutExpired:
-        print(f"Timeout: {description} took >{timeout}s.")
+            proc = subprocess.Popen([sys.executable, '-u'] + command, stdout=subprocess.PIPE,
+                                    stderr=subprocess.STDOUT, cwd=os.getcwd(), text=True, bufsize=1)
+            timed_out = threading.Event()
+            timer = threading.Timer(timeout, lambda: (timed_out.set(), proc.kill()))
+            timer.start()
+            try:
+                for line in proc.stdout:
+                    f.write(line)
+                    status(name, line.rstrip('\n'))
+                returncode = proc.wait()
+            finally:
+                timer.cancel()
     except FileNotFoundError:
-        print(f"Error: {script_path} not found.")
+        status(name, f"Error: {task['script']} not found.")
+        return False
     except Exception as e:
-        print(f"Error: {e}")
-    print()  # Newline
+        status(name, f"Error: {e}")
+        return False
+    elapsed = perf_counter() - started
+    if returncode != 0:
+        if timed_out.is_set():
+            status(name, f"Timeout: {task['description']} took >{timeout}s.")
+        else:
+            status(name, f"Warning: {task['description']} exited with code {returncode}. Check {task['output']}.")
+        return False
+    status(name, f"{task['description']} complete in {elapsed:.1f}s. Output saved to {task['output']}")
+    store_cached(task, key, task_files(task, profile_file))
+    return True
+
+def performance_summary(profile_files, summary_file='results/performance_summary.json', cached=()):
+    """Combine the per-task stage profiles into one summary file and print it as a table."""
+    tasks = []
+    for path in profile_files:
+        if os.path.exists(path):
+            with open(path) as f:
+                tasks.append(json.load(f))
+        else:
+            print(f"Warning: no profile in {path} (task failed?)")
+    for task in tasks:
+        # A reused result's profile describes the run that produced it
+        task['cached'] = task['task'] in cached
+    summary = {
+        'run_at': datetime.now().isoformat(timespec='seconds'),
+        'wall_s': round(sum(t['wall_s'] for t in tasks), 4),
+        'cpu_s': round(sum(t['cpu_s'] for t in tasks), 4),
+        'peak_rss_mb': max((t['peak_rss_mb'] for t in tasks if t['peak_rss_mb'] is not None), default=None),
+        'tasks': tasks,
+    }
+    with open(summary_file, 'w') as f:
+        json.dump(summary, f, indent=1)
+
+    print("=== Performance Summary ===")
+    print(f"{'task':<8} {'stage':<12} {'wall s':>8} {'cpu s':>8} {'peak MB':>8}")
+    for task in tasks:
+        for stage in task['stages'] + [dict(task, stage='total')]:
+            peak = '' if stage['peak_rss_mb'] is None else f"{stage['peak_rss_mb']:.0f}"
+            note = '  (cached run)' if task['cached'] and stage['stage'] == 'total' else ''
+            print(f"{task['task']:<8} {stage['stage']:<12} {stage['wall_s']:>8.2f} {stage['cpu_s']:>8.2f} {peak:>8}{note}")
+    print(f"Saved performance summary to {summary_file}\n")
+
+profiles = {task['name']: f"results/{task['name']}_profile.json" for task in TASKS} if args.profile else {}
+hasher = FileHasher()
+plans = []
+for task in TASKS:
+    command = [task['script'], '--batch'] + (['--profile', profiles[task['name']]] if args.profile else [])
+    key = task_key(task, command, hasher)
+    plans.append((task, key, command))
+hasher.save()
+
+cached = set()
+for task, key, command in plans:
+    if args.force or not restore_cached(task, key, task_files(task, profiles.get(task['name']))):
+        continue
+    cached.add(task['name'])
+    status(task['name'], f"{task['description']}: unchanged, reused cached results ({key})")
+
+to_run = [plan for plan in plans if plan[0]['name'] not in cached]
+for task, _, _ in to_run:
+    profile_file = profiles.get(task['name'])
+    # A stale profile must not be reported for a task that fails this time
+    if profile_file and os.path.exists(profile_file):
+        os.remove(profile_file)
 
-# Task 1
-run_task('src/network_threat_classifier.py', 'results/task1_output.txt', 'Task 1: Basic Network Threat Classifier')
+# The tasks share no inputs or outputs, so they can run side by side
+started = perf_counter()
+with ThreadPoolExecutor(max_workers=max(args.jobs, 1)) as pool:
+    futures = [pool.submit(run_task, task, key, command, profiles.get(task['name']), args.timeout)
+               for task, key, command in to_run]
+    failed = [task['name'] for (task, _, _), future in zip(to_run, futures) if not future.result()]
+print(f"\nRan {len(to_run)} task(s) in {perf_counter() - started:.1f}s, reused {len(cached)} cached; "
+      f"{len(failed)} failed{': ' + ', '.join(failed) if failed else ''}\n")
 
-# Task 2
-run_task('task2/src/firewall_threat_finder.py', 'results/task2_output.txt', 'Task 2: Firewall Log Threat Pattern Finder')
+if args.profile:
+    performance_summary(profiles.values(), cached=cached)
 
-print("All tasks done! Check results/ for outputs. Plots have been displayed and saved as PNGs.")
\ No newline at end of file
+print("All tasks done! Check results/ for outputs. Plots have been saved as PNGs.")
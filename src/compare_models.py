@@ -0,0 +1,163 @@
+"""Compare classifiers and regularization settings on the KDD train/test split.
+
+The encoded dataset comes from the kdd_cache loader; it is split 80/20
+exactly as in network_threat_classifier.py and scaled once, then cached as
+.npy arrays (CSR components) under `--cache-dir`. Worker processes memory-map the
+cached split instead of receiving pickled copies, so N workers share one
+copy of the data in the page cache.
+
+Each grid entry records accuracy, attack recall, training time, inference
+latency (per row over the whole test set, and p50 for single records) and
+pickled model size. The results table is printed and written as CSV.
+
+Usage:
+    python src/compare_models.py --workers 4
+    python src/compare_models.py --data data/kddcup.data.gz --models logreg,sgd
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.metrics import accuracy_score, recall_score
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import LinearSVC
+from sklearn.tree import DecisionTreeClassifier
+
+from kdd_cache import load_csr, load_dataset, save_csr
+from kdd_features import FEATURE_VERSION
+
+DEFAULT_CACHE_DIR = 'data/.cache/splits'
+SPLIT_VERSION = 1
+
+# (family, estimator class, parameters)
+GRID = [
+    ('logreg', LogisticRegression, {'C': 0.1, 'max_iter': 1000}),
+    ('logreg', LogisticRegression, {'C': 1.0, 'max_iter': 1000}),
+    ('logreg', LogisticRegression, {'C': 10.0, 'max_iter': 1000}),
+    ('sgd', SGDClassifier, {'loss': 'log_loss', 'alpha': 1e-6}),
+    ('sgd', SGDClassifier, {'loss': 'log_loss', 'alpha': 1e-5}),
+    ('sgd', SGDClassifier, {'loss': 'log_loss', 'alpha': 1e-4}),
+    ('linear_svc', LinearSVC, {'C': 0.1}),
+    ('linear_svc', LinearSVC, {'C': 1.0}),
+    ('tree', DecisionTreeClassifier, {'max_depth': 8}),
+    ('tree', DecisionTreeClassifier, {'max_depth': None}),
+    ('forest', RandomForestClassifier, {'n_estimators': 50, 'max_depth': 16, 'n_jobs': 1}),
+]
+
+def load_split(directory, mmap_mode='r'):
+    """(X_train, X_test, y_train, y_test) from a cached split, memory-mapped."""
+    return (load_csr(directory, 'X_train', mmap_mode), load_csr(directory, 'X_test', mmap_mode),
+            np.load(os.path.join(directory, 'y_train.npy'), mmap_mode=mmap_mode),
+            np.load(os.path.join(directory, 'y_test.npy'), mmap_mode=mmap_mode))
+
+def build_split(data_path, cache_dir, seed=42):
+    """Directory holding the scaled train/test split for `data_path` (None = fetch_kddcup99), built if missing."""
+    dataset = load_dataset(data_path, seed=seed)
+    # The dataset cache tracks source changes; its fingerprint keys the split
+    key = {'split_version': SPLIT_VERSION, 'feature_version': FEATURE_VERSION, 'source': dataset.meta['source'],
+           'fingerprint': dataset.meta['fingerprint'], 'seed': seed}
+    directory = os.path.join(cache_dir, hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()[:16])
+    meta_path = os.path.join(directory, 'meta.json')
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            if json.load(f) == key:
+                return directory
+
+    X_train, X_test, y_train, y_test = train_test_split(dataset.X, np.asarray(dataset.y), test_size=0.2,
+                                                        random_state=seed, stratify=dataset.y)
+    scaler = StandardScaler(with_mean=False)
+    X_train = scaler.fit_transform(X_train).astype(np.float32)
+    X_test = scaler.transform(X_test).astype(np.float32)
+
+    os.makedirs(directory, exist_ok=True)
+    # Invalidate first, so an interrupted build is never mistaken for a complete one
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    save_csr(directory, 'X_train', X_train)
+    save_csr(directory, 'X_test', X_test)
+    np.save(os.path.join(directory, 'y_train.npy'), y_train)
+    np.save(os.path.join(directory, 'y_test.npy'), y_test)
+    with open(meta_path, 'w') as f:
+        json.dump(key, f)
+    return directory
+
+def evaluate(directory, index, seed=42, single_records=200):
+    """Train and measure GRID[index] on the cached split in `directory`."""
+    family, estimator, params = GRID[index]
+    X_train, X_test, y_train, y_test = load_split(directory)
+    model = estimator(random_state=seed, **params)
+
+    t0 = time.perf_counter()
+    model.fit(X_train, y_train)
+    train_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    y_pred = model.predict(X_test)
+    batch_s = time.perf_counter() - t0
+
+    single = []
+    for i in range(min(single_records, X_test.shape[0])):
+        row = X_test[i:i + 1]
+        t0 = time.perf_counter()
+        model.predict(row)
+        single.append(time.perf_counter() - t0)
+
+    return {
+        'model': family,
+        'params': ', '.join(f'{k}={v}' for k, v in params.items() if k not in ('max_iter', 'n_jobs')),
+        'accuracy': accuracy_score(y_test, y_pred),
+        'attack_recall': recall_score(y_test, y_pred),
+        'train_s': train_s,
+        'batch_us_per_row': batch_s / len(y_test) * 1e6,
+        'single_ms_p50': float(np.median(single)) * 1000,
+        'size_kb': len(pickle.dumps(model)) / 1024,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', help='Local kddcup.data file instead of the fetch_kddcup99 10%% subset')
+    parser.add_argument('--models', help='Comma-separated model families to run (default: all of ' +
+                        ', '.join(dict.fromkeys(family for family, _, _ in GRID)) + ')')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    parser.add_argument('--output', default='results/model_comparison.csv')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    families = set(args.models.split(',')) if args.models else None
+    indices = [i for i, (family, _, _) in enumerate(GRID) if families is None or family in families]
+    if not indices:
+        raise SystemExit(f"No grid entries for --models {args.models}")
+
+    t0 = time.perf_counter()
+    directory = build_split(args.data, args.cache_dir, args.seed)
+    print(f"Split ready in {directory} ({time.perf_counter() - t0:.1f} s); "
+          f"running {len(indices)} configurations on {args.workers} workers")
+
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(evaluate, directory, i, args.seed) for i in indices]
+        rows = []
+        for future in futures:
+            rows.append(future.result())
+            print(f"  {rows[-1]['model']} ({rows[-1]['params']}): accuracy {rows[-1]['accuracy']:.4f}, "
+                  f"trained in {rows[-1]['train_s']:.1f} s", flush=True)
+    print(f"Grid finished in {time.perf_counter() - t0:.1f} s\n")
+
+    results = pd.DataFrame(rows).sort_values(['accuracy', 'train_s'], ascending=[False, True], kind='stable')
+    print(results.to_string(index=False, float_format=lambda v: f'{v:.4g}'))
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    results.to_csv(args.output, index=False)
+    print(f"\nResults saved to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""Preprocessed, memory-mapped cache of the KDD Cup 99 dataset.
+
+The first load parses the source (a local kddcup.data file, or the
+fetch_kddcup99 10% subset from scikit-learn's data home), encodes it with
+`encode_sparse` and writes the CSR feature matrix, binary labels and
+attack-type codes as .npy files plus a meta.json recording the feature
+layout. Later loads memory-map those files, which takes milliseconds and
+touches no pages until the data is used.
+
+A cache is rebuilt automatically when the cache format, FEATURE_VERSION,
+or the source file (path, size, modification time) changes. When the
+source is not available at all, an existing cache for it is used as is, so
+runs work offline from a cached copy.
+"""
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from kdd_features import (FEATURE_VERSION, NORMAL_LABEL, NUMERIC_COLUMNS, VOCABULARIES, as_text, encode_sparse, read_kdd,
+                          records_frame)
+
+# Bump when the cached file layout changes
+CACHE_VERSION = 1
+DEFAULT_CACHE_DIR = 'data/.cache/kdd'
+FETCH_SOURCE = 'fetch_kddcup99'
+
+class CachedDataset:
+    """Encoded KDD records: sparse features `X`, binary labels `y` and attack types."""
+
+    def __init__(self, X, y, label_codes, meta, from_cache):
+        self.X = X
+        self.y = y
+        self.label_codes = label_codes
+        self.meta = meta
+        self.from_cache = from_cache
+
+    @property
+    def labels(self):
+        """Attack type of each record ('normal', 'smurf', ...) as a Categorical."""
+        return pd.Categorical.from_codes(self.label_codes, categories=self.meta['label_names'])
+
+def save_csr(directory, name, X):
+    for part in ('data', 'indices', 'indptr'):
+        np.save(os.path.join(directory, f'{name}_{part}.npy'), getattr(X, part))
+    np.save(os.path.join(directory, f'{name}_shape.npy'), np.array(X.shape))
+
+def load_csr(directory, name, mmap_mode='r'):
+    """CSR matrix whose data/indices/indptr are memory-mapped from `save_csr` output."""
+    parts = [np.load(os.path.join(directory, f'{name}_{part}.npy'), mmap_mode=mmap_mode)
+             for part in ('data', 'indices', 'indptr')]
+    shape = tuple(np.load(os.path.join(directory, f'{name}_shape.npy')))
+    return sparse.csr_matrix(tuple(parts), shape=shape, copy=False)
+
+def source_files(data_path=None, seed=42):
+    """(source id, files holding its data) of a dataset source."""
+    if data_path:
+        path = os.path.abspath(data_path)
+        return path, [path]
+    # Where fetch_kddcup99 keeps its copy (sklearn's get_data_home, without importing sklearn)
+    data_home = os.path.expanduser(os.environ.get('SCIKIT_LEARN_DATA', os.path.join('~', 'scikit_learn_data')))
+    directory = os.path.join(data_home, 'kddcup99_10-py3')
+    source = f"{FETCH_SOURCE}(percent10=True, shuffle=True, random_state={seed})"
+    return source, [os.path.join(directory, 'samples'), os.path.join(directory, 'targets')]
+
+def source_signature(data_path=None, seed=42):
+    """(source id, fingerprint) of a dataset source; fingerprint is None when the source is unavailable."""
+    source, files = source_files(data_path, seed)
+    try:
+        stats = [os.stat(f) for f in files]
+    except FileNotFoundError:
+        return source, None
+    return source, [[s.st_size, s.st_mtime_ns] for s in stats]
+
+def read_source(data_path=None, seed=42):
+    """(records frame, labels) from a local kddcup.data file or fetch_kddcup99."""
+    if data_path:
+        records = read_kdd(data_path)
+        return records, records.pop('label')
+    from sklearn.datasets import fetch_kddcup99
+    kdd_data = fetch_kddcup99(shuffle=True, random_state=seed)
+    return records_frame(kdd_data.data), pd.Series(kdd_data.target)
+
+def load_dataset(data_path=None, cache_dir=DEFAULT_CACHE_DIR, seed=42, refresh=False):
+    """Encoded dataset for `data_path` (None = fetch_kddcup99 10%), from the cache when it is current."""
+    source, fingerprint = source_signature(data_path, seed)
+    directory = os.path.join(cache_dir, hashlib.sha1(source.encode()).hexdigest()[:16])
+    meta_path = os.path.join(directory, 'meta.json')
+    if not refresh and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        current = meta.get('cache_version') == CACHE_VERSION and meta.get('feature_version') == FEATURE_VERSION
+        # An unavailable source cannot have changed under us; use the copy we have
+        if current and (fingerprint is None or meta.get('fingerprint') == fingerprint):
+            return CachedDataset(load_csr(directory, 'X'), np.load(os.path.join(directory, 'y.npy'), mmap_mode='r'),
+                                 np.load(os.path.join(directory, 'label_codes.npy'), mmap_mode='r'), meta, True)
+
+    records, labels = read_source(data_path, seed)
+    X = encode_sparse(records)
+    del records
+    label_names = as_text(labels).str.rstrip('.')
+    codes, names = pd.factorize(label_names, sort=True)
+    y = (label_names != NORMAL_LABEL).to_numpy().astype(np.int8)
+    meta = {
+        'cache_version': CACHE_VERSION,
+        'feature_version': FEATURE_VERSION,
+        'source': source,
+        # Signature after reading, in case fetch_kddcup99 downloaded the data just now
+        'fingerprint': source_signature(data_path, seed)[1],
+        'n_rows': X.shape[0],
+        'numeric_columns': NUMERIC_COLUMNS,
+        'vocabularies': VOCABULARIES,
+        'label_names': list(names),
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+    }
+
+    # Write next to the final location and swap it in, so readers never see a partial cache
+    tmp = directory + '.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    save_csr(tmp, 'X', X)
+    np.save(os.path.join(tmp, 'y.npy'), y)
+    np.save(os.path.join(tmp, 'label_codes.npy'), codes.astype(np.int16))
+    with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=1)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp, directory)
+    return CachedDataset(X, y, codes.astype(np.int16), meta, False)
@@ -0,0 +1,113 @@
+"""Fixed feature layout for KDD Cup 99 connection records.
+
+`pd.get_dummies` only creates columns for the categories present in the
+data it sees, so the one-hot layout drifted with the sample (the 10% subset
+has 66 of the 70 services) and a model could not score records encoded in
+a later run. The vocabularies below are the complete value sets from the
+dataset description (kddcup.names), so every record is encoded into the
+same 122 columns: the 38 numeric features in file order, then one
+indicator per protocol, service and flag. Values outside a vocabulary
+encode as all zeros.
+
+`encode_sparse` builds the same layout as a float32 CSR matrix: each record
+has at most three one-hot entries and most numeric features are zero, so it
+is a fraction of the dense float64 size. `read_kdd` parses a raw
+kddcup.data file straight into compact dtypes (float32 numerics,
+categoricals), which is what makes the full 4.9M-row file fit in memory.
+"""
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Bump when the encoding below changes; saved models record it
+FEATURE_VERSION = 1
+
+COLUMNS = [
+    'duration', 'protocol_type', 'service', 'flag', 'src_bytes', 'dst_bytes', 'land', 'wrong_fragment', 'urgent',
+    'hot', 'num_failed_logins', 'logged_in', 'num_compromised', 'root_shell', 'su_attempted', 'num_root',
+    'num_file_creations', 'num_shells', 'num_access_files', 'num_outbound_cmds', 'is_host_login', 'is_guest_login',
+    'count', 'srv_count', 'serror_rate', 'srv_serror_rate', 'rerror_rate', 'srv_rerror_rate', 'same_srv_rate',
+    'diff_srv_rate', 'srv_diff_host_rate', 'dst_host_count', 'dst_host_srv_count', 'dst_host_same_srv_rate',
+    'dst_host_diff_srv_rate', 'dst_host_same_src_port_rate', 'dst_host_srv_diff_host_rate', 'dst_host_serror_rate',
+    'dst_host_srv_serror_rate', 'dst_host_rerror_rate', 'dst_host_srv_rerror_rate'
+]
+CATEGORICAL_COLUMNS = ['protocol_type', 'service', 'flag']
+NUMERIC_COLUMNS = [col for col in COLUMNS if col not in CATEGORICAL_COLUMNS]
+
+# Sorted the way pd.get_dummies orders its columns
+VOCABULARIES = {
+    'protocol_type': ['icmp', 'tcp', 'udp'],
+    'service': [
+        'IRC', 'X11', 'Z39_50', 'aol', 'auth', 'bgp', 'courier', 'csnet_ns', 'ctf', 'daytime', 'discard', 'domain',
+        'domain_u', 'echo', 'eco_i', 'ecr_i', 'efs', 'exec', 'finger', 'ftp', 'ftp_data', 'gopher', 'harvest',
+        'hostnames', 'http', 'http_2784', 'http_443', 'http_8001', 'imap4', 'iso_tsap', 'klogin', 'kshell', 'ldap',
+        'link', 'login', 'mtp', 'name', 'netbios_dgm', 'netbios_ns', 'netbios_ssn', 'netstat', 'nnsp', 'nntp',
+        'ntp_u', 'other', 'pm_dump', 'pop_2', 'pop_3', 'printer', 'private', 'red_i', 'remote_job', 'rje', 'shell',
+        'smtp', 'sql_net', 'ssh', 'sunrpc', 'supdup', 'systat', 'telnet', 'tftp_u', 'tim_i', 'time', 'urh_i',
+        'urp_i', 'uucp', 'uucp_path', 'vmnet', 'whois'
+    ],
+    'flag': ['OTH', 'REJ', 'RSTO', 'RSTOS0', 'RSTR', 'S0', 'S1', 'S2', 'S3', 'SF', 'SH'],
+}
+
+NORMAL_LABEL = 'normal'
+
+# Compact dtypes for reading raw kddcup.data lines (41 features + label)
+KDD_DTYPES = {col: np.float32 for col in NUMERIC_COLUMNS}
+KDD_DTYPES.update({col: 'category' for col in CATEGORICAL_COLUMNS + ['label']})
+
+def feature_names(numeric_columns=NUMERIC_COLUMNS, vocabularies=VOCABULARIES):
+    """Column names of the encoded matrix, e.g. 'duration', ..., 'service_http'."""
+    names = list(numeric_columns)
+    for col, vocab in vocabularies.items():
+        names += [f"{col}_{value}" for value in vocab]
+    return names
+
+def as_text(values):
+    """Decode a column of bytes (as returned by fetch_kddcup99) to str; str passes through."""
+    values = pd.Series(values)
+    if len(values) and isinstance(values.iloc[0], bytes):
+        return values.str.decode('utf-8')
+    return values.astype(str)
+
+def category_codes(values, vocab):
+    """Index of each value in `vocab`, -1 for values outside it."""
+    values = pd.Series(values)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Remap the category codes instead of materializing strings
+        return values.cat.set_categories(vocab).cat.codes.to_numpy()
+    return pd.Categorical(as_text(values), categories=vocab).codes
+
+def read_kdd(source, **kwargs):
+    """Records frame (with 'label') from a raw kddcup.data file, in `KDD_DTYPES`; kwargs go to read_csv."""
+    return pd.read_csv(source, header=None, names=COLUMNS + ['label'], dtype=KDD_DTYPES, **kwargs)
+
+def records_frame(X_raw):
+    """Wrap a raw (n, 41) KDD sample array as a DataFrame with the standard column names."""
+    return pd.DataFrame(X_raw, columns=COLUMNS)
+
+def binary_labels(labels):
+    """0 for 'normal' connections, 1 for any attack; accepts 'normal.' or b'normal.' style labels."""
+    return (as_text(labels).str.rstrip('.') != NORMAL_LABEL).to_numpy().astype(int)
+
+def encode_features(records, numeric_columns=NUMERIC_COLUMNS, vocabularies=VOCABULARIES):
+    """Dense float64 feature matrix of a records frame, in the `feature_names` layout."""
+    n = len(records)
+    blocks = [records[numeric_columns].to_numpy(dtype=float)]
+    for col, vocab in vocabularies.items():
+        codes = category_codes(records[col], vocab)
+        onehot = np.zeros((n, len(vocab)))
+        known = np.flatnonzero(codes >= 0)
+        onehot[known, codes[known]] = 1.0
+        blocks.append(onehot)
+    return np.hstack(blocks)
+
+def encode_sparse(records, numeric_columns=NUMERIC_COLUMNS, vocabularies=VOCABULARIES):
+    """float32 CSR feature matrix of a records frame, in the `feature_names` layout."""
+    n = len(records)
+    blocks = [sparse.csr_matrix(records[numeric_columns].to_numpy(dtype=np.float32))]
+    for col, vocab in vocabularies.items():
+        codes = category_codes(records[col], vocab)
+        known = np.flatnonzero(codes >= 0)
+        blocks.append(sparse.csr_matrix((np.ones(len(known), dtype=np.float32), (known, codes[known])),
+                                        shape=(n, len(vocab))))
+    return sparse.hstack(blocks, format='csr', dtype=np.float32)
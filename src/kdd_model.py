@@ -0,0 +1,117 @@
+"""Saved KDD classifier artifacts: scaler, model weights and feature layout in one file.
+
+An artifact is a NumPy .npz archive holding the scaler statistics and the
+logistic regression weights as plain arrays, plus a JSON header with the
+artifact and feature versions and the exact feature layout (numeric
+columns and categorical vocabularies) the model was trained on. Loading
+needs no pickle and no scikit-learn objects, so it takes milliseconds.
+"""
+import json
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+import sklearn
+from scipy.special import expit
+
+from kdd_features import FEATURE_VERSION, NUMERIC_COLUMNS, VOCABULARIES, category_codes, encode_features, feature_names
+
+# Bump when the file layout changes; older artifacts are then rejected
+ARTIFACT_VERSION = 1
+DEFAULT_MODEL_PATH = 'models/kdd_classifier.npz'
+
+class ThreatModel:
+    """A trained binary classifier (0 = normal, 1 = attack) loaded from an artifact.
+
+    The scaler is folded into the logistic weights once at load time:
+    w = coef / scale and b = intercept - mean . w, so scoring a row is a
+    single dot product with no separate standardization pass.
+    """
+
+    def __init__(self, mean, scale, coef, intercept, meta):
+        self.mean = mean
+        self.scale = scale
+        self.coef = coef
+        self.intercept = intercept
+        self.meta = meta
+        self.numeric_columns = meta['numeric_columns']
+        self.vocabularies = meta['vocabularies']
+        self.weights = coef / scale
+        self.bias = intercept - mean @ self.weights
+        # Per-column weight slices; a one-hot column contributes exactly its
+        # category's weight, so categoricals become table lookups (with a
+        # trailing 0 for values outside the vocabulary)
+        n_numeric = len(self.numeric_columns)
+        self.numeric_weights = self.weights[:n_numeric]
+        self.category_weights = {}
+        start = n_numeric
+        for col, vocab in self.vocabularies.items():
+            self.category_weights[col] = np.append(self.weights[start:start + len(vocab)], 0.0)
+            start += len(vocab)
+
+    @property
+    def feature_names(self):
+        return feature_names(self.numeric_columns, self.vocabularies)
+
+    def encode(self, records):
+        """Feature matrix of a records frame in this model's layout."""
+        return encode_features(records, self.numeric_columns, self.vocabularies)
+
+    def decision_function(self, X):
+        return X @ self.weights + self.bias
+
+    def predict_proba(self, X):
+        """Probability that each row of the feature matrix `X` is an attack."""
+        return expit(self.decision_function(X))
+
+    def predict(self, X):
+        return (self.decision_function(X) > 0).astype(int)
+
+    def score_records(self, records):
+        """Attack probabilities for a frame of raw connection records.
+
+        Equal to predict_proba(encode(records)) without building the one-hot
+        block: one matrix-vector product over the numeric columns plus one
+        weight lookup per categorical column.
+        """
+        z = records[self.numeric_columns].to_numpy(dtype=float) @ self.numeric_weights + self.bias
+        for col, weights in self.category_weights.items():
+            z += weights[category_codes(records[col], self.vocabularies[col])]
+        return expit(z)
+
+def save_model(path, scaler, model, metrics=None):
+    """Write a fitted StandardScaler + binary linear model to an artifact at `path`.
+
+    A scaler fitted with with_mean=False (for sparse input) is stored with a
+    zero mean, since it never centers.
+    """
+    meta = {
+        'artifact_version': ARTIFACT_VERSION,
+        'feature_version': FEATURE_VERSION,
+        'numeric_columns': NUMERIC_COLUMNS,
+        'vocabularies': VOCABULARIES,
+        'model': type(model).__name__,
+        'sklearn_version': sklearn.__version__,
+        'trained_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'metrics': metrics or {},
+    }
+    n_features = len(feature_names(NUMERIC_COLUMNS, VOCABULARIES))
+    if model.coef_.shape != (1, n_features):
+        raise ValueError(f"Expected a binary model over {n_features} features, got coefficients of shape {model.coef_.shape}")
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = path + '.tmp.npz'
+    mean = scaler.mean_ if scaler.with_mean else np.zeros_like(scaler.scale_)
+    np.savez(tmp, mean=mean, scale=scaler.scale_, coef=model.coef_.ravel(),
+             intercept=model.intercept_, meta=np.array(json.dumps(meta)))
+    # Readers never see a half-written artifact
+    os.replace(tmp, path)
+    return path
+
+def load_model(path=DEFAULT_MODEL_PATH):
+    """Load an artifact written by `save_model`; raises ValueError for incompatible versions."""
+    with np.load(path, allow_pickle=False) as f:
+        meta = json.loads(str(f['meta']))
+        if meta.get('artifact_version') != ARTIFACT_VERSION:
+            raise ValueError(f"{path}: artifact version {meta.get('artifact_version')} is not supported "
+                             f"(expected {ARTIFACT_VERSION}); retrain with network_threat_classifier.py")
+        return ThreatModel(f['mean'], f['scale'], f['coef'], float(f['intercept'][0]), meta)
@@ -0,0 +1,59 @@
+"""Score connection records with a saved KDD classifier artifact.
+
+Input is a CSV of KDD Cup 99 records: either raw kddcup.data lines (41
+features, optionally followed by the label) or a file with a header row
+using the standard column names. Writes one line per record with the
+predicted class and the attack probability.
+
+Usage:
+    python src/predict.py records.csv
+    python src/predict.py --model models/kdd_classifier.npz --output scores.csv - < records.csv
+"""
+import argparse
+import io
+import sys
+import time
+
+import pandas as pd
+
+from kdd_features import COLUMNS
+from kdd_model import DEFAULT_MODEL_PATH, load_model
+
+def read_records(source):
+    """Records frame from a CSV path or file object, with or without a header row."""
+    head = pd.read_csv(source, header=None, nrows=1)
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    if head.iloc[0, 0] == COLUMNS[0]:
+        return pd.read_csv(source)
+    # Raw lines; a 42nd field is the label and is ignored
+    names = COLUMNS + ['label'] if head.shape[1] == len(COLUMNS) + 1 else COLUMNS
+    return pd.read_csv(source, header=None, names=names)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('records', help="CSV of connection records, or '-' for stdin")
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH, help='Model artifact written by network_threat_classifier.py')
+    parser.add_argument('--output', help='Write predictions here instead of stdout')
+    parser.add_argument('--threshold', type=float, default=0.5, help='Attack probability above which a record is flagged')
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    model = load_model(args.model)
+    t1 = time.perf_counter()
+    records = read_records(io.BytesIO(sys.stdin.buffer.read()) if args.records == '-' else args.records)
+    t2 = time.perf_counter()
+    proba = model.score_records(records)
+    t3 = time.perf_counter()
+
+    out = pd.DataFrame({
+        'prediction': pd.Series(proba > args.threshold).map({False: 'normal', True: 'attack'}),
+        'attack_probability': proba.round(6),
+    })
+    out.to_csv(args.output or sys.stdout, index=False)
+    print(f"Loaded model in {(t1 - t0) * 1000:.1f} ms, read {len(records)} records in {(t2 - t1) * 1000:.1f} ms, "
+          f"scored them in {(t3 - t2) * 1000:.1f} ms ({int((proba > args.threshold).sum())} flagged)",
+          file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+"""Online scoring server for the KDD classifier.
+
+Clients connect over TCP or a Unix socket and send micro-batches of
+connection records as raw KDD CSV lines (41 features, an optional trailing
+label is ignored), each batch terminated by an empty line. The server
+answers with one attack probability per record, in order, followed by an
+empty line. Connections can pipeline any number of batches.
+
+Requests from all connections are coalesced: a single batcher task takes
+whatever is queued (up to `--max-batch` records, waiting at most
+`--linger-ms` for more), parses it with one CSV read and scores it with the
+model's fused scaler+logistic weights, then hands each request its slice.
+A quiet server answers after the linger; a busy one fills large batches.
+
+Sending the single line `#stats` (then an empty line) returns the current
+throughput and latency snapshot as one JSON line; the same snapshot is
+written to stderr every `--stats-interval` seconds.
+
+Usage:
+    python src/scoring_server.py --port 8765
+    python src/scoring_server.py --unix /tmp/kdd-score.sock --max-batch 8192
+"""
+import argparse
+import asyncio
+import io
+import json
+import sys
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from kdd_features import COLUMNS
+from kdd_model import DEFAULT_MODEL_PATH, load_model
+
+STATS_COMMAND = b'#stats'
+
+class ScoringStats:
+    """Throughput and per-request latency of the server.
+
+    Latency runs from the moment a request's terminating empty line was
+    read to the moment its scores were written.
+    """
+
+    def __init__(self, reservoir=100_000):
+        self.started = time.monotonic()
+        self.requests = 0
+        self.records = 0
+        self.batches = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=reservoir)
+
+    def snapshot(self):
+        elapsed = time.monotonic() - self.started
+        lat = np.fromiter(self.latencies, dtype=float) * 1000
+        return {
+            'event': 'stats',
+            'requests': self.requests,
+            'records': self.records,
+            'batches': self.batches,
+            'errors': self.errors,
+            'mean_batch': round(self.records / self.batches, 1) if self.batches else None,
+            'elapsed_s': round(elapsed, 3),
+            'records_per_s': round(self.records / elapsed, 1) if elapsed > 0 else 0.0,
+            'latency_ms_p50': round(float(np.percentile(lat, 50)), 3) if len(lat) else None,
+            'latency_ms_p99': round(float(np.percentile(lat, 99)), 3) if len(lat) else None,
+            'latency_ms_max': round(float(lat.max()), 3) if len(lat) else None,
+        }
+
+def parse_record_lines(lines):
+    """Records frame from raw KDD CSV lines (bytes, newline-terminated)."""
+    return pd.read_csv(io.BytesIO(b''.join(lines)), header=None, names=COLUMNS + ['label'])
+
+def check_record_lines(lines):
+    """Raise ValueError unless every line has the 41 KDD fields (plus an optional label)."""
+    for i, line in enumerate(lines):
+        if line.count(b',') not in (len(COLUMNS) - 1, len(COLUMNS)):
+            raise ValueError(f"record {i + 1} has {line.count(b',') + 1} fields, expected {len(COLUMNS)}")
+
+def format_scores(scores):
+    return ''.join(f'{p:.6f}\n' for p in scores.tolist()).encode() + b'\n'
+
+class Batcher:
+    """Coalesces concurrent scoring requests into one NumPy batch per model call."""
+
+    def __init__(self, model, stats, max_batch=4096, linger=0.002):
+        self.model = model
+        self.stats = stats
+        self.max_batch = max_batch
+        self.linger = linger
+        self.queue = asyncio.Queue()
+
+    async def score(self, lines):
+        """Attack probabilities for one request's record lines."""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((lines, future))
+        return await future
+
+    async def run(self):
+        while True:
+            batch = await self.next_batch()
+            self.score_batch(batch)
+            # Let the connection handlers write their responses
+            await asyncio.sleep(0)
+
+    async def next_batch(self):
+        """Wait for a request, then gather more for at most `linger` seconds."""
+        batch = [await self.queue.get()]
+        n_records = len(batch[0][0])
+        deadline = time.monotonic() + self.linger
+        while n_records < self.max_batch:
+            if self.queue.empty():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                item = self.queue.get_nowait()
+            batch.append(item)
+            n_records += len(item[0])
+        return batch
+
+    def score_batch(self, batch):
+        try:
+            scores = self.model.score_records(parse_record_lines([line for lines, _ in batch for line in lines]))
+        except Exception:
+            # A malformed request must not fail the others it was batched with
+            for lines, future in batch:
+                self.score_one(lines, future)
+            return
+        self.stats.batches += 1
+        ends = np.cumsum([len(lines) for lines, _ in batch])
+        for (lines, future), part in zip(batch, np.split(scores, ends[:-1])):
+            if not future.done():
+                future.set_result(part)
+
+    def score_one(self, lines, future):
+        try:
+            result = self.model.score_records(parse_record_lines(lines))
+            self.stats.batches += 1
+        except Exception as e:
+            result = e
+        if future.done():
+            return
+        if isinstance(result, Exception):
+            future.set_exception(result)
+        else:
+            future.set_result(result)
+
+async def handle_client(reader, writer, batcher, stats):
+    try:
+        while True:
+            lines = []
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                if not line.strip():
+                    break
+                lines.append(line)
+            if not lines:
+                continue
+            if lines[0].strip() == STATS_COMMAND:
+                writer.write(json.dumps(stats.snapshot()).encode() + b'\n\n')
+                await writer.drain()
+                continue
+            arrived = time.monotonic()
+            try:
+                check_record_lines(lines)
+                scores = await batcher.score(lines)
+            except Exception as e:
+                stats.errors += 1
+                writer.write(f"error: {e}".replace('\n', ' ').encode() + b'\n\n')
+                await writer.drain()
+                continue
+            writer.write(format_scores(scores))
+            await writer.drain()
+            stats.requests += 1
+            stats.records += len(lines)
+            stats.latencies.append(time.monotonic() - arrived)
+    except ConnectionResetError:
+        pass
+    finally:
+        writer.close()
+
+async def report_stats(stats, interval, err):
+    while True:
+        await asyncio.sleep(interval)
+        err.write(json.dumps(stats.snapshot()) + '\n')
+        err.flush()
+
+async def serve(model, host='127.0.0.1', port=8765, unix_path=None, max_batch=4096, linger=0.002,
+                stats_interval=10.0, err=sys.stderr, ready=None):
+    """Serve until cancelled. `ready`, if given, is an asyncio.Event set once listening."""
+    stats = ScoringStats()
+    batcher = Batcher(model, stats, max_batch, linger)
+
+    async def client(reader, writer):
+        await handle_client(reader, writer, batcher, stats)
+
+    if unix_path:
+        server = await asyncio.start_unix_server(client, path=unix_path, limit=2 ** 20)
+        where = unix_path
+    else:
+        server = await asyncio.start_server(client, host, port, limit=2 ** 20)
+        where = f"{host}:{port}"
+    err.write(f"Scoring server listening on {where} (max batch {max_batch}, linger {linger * 1000:g} ms)\n")
+    err.flush()
+    tasks = [asyncio.create_task(batcher.run()), asyncio.create_task(report_stats(stats, stats_interval, err))]
+    if ready is not None:
+        ready.set()
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        for task in tasks:
+            task.cancel()
+        err.write(json.dumps(stats.snapshot()) + '\n')
+        err.flush()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH, help='Model artifact written by network_threat_classifier.py')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help='Listen on this Unix socket path instead of TCP')
+    parser.add_argument('--max-batch', type=int, default=4096, help='Most records scored in one model call')
+    parser.add_argument('--linger-ms', type=float, default=2.0, help='How long to wait for more requests to fill a batch')
+    parser.add_argument('--stats-interval', type=float, default=10.0, help='Seconds between stats lines on stderr')
+    args = parser.parse_args(argv)
+
+    model = load_model(args.model)
+    try:
+        asyncio.run(serve(model, args.host, args.port, args.unix, args.max_batch, args.linger_ms / 1000,
+                          args.stats_interval))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
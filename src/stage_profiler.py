@@ -0,0 +1,103 @@
+"""Per-stage wall time, CPU time and peak memory for the command-line pipelines.
+
+    profiler = StageProfiler('task1', enabled=args.profile is not None)
+    with profiler.stage('train'):
+        model.fit(X_train, y_train)
+    profiler.emit(args.profile)
+
+CPU time includes finished child processes (e.g. shard workers), so
+cpu_s > wall_s means work ran in parallel. Peak RSS is per stage on Linux,
+where the kernel's high-water mark can be reset between stages; elsewhere
+it falls back to the process-wide peak so far. A disabled profiler costs
+nothing, so stages can stay wrapped unconditionally.
+"""
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def _cpu_seconds():
+    if resource is None:
+        return time.process_time()
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+def _reset_peak_rss():
+    """Reset the kernel's peak-RSS counter for this process; False where that is not supported."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def _peak_rss_mb(per_stage):
+    if per_stage:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    if resource is None:
+        return None
+    # ru_maxrss is in kB on Linux, bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+class StageProfiler:
+    """Records a list of named stages; see the module docstring."""
+
+    def __init__(self, task, enabled=True):
+        self.task = task
+        self.enabled = enabled
+        self.stages = []
+        self.started = time.perf_counter()
+        self.started_cpu = _cpu_seconds()
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+        per_stage = _reset_peak_rss()
+        wall, cpu = time.perf_counter(), _cpu_seconds()
+        try:
+            yield
+        finally:
+            peak = _peak_rss_mb(per_stage)
+            self.stages.append({
+                'stage': name,
+                'wall_s': round(time.perf_counter() - wall, 4),
+                'cpu_s': round(_cpu_seconds() - cpu, 4),
+                'peak_rss_mb': None if peak is None else round(peak, 1),
+            })
+
+    def report(self):
+        peaks = [s['peak_rss_mb'] for s in self.stages if s['peak_rss_mb'] is not None]
+        return {
+            'task': self.task,
+            'finished_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'wall_s': round(time.perf_counter() - self.started, 4),
+            'cpu_s': round(_cpu_seconds() - self.started_cpu, 4),
+            'peak_rss_mb': max(peaks) if peaks else None,
+            'stages': self.stages,
+        }
+
+    def emit(self, path):
+        """Write the report as JSON to `path`, or to stderr for '-'; nothing when disabled."""
+        if not self.enabled:
+            return
+        text = json.dumps(self.report(), indent=1)
+        if path in (None, '-'):
+            print(text, file=sys.stderr)
+            return
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(text + '\n')
@@ -0,0 +1,150 @@
+"""Out-of-core training of the KDD classifier on a local kddcup.data file.
+
+Streams the file (the full 4.9M-row dataset works, plain or gzipped) in
+fixed-size chunks. Each chunk is encoded with the sparse float32 layout,
+folded into a running StandardScaler (partial_fit, no centering) and used
+for one SGD logistic regression step (SGDClassifier.partial_fit), so memory
+is bounded by the chunk size rather than the dataset size.
+
+Every fifth row is held out and never trained on; it is scored with the
+model as it stands after its chunk, and the confusion matrix accumulated
+over the last epoch is the reported accuracy (progressive validation, no
+second pass needed).
+
+After every `--checkpoint-every` chunks the scaler statistics, model
+weights and progress are written to a checkpoint; `--resume` continues from
+it, skipping the rows already consumed. The final model is saved as a
+regular artifact for src/predict.py and src/scoring_server.py.
+
+Usage:
+    python src/train_incremental.py data/kddcup.data.gz
+    python src/train_incremental.py data/kddcup.data.gz --chunksize 500000 --epochs 2 --resume
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import confusion_matrix
+from sklearn.preprocessing import StandardScaler
+
+from kdd_features import binary_labels, encode_sparse, read_kdd
+from kdd_model import DEFAULT_MODEL_PATH, save_model
+
+CHECKPOINT_VERSION = 1
+CLASSES = np.array([0, 1])
+# Row i is held out for validation when i % HOLDOUT_EVERY == HOLDOUT_EVERY - 1
+HOLDOUT_EVERY = 5
+
+def new_learners(alpha, seed):
+    return StandardScaler(with_mean=False), SGDClassifier(loss='log_loss', alpha=alpha, random_state=seed)
+
+def save_checkpoint(path, scaler, model, progress, cm):
+    """Atomically write the scaler/model state and progress counters to `path`."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = path + '.tmp.npz'
+    np.savez(tmp, n_samples_seen=scaler.n_samples_seen_, mean=scaler.mean_, var=scaler.var_,
+             coef=model.coef_, intercept=model.intercept_, t=model.t_, confusion=cm,
+             meta=np.array(json.dumps({'checkpoint_version': CHECKPOINT_VERSION, **progress})))
+    os.replace(tmp, path)
+
+def load_checkpoint(path, alpha, seed):
+    """(scaler, model, progress, confusion matrix) restored from a checkpoint written by `save_checkpoint`."""
+    with np.load(path, allow_pickle=False) as f:
+        progress = json.loads(str(f['meta']))
+        if progress.pop('checkpoint_version') != CHECKPOINT_VERSION:
+            raise ValueError(f"{path}: unsupported checkpoint version; delete it to start over")
+        scaler, model = new_learners(alpha, seed)
+        scaler.n_samples_seen_ = f['n_samples_seen']
+        scaler.mean_ = f['mean']
+        scaler.var_ = f['var']
+        scaler.scale_ = np.where(scaler.var_ > 0, np.sqrt(scaler.var_), 1.0)
+        scaler.n_features_in_ = len(scaler.var_)
+        # partial_fit continues from these exactly as if it had never stopped
+        model.coef_ = f['coef']
+        model.intercept_ = f['intercept']
+        model.t_ = float(f['t'])
+        model.classes_ = CLASSES
+        model.n_features_in_ = model.coef_.shape[1]
+        return scaler, model, progress, f['confusion']
+
+def train_chunk(scaler, model, X, y, rng):
+    """One partial_fit step of scaler and model on a chunk, in shuffled row order."""
+    order = rng.permutation(X.shape[0])
+    X, y = X[order], y[order]
+    scaler.partial_fit(X)
+    model.partial_fit(scaler.transform(X), y, classes=CLASSES)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('data', help='Local kddcup.data file (41 features + label per line, optionally gzipped)')
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH, help='Where to save the trained model artifact')
+    parser.add_argument('--chunksize', type=int, default=200_000, help='Rows per training step (bounds memory)')
+    parser.add_argument('--epochs', type=int, default=1, help='Passes over the file')
+    parser.add_argument('--alpha', type=float, default=1e-5, help='L2 regularization strength')
+    parser.add_argument('--checkpoint', help='Checkpoint path (default: <model>.ckpt.npz)')
+    parser.add_argument('--checkpoint-every', type=int, default=5, help='Chunks between checkpoints')
+    parser.add_argument('--resume', action='store_true', help='Continue from the checkpoint if it exists')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+    checkpoint = args.checkpoint or os.path.splitext(args.model)[0] + '.ckpt.npz'
+
+    progress = {'epoch': 0, 'rows_done': 0, 'chunks': 0, 'rows_trained': 0}
+    cm = np.zeros((2, 2), dtype=np.int64)
+    if args.resume and os.path.exists(checkpoint):
+        scaler, model, progress, cm = load_checkpoint(checkpoint, args.alpha, args.seed)
+        print(f"Resuming from {checkpoint}: epoch {progress['epoch'] + 1}, row {progress['rows_done']:,}")
+    else:
+        scaler, model = new_learners(args.alpha, args.seed)
+
+    t_start = time.perf_counter()
+    rows_this_run = 0
+    while progress['epoch'] < args.epochs:
+        if progress['rows_done'] == 0:
+            # Each epoch reports its own progressive validation
+            progress['rows_trained'] = 0
+            cm = np.zeros((2, 2), dtype=np.int64)
+        t0 = time.perf_counter()
+        for chunk in read_kdd(args.data, chunksize=args.chunksize, skiprows=progress['rows_done']):
+            y = binary_labels(chunk.pop('label'))
+            X = encode_sparse(chunk)
+            # Holdout rows by absolute position in the file, so a resumed run picks the same ones
+            holdout = (progress['rows_done'] + np.arange(len(y))) % HOLDOUT_EVERY == HOLDOUT_EVERY - 1
+            rng = np.random.default_rng([args.seed, progress['epoch'], progress['chunks']])
+            train_chunk(scaler, model, X[~holdout], y[~holdout], rng)
+            if holdout.any():
+                cm += confusion_matrix(y[holdout], model.predict(scaler.transform(X[holdout])), labels=CLASSES)
+
+            progress['rows_done'] += len(y)
+            progress['chunks'] += 1
+            progress['rows_trained'] += int((~holdout).sum())
+            rows_this_run += len(y)
+            t1 = time.perf_counter()
+            print(f"epoch {progress['epoch'] + 1} chunk {progress['chunks']}: {progress['rows_done']:,} rows, "
+                  f"{len(y) / (t1 - t0):,.0f} rows/s (overall {rows_this_run / (t1 - t_start):,.0f}), "
+                  f"holdout accuracy {np.trace(cm) / max(cm.sum(), 1):.4f}", flush=True)
+            if progress['chunks'] % args.checkpoint_every == 0:
+                save_checkpoint(checkpoint, scaler, model, progress, cm)
+            t0 = time.perf_counter()
+        if not hasattr(model, 'coef_'):
+            raise SystemExit(f"{args.data}: no training rows")
+        progress['epoch'] += 1
+        progress['rows_done'] = 0
+        progress['chunks'] = 0
+        save_checkpoint(checkpoint, scaler, model, progress, cm)
+
+    elapsed = time.perf_counter() - t_start
+    acc = np.trace(cm) / max(cm.sum(), 1)
+    print(f"\nTrained on {progress['rows_trained']:,} rows x {args.epochs} epoch(s) in {elapsed:.1f} s "
+          f"({rows_this_run / elapsed:,.0f} rows/s this run)")
+    print(f"Holdout accuracy: {acc:.4f}")
+    print("Holdout confusion matrix:")
+    print(cm)
+    save_model(args.model, scaler, model, metrics={'accuracy': round(float(acc), 6), 'n_train': progress['rows_trained'],
+                                                   'holdout': 'progressive', 'epochs': args.epochs})
+    print(f"Saved model artifact to {args.model}")
+
+if __name__ == '__main__':
+    main()
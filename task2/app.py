@@ -1,61 +1,94 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import re
-from datetime import datetime
 import matplotlib.pyplot as plt
-import seaborn as sns
-import io
+import os
+import sys
+import time
 
-st.title("🔥 Firewall Log Threat Pattern Finder")
-st.write("Upload a CSV log file (columns: timestamp, src_ip, dst_ip, port, action, reason) to detect threats.")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+from threat_detection import (BRUTE_THRESHOLD, FLOOD_THRESHOLD, SCAN_THRESHOLD, WINDOW_SECONDS,
+                              ThreatDetector, default_rules, threat_table, top_threats)
+from analysis_cache import BoundedCache, ParseJob, path_key, spool_upload
+from ipv4 import format_ipv4
 
-# File uploader
-uploaded_file = st.file_uploader("Choose CSV file", type="csv")
+@st.cache_resource
+def shared_caches():
+    """Process-wide caches, shared by all sessions: parse jobs (frames) and window counts."""
+    return BoundedCache(max_entries=4), BoundedCache(max_entries=8)
 
-if uploaded_file is not None:
-    # Load logs
-    logs = pd.read_csv(uploaded_file, parse_dates=['timestamp'])
-    st.write(f"Loaded {len(logs)} log entries.")
-    st.dataframe(logs.head())
+jobs, window_counts = shared_caches()
 
-    # Regex for IP
-    ip_pattern = r'(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'
-    logs['src_ip_extracted'] = logs['src_ip'].astype(str).str.extract(ip_pattern)[0]
-    logs['time_window'] = logs['timestamp'].dt.floor('1min')
+st.title("🔥 Firewall Log Threat Pattern Finder")
+st.write("Upload a CSV log file (columns: timestamp, src_ip, dst_ip, port, action, reason) to detect threats.")
 
-    # Detect threats (same logic as script)
-    threats = []
+# Detection settings (same defaults as the command-line finder). Window and
+# sliding mode need new counts; thresholds and top N only re-evaluate them.
+st.sidebar.header("Detection settings")
+window = st.sidebar.number_input("Window (seconds)", min_value=1, value=WINDOW_SECONDS)
+scan_threshold = st.sidebar.slider("Port scan: more than N denies per IP/port", 0, 200, SCAN_THRESHOLD)
+brute_threshold = st.sidebar.slider("Brute force: more than N SSH auth failures per IP", 0, 200, BRUTE_THRESHOLD)
+flood_threshold = st.sidebar.slider("Flood: more than N denies per IP", 0, 2000, FLOOD_THRESHOLD)
+sliding = st.sidebar.checkbox("Sliding windows", help="Count events in any trailing window instead of fixed clock buckets")
+top_n = st.sidebar.number_input("Show top N threats by count (0 = all)", min_value=0, value=0)
 
-    # Port Scan
-    scan_logs = logs[(logs['action'] == 'DENY') & (logs['reason'].str.contains('PORT_SCAN|INVALID', na=False))]
-    scan_counts = scan_logs.groupby(['src_ip_extracted', 'port', 'time_window']).size().reset_index(name='count')
-    scans = scan_counts[scan_counts['count'] > 10]
-    for _, row in scans.iterrows():
-        threats.append({'type': 'Port Scan', 'ip': row['src_ip_extracted'], 'port': row['port'], 'count': row['count'], 'window': row['time_window']})
+# Log source: an upload, or a file already on the server (no upload size limit)
+source = st.radio("Log source", ["Upload", "Server-side path"], horizontal=True)
+log_path = key = None
+if source == "Upload":
+    uploaded_file = st.file_uploader("Choose CSV file", type="csv")
+    if uploaded_file is not None:
+        # Spool and hash each upload once, not on every rerun
+        spooled = st.session_state.get('spooled')
+        if spooled is None or spooled[0] != uploaded_file.file_id or not os.path.exists(spooled[1]):
+            with st.spinner("Saving upload..."):
+                uploaded_file.seek(0)
+                st.session_state['spooled'] = (uploaded_file.file_id, *spool_upload(uploaded_file))
+        _, log_path, key = st.session_state['spooled']
+else:
+    server_path = st.text_input("Path on the server", placeholder="task2/data/sample_firewall_logs.csv")
+    if server_path:
+        if os.path.isfile(server_path):
+            log_path, key = server_path, path_key(server_path)
+        else:
+            st.error(f"No such file: {server_path}")
 
-    # Brute Force
-    brute_logs = logs[(logs['action'] == 'DENY') & (logs['reason'].str.contains('AUTH_FAIL', na=False)) & (logs['port'] == 22)]
-    brute_counts = brute_logs.groupby(['src_ip_extracted', 'time_window']).size().reset_index(name='count')
-    brutes = brute_counts[brutes['count'] > 5]
-    for _, row in brutes.iterrows():
-        threats.append({'type': 'Brute Force', 'ip': row['src_ip_extracted'], 'port': 22, 'count': row['count'], 'window': row['time_window']})
+if log_path is not None:
+    # Parse in the background; rerun to redraw the progress bar until done
+    job = jobs.get_or_compute(key, lambda: ParseJob(log_path))
+    if not job.done:
+        st.progress(job.progress, text=f"Parsing log... {job.progress:.0%}")
+        time.sleep(0.5)
+        st.rerun()
+    if job.error is not None:
+        jobs.discard(key)
+        st.error(f"Could not parse the log: {job.error}")
+        st.stop()
+    logs = job.logs
+    st.write(f"Loaded {len(logs):,} log entries{' (cached)' if job.hit else ''}.")
+    head = logs.head().copy()
+    for col in ('src_ip', 'dst_ip'):
+        head[col] = format_ipv4(head[col].to_numpy())
+    st.dataframe(head)
 
-    # Traffic Flood
-    flood_counts = logs[logs['action'] == 'DENY'].groupby(['src_ip_extracted', 'time_window']).size().reset_index(name='count')
-    floods = flood_counts[flood_counts['count'] > 50]
-    for _, row in floods.iterrows():
-        threats.append({'type': 'Traffic Flood', 'ip': row['src_ip_extracted'], 'port': 'N/A', 'count': row['count'], 'window': row['time_window']})
+    # Window counts do not depend on thresholds: compute them once per
+    # (log, window, mode) and only threshold them on each interaction
+    def compute_counts():
+        with st.spinner("Counting events per window..."):
+            return ThreatDetector(default_rules(window), sliding).window_counts(logs)
+    counts = window_counts.get_or_compute((key, window, sliding), compute_counts)
+    rules = default_rules(window, scan_threshold, brute_threshold, flood_threshold)
+    result = ThreatDetector(rules, sliding).threshold(counts)
 
-    threat_df = pd.DataFrame(threats)
+    threat_df = threat_table(result)
+    if top_n:
+        threat_df = top_threats(threat_df, top_n)
     if not threat_df.empty:
-        st.subheader("🛑 Detected Threats")
+        st.subheader(f"🛑 Detected Threats ({len(threat_df):,})")
         st.dataframe(threat_df)
     else:
         st.info("No threats detected.")
 
     # Top Deny IPs Plot
-    deny_counts = logs[logs['action'] == 'DENY'].groupby('src_ip_extracted').size().sort_values(ascending=False)
+    deny_counts = result.deny_counts
     st.subheader("📊 Top IPs by Deny Count")
     fig, ax = plt.subplots(figsize=(10, 6))
     deny_counts.head(10).plot(kind='bar', ax=ax)
@@ -63,6 +96,8 @@ if uploaded_file is not None:
     ax.set_xlabel('Source IP')
     ax.set_ylabel('Deny Count')
     st.pyplot(fig)
+    plt.close(fig)
 
 else:
-    st.info("👆 Upload a CSV to start analysis. Try the synthetic sample: `task2/data/sample_firewall_logs.csv`.")
\ No newline at end of file
+    st.info("👆 Upload a CSV or enter a server-side path to start analysis. "
+            "Try the synthetic sample: `task2/data/sample_firewall_logs.csv`.")
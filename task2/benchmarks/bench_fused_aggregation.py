@@ -0,0 +1,82 @@
+"""Benchmark: fused single-pass pattern counting vs. the original four passes.
+
+Usage:
+    python task2/benchmarks/bench_fused_aggregation.py --sizes 1000000 10000000 50000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from threat_detection import ThreatDetector, default_rules
+
+IP_PATTERN = r'(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'
+
+def make_logs(n_rows, n_ips=5000, seed=42):
+    """Synthetic firewall log frame with the same schema as sample_firewall_logs.csv."""
+    rng = np.random.default_rng(seed)
+    start = np.datetime64('2025-11-28T09:00:00', 's')
+    ip_pool = np.array([f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}" for i in range(n_ips)], dtype=object)
+    return pd.DataFrame({
+        'timestamp': pd.to_datetime(start + rng.integers(0, 86400, n_rows).astype('timedelta64[s]')),
+        'src_ip': ip_pool[rng.integers(0, n_ips, n_rows)],
+        'dst_ip': '192.168.1.1',
+        'port': rng.choice([22, 80, 443, 3389, 21], n_rows),
+        'action': rng.choice(np.array(['ACCEPT', 'DENY'], dtype=object), n_rows, p=[0.7, 0.3]),
+        'reason': rng.choice(np.array(['OK', 'INVALID', 'AUTH_FAIL', 'PORT_SCAN', 'FLOOD'], dtype=object), n_rows),
+    })
+
+def baseline_count_patterns(logs):
+    """The original finder logic: one regex extract, three masks and four groupbys."""
+    logs = logs.copy()
+    logs['src_ip_extracted'] = logs['src_ip'].astype(str).str.extract(IP_PATTERN)[0].fillna('')
+    logs['time_window'] = logs['timestamp'].dt.floor('1min')
+    scan_logs = logs[(logs['action'] == 'DENY') & (logs['reason'].str.contains('PORT_SCAN|INVALID', na=False))]
+    brute_logs = logs[(logs['action'] == 'DENY') & (logs['reason'].str.contains('AUTH_FAIL', na=False)) & (logs['port'] == 22)]
+    return {
+        'scan': scan_logs.groupby(['src_ip_extracted', 'port', 'time_window']).size(),
+        'brute': brute_logs.groupby(['src_ip_extracted', 'time_window']).size(),
+        'flood': logs[logs['action'] == 'DENY'].groupby(['src_ip_extracted', 'time_window']).size(),
+        'deny': logs[logs['action'] == 'DENY'].groupby('src_ip_extracted').size(),
+    }
+
+def fused_count_patterns(logs, detector=ThreatDetector(default_rules())):
+    """The rule engine's fixed-window counts, keyed like the baseline tables."""
+    counts = detector.count(logs)
+    return {
+        'scan': counts.counts['Port Scan'],
+        'brute': counts.counts['Brute Force'],
+        'flood': counts.counts['Traffic Flood'],
+        'deny': counts.deny_counts,
+    }
+
+def best_of(fn, logs, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(logs)
+        times.append(time.perf_counter() - t0)
+    return min(times), result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000_000, 10_000_000, 50_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'baseline s':>12} {'fused s':>10} {'speedup':>8}")
+    for n_rows in args.sizes:
+        logs = make_logs(n_rows)
+        base_s, expected = best_of(baseline_count_patterns, logs, args.repeat)
+        fused_s, got = best_of(fused_count_patterns, logs, args.repeat)
+        for name in expected:
+            pd.testing.assert_series_equal(got[name], expected[name], check_names=False, check_index_type=False)
+        print(f"{n_rows:>12,} {base_s:>12.3f} {fused_s:>10.3f} {base_s / fused_s:>7.1f}x")
+        del logs
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Benchmark: scaling of sharded analysis with the number of worker processes.
+
+Writes synthetic hourly shards to a temporary directory, then times
+`analyse_shards` with 1, 2, 4, ... workers (up to the CPU count) and
+checks that every run merges to the same detections.
+
+Usage:
+    python task2/benchmarks/bench_sharded.py --shards 16 --rows-per-shard 500000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+from bench_fused_aggregation import make_logs
+from sharded import analyse_shards, expand_shards
+from threat_detection import default_rules
+
+def write_shards(directory, n_shards, rows_per_shard):
+    for i in range(n_shards):
+        shard = make_logs(rows_per_shard, seed=i)
+        # Hourly shards: shard i covers hour i
+        shard['timestamp'] = (pd.Timestamp('2025-11-28') + pd.Timedelta(hours=i)
+                              + pd.to_timedelta(np.random.default_rng(i).integers(0, 3600, rows_per_shard), unit='s'))
+        shard.to_csv(os.path.join(directory, f'fw_{i:02d}.csv'), index=False)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--shards', type=int, default=16)
+    parser.add_argument('--rows-per-shard', type=int, default=500_000)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count())
+    parser.add_argument('--sliding', action='store_true')
+    args = parser.parse_args()
+
+    worker_counts = [1]
+    while worker_counts[-1] * 2 <= args.max_workers:
+        worker_counts.append(worker_counts[-1] * 2)
+    if worker_counts[-1] != args.max_workers:
+        worker_counts.append(args.max_workers)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_shards(tmp, args.shards, args.rows_per_shard)
+        paths = expand_shards(tmp)
+        print(f"{args.shards} shards x {args.rows_per_shard:,} rows, {os.cpu_count()} CPUs")
+        print(f"{'workers':>8} {'seconds':>9} {'speedup':>8} {'efficiency':>11}")
+        reference = base_s = None
+        for workers in worker_counts:
+            t0 = time.perf_counter()
+            rows, result = analyse_shards(paths, default_rules(), workers, sliding=args.sliding)
+            elapsed = time.perf_counter() - t0
+            if reference is None:
+                reference, base_s = result, elapsed
+            else:
+                for name, hits in reference.hits.items():
+                    pd.testing.assert_frame_equal(result.hits[name], hits)
+            speedup = base_s / elapsed
+            print(f"{workers:>8} {elapsed:>9.2f} {speedup:>7.2f}x {speedup / workers:>10.0%}")
+
+if __name__ == '__main__':
+    main()
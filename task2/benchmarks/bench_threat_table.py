@@ -0,0 +1,89 @@
+"""Benchmark: columnar threat table and top-K vs. the per-row dict loop.
+
+Builds a detection result shaped like a DDoS (millions of flood windows
+over above-threshold sources) and times assembling the combined threat
+table and picking the top K detections, both the original way (iterrows
+into a list of dicts, sorted in Python) and with `threat_table` and
+`top_threats`.
+
+Usage:
+    python task2/benchmarks/bench_threat_table.py --sizes 100000 1000000 --top 20
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from threat_detection import DetectionResult, default_rules, threat_table, top_threats
+
+def make_result(n_floods, seed=42):
+    """Detection result with `n_floods` flood hits and a tenth as many scans and brute-force hits."""
+    rng = np.random.default_rng(seed)
+    rules = default_rules()
+    start = np.datetime64('2025-11-28T09:00:00', 's')
+
+    def hits(n, columns):
+        table = {}
+        if 'src_ip' in columns:
+            table['src_ip'] = np.array([f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"
+                                        for i in rng.integers(0, 1 << 20, n)], dtype=object)
+        if 'port' in columns:
+            table['port'] = rng.choice([22, 80, 443, 3389, 21], n)
+        table['time_window'] = pd.to_datetime(start + (rng.integers(0, 86400, n) // 60 * 60).astype('timedelta64[s]'))
+        table['count'] = rng.integers(41, 5000, n)
+        return pd.DataFrame(table)
+
+    result = DetectionResult(rules, {
+        'Port Scan': hits(n_floods // 10, ('src_ip', 'port')),
+        'Brute Force': hits(n_floods // 10, ('src_ip',)),
+        'Traffic Flood': hits(n_floods, ('src_ip',)),
+    }, pd.Series(dtype='int64'))
+    return result
+
+def baseline_threat_table(result):
+    """The original assembly: iterrows over each pattern into a list of dicts."""
+    threats = []
+    for _, row in result.hits['Port Scan'].iterrows():
+        threats.append({'type': 'Port Scan', 'ip': row['src_ip'], 'port': row['port'],
+                        'count': row['count'], 'window': row['time_window']})
+    for _, row in result.hits['Brute Force'].iterrows():
+        threats.append({'type': 'Brute Force', 'ip': row['src_ip'], 'port': 22,
+                        'count': row['count'], 'window': row['time_window']})
+    for _, row in result.hits['Traffic Flood'].iterrows():
+        threats.append({'type': 'Traffic Flood', 'ip': row['src_ip'], 'port': 'N/A',
+                        'count': row['count'], 'window': row['time_window']})
+    return threats
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - t0, result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'detections':>12} {'step':>8} {'baseline s':>11} {'columnar s':>11} {'speedup':>8}")
+    for n_floods in args.sizes:
+        result = make_result(n_floods)
+        base_build_s, threats = timed(baseline_threat_table, result)
+        base_top_s, base_top = timed(lambda t: sorted(t, key=lambda row: -row['count'])[:args.top], threats)
+        frame_s, expected = timed(pd.DataFrame, threats)
+        base_build_s += frame_s
+        build_s, table = timed(threat_table, result)
+        top_s, top = timed(top_threats, table, args.top)
+
+        pd.testing.assert_frame_equal(table, expected, check_dtype=False)
+        pd.testing.assert_frame_equal(top.reset_index(drop=True), pd.DataFrame(base_top), check_dtype=False)
+        n = len(table)
+        print(f"{n:>12,} {'build':>8} {base_build_s:>11.3f} {build_s:>11.3f} {base_build_s / build_s:>7.1f}x")
+        print(f"{n:>12,} {'top-K':>8} {base_top_s:>11.3f} {top_s:>11.3f} {base_top_s / top_s:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
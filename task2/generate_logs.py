@@ -1,41 +1,61 @@
-import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
-import os
+"""Generate synthetic firewall logs.
+
+Without --rows, writes the original 1000-row sample to
+task2/data/sample_firewall_logs.csv. With --rows, generates that many rows
+(10M+ is fine) of skewed background traffic plus attack bursts; see
+task2/src/log_generator.py.
 
-# Create directory if missing
-os.makedirs('task2/data', exist_ok=True)
+Usage:
+    python task2/generate_logs.py
+    python task2/generate_logs.py --rows 10000000 --ips 100000 --output task2/data/big_logs.csv
+    python task2/generate_logs.py --rows 1000000 --flood-share 0.05 --shape decay --burst-seconds 30
+"""
+import argparse
+import os
+import sys
+import time
 
-np.random.seed(42)
-n_logs = 1000
-start_time = datetime(2025, 11, 28, 9, 0, 0)
-timestamps = [start_time + timedelta(seconds=np.random.randint(0, 3600)) for _ in range(n_logs)]
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+from log_generator import Attack, generate_logs, sample_logs, write_logs
 
-src_ips = np.random.choice(['192.168.1.10', '192.168.1.20', '10.0.0.5', '203.0.113.50', '198.51.100.1'], n_logs, p=[0.3, 0.3, 0.2, 0.1, 0.1])
-dst_ip = '192.168.1.1'
-ports = np.random.choice([22, 80, 443, 3389, 21], n_logs)
-actions = np.random.choice(['ACCEPT', 'DENY'], n_logs, p=[0.7, 0.3])
-reasons = np.random.choice(['OK', 'INVALID', 'AUTH_FAIL', 'PORT_SCAN', 'FLOOD'], n_logs)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, help='Rows to generate (default: the original 1000-row sample)')
+    parser.add_argument('--output', default='task2/data/sample_firewall_logs.csv')
+    parser.add_argument('--ips', type=int, default=10_000, help='Distinct background source addresses')
+    parser.add_argument('--ip-skew', type=float, default=1.1, help='Zipf exponent of background activity per address (0 = uniform)')
+    parser.add_argument('--duration', type=int, default=3600, help='Seconds of traffic to spread the rows over')
+    parser.add_argument('--deny-ratio', type=float, default=0.3, help='Share of background traffic that is denied')
+    parser.add_argument('--scan-share', type=float, default=0.01, help='Share of rows from port scans')
+    parser.add_argument('--brute-share', type=float, default=0.005, help='Share of rows from SSH brute forcing')
+    parser.add_argument('--flood-share', type=float, default=0.02, help='Share of rows from floods')
+    parser.add_argument('--attackers', type=int, default=10, help='Attacking addresses per attack kind')
+    parser.add_argument('--bursts', type=int, default=3, help='Bursts per attacking address')
+    parser.add_argument('--burst-seconds', type=int, default=60, help='Length of each burst')
+    parser.add_argument('--shape', choices=['flat', 'decay', 'ramp'], default='flat', help='How events spread within a burst')
+    parser.add_argument('--unsorted', action='store_true', help='Shuffle rows instead of writing them in time order')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
 
-# Embed threats
-for i in range(n_logs):
-    if src_ips[i] == '203.0.113.50' and ports[i] == 22:
-        actions[i] = 'DENY'
-        reasons[i] = 'PORT_SCAN'
-    if src_ips[i] == '198.51.100.1' and ports[i] == 22:
-        actions[i] = 'DENY'
-        reasons[i] = 'AUTH_FAIL'
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    if args.rows is None:
+        data = sample_logs()
+        data.to_csv(args.output, index=False)
+        print(f"SUCCESS: Generated {len(data)} log entries in {args.output}")
+        print(data.head(3))
+        print("Threat preview: Port scans from 203.0.113.50 (~100 events), Brute-force from 198.51.100.1 (~50 events)")
+        return
 
-data = pd.DataFrame({
-    'timestamp': timestamps,
-    'src_ip': src_ips,
-    'dst_ip': dst_ip,
-    'port': ports,
-    'action': actions,
-    'reason': reasons
-})
+    attacks = [Attack(kind, share, args.attackers, args.bursts, args.burst_seconds, args.shape)
+               for kind, share in (('port_scan', args.scan_share), ('brute_force', args.brute_share),
+                                   ('flood', args.flood_share)) if share > 0]
+    t0 = time.perf_counter()
+    data = generate_logs(args.rows, args.ips, args.ip_skew, attacks, args.duration, args.deny_ratio, args.seed,
+                         sort=not args.unsorted)
+    t1 = time.perf_counter()
+    write_logs(data, args.output)
+    t2 = time.perf_counter()
+    print(f"SUCCESS: Generated {len(data):,} log entries in {t1 - t0:.1f} s, wrote {args.output} in {t2 - t1:.1f} s")
 
-data.to_csv('task2/data/sample_firewall_logs.csv', index=False)
-print("SUCCESS: Generated 1000 log entries in task2/data/sample_firewall_logs.csv")
-print(data.head(3))
-print(f"Threat preview: Port scans from 203.0.113.50 (~100 events), Brute-force from 198.51.100.1 (~50 events)")
\ No newline at end of file
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""Background parsing and bounded result caches for the Streamlit app.
+
+Uploads are spooled to disk under their content hash, so the same file
+uploaded twice (or by two users) is parsed once; server-side paths are
+keyed like the finder's --cache (path, size, modification time) so large
+files are not reread just to be identified. Parsing runs in a `ParseJob`
+thread through the column cache, reporting progress, while the app keeps
+rendering. Parsed frames and precomputed window counts are kept in
+`BoundedCache`s that evict the least recently used entries. Spooled
+uploads are pruned the same way (by last use, recorded in the access time),
+sparing any used in the last few minutes.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from log_cache import CACHE_DIR, cache_key, load_logs, remove_stale
+
+UPLOAD_DIR = os.path.join(CACHE_DIR, 'uploads')
+# Spooled uploads kept on disk (with their column caches)
+MAX_UPLOADS = 8
+# Uploads used this recently are never pruned: another session may be reading them
+PRUNE_GRACE_SECONDS = 600
+
+class BoundedCache:
+    """Thread-safe LRU mapping holding at most `max_entries` values."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        """The value for `key`, calling `compute()` to make it on a miss.
+
+        `compute` runs outside the lock, so a slow computation does not
+        block lookups of other keys.
+        """
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+        value = compute()
+        with self.lock:
+            value = self.entries.setdefault(key, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return value
+
+    def discard(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+def spool_upload(fileobj, directory=UPLOAD_DIR, block_size=1 << 20):
+    """Copy an uploaded file to disk, hashing it on the way; returns (path, content key)."""
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha256()
+    tmp = os.path.join(directory, f'.upload-{threading.get_ident()}.tmp')
+    with open(tmp, 'wb') as out:
+        for block in iter(lambda: fileobj.read(block_size), b''):
+            digest.update(block)
+            out.write(block)
+    key = digest.hexdigest()[:16]
+    path = os.path.join(directory, f'{key}.csv')
+    if os.path.exists(path):
+        # Keep the existing copy (and its mtime), so its column cache stays valid
+        os.remove(tmp)
+        mark_used(path)
+    else:
+        os.replace(tmp, path)
+        prune_uploads(directory)
+    return path, key
+
+def mark_used(path):
+    """Record a use of a spooled upload in its access time.
+
+    The mtime stays as it is, since it is part of the column cache key.
+    """
+    st = os.stat(path)
+    os.utime(path, ns=(time.time_ns(), st.st_mtime_ns))
+
+def last_used(path):
+    st = os.stat(path)
+    return max(st.st_atime, st.st_mtime)
+
+def prune_uploads(directory=UPLOAD_DIR, keep=MAX_UPLOADS, grace=PRUNE_GRACE_SECONDS):
+    """Delete all but the `keep` most recently used spooled uploads, with their column caches.
+
+    Uploads used within the last `grace` seconds are kept regardless, and
+    files another session removed first are skipped.
+    """
+    uploads = []
+    for name in os.listdir(directory):
+        if name.endswith('.csv'):
+            path = os.path.join(directory, name)
+            try:
+                uploads.append((last_used(path), path))
+            except FileNotFoundError:
+                continue
+    now = time.time()
+    for used, path in sorted(uploads, reverse=True)[keep:]:
+        if now - used < grace:
+            continue
+        remove_stale(path)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def path_key(path):
+    """Cache key of a server-side log file."""
+    return cache_key(path)
+
+class ParseJob:
+    """Loads a log through the column cache in a background thread.
+
+    Poll `done` and `progress` (0..1); afterwards `logs` holds the frame,
+    or `error` the exception that stopped the parse.
+    """
+
+    def __init__(self, path, cache_dir=CACHE_DIR, chunksize=1_000_000):
+        self.path = path
+        self.progress = 0.0
+        self.logs = None
+        self.hit = None
+        self.error = None
+        self.finished = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(cache_dir, chunksize), daemon=True)
+        self.thread.start()
+
+    @property
+    def done(self):
+        return self.finished.is_set()
+
+    def _run(self, cache_dir, chunksize):
+        try:
+            self.logs, self.hit = load_logs(self.path, cache_dir, chunksize, progress=self._update)
+            self.progress = 1.0
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished.set()
+
+    def _update(self, fraction):
+        self.progress = fraction
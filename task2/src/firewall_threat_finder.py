@@ -1,124 +1,271 @@
 import pandas as pd
 import numpy as np
-import re
-from datetime import datetime, timedelta
 import matplotlib.pyplot as plt
-import seaborn as sns
 import argparse
+import asyncio
 import os
+import sys
 
-# Batch mode flag
-parser = argparse.ArgumentParser()
-parser.add_argument('--batch', action='store_true', help='Run in batch mode (no interactive plot)')
-args = parser.parse_args()
+# The shared profiling (and Task 1 model) modules live in the repo's src/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'src'))
+from threat_detection import (BRUTE_THRESHOLD, FLOOD_THRESHOLD, SCAN_THRESHOLD, WINDOW_SECONDS,
+                              StreamingDetector, ThreatDetector, default_rules, load_rules, threat_table,
+                              top_threats)
+from sharded import EMPTY_LOGS, analyse_shards, expand_shards, sketch_shard, sketch_shards
+from ipv4 import format_ipv4
+from log_cache import CACHE_DIR, load_logs
+from log_generator import sample_logs
+from stage_profiler import StageProfiler
 
-# Step 1: Load sample firewall logs (with auto-generate if missing)
-log_path = 'task2/data/sample_firewall_logs.csv'
-if not os.path.exists(log_path):
+DEFAULT_LOG = 'task2/data/sample_firewall_logs.csv'
+# Options --sketch cannot honour: it only counts denies per IP and window
+SKETCH_UNSUPPORTED = ('rules', 'sliding', 'scan_threshold', 'brute_threshold', 'subnet_prefix', 'subnet_threshold',
+                      'follow', 'ml')
+
+def parse_args(argv=None):
+    # Batch mode flag
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch', action='store_true', help='Run in batch mode (no interactive plot)')
+    parser.add_argument('--stream', action='store_true', help='Read the log in bounded-size chunks instead of loading it whole')
+    parser.add_argument('--chunksize', type=int, default=100_000, help='Rows per chunk in --stream mode')
+    parser.add_argument('--sliding', action='store_true', help='Count events in any trailing window instead of fixed clock buckets')
+    parser.add_argument('--window', type=float, default=WINDOW_SECONDS, help='Detection window length in seconds')
+    parser.add_argument('--scan-threshold', type=int, default=SCAN_THRESHOLD, help='Port scan: more than N denies per IP/port in a window')
+    parser.add_argument('--brute-threshold', type=int, default=BRUTE_THRESHOLD, help='Brute force: more than N SSH auth failures per IP in a window')
+    parser.add_argument('--flood-threshold', type=int, default=FLOOD_THRESHOLD, help='Flood: more than N denies per IP in a window')
+    parser.add_argument('--subnet-prefix', type=int, choices=range(8, 33), metavar='{8..32}', help='Also report floods from whole source networks of this prefix length (e.g. 24)')
+    parser.add_argument('--subnet-threshold', type=int, default=FLOOD_THRESHOLD, help='Subnet flood: more than N denies per source network in a window')
+    parser.add_argument('--rules', help='JSON file of detection rules to use instead of the built-in patterns and thresholds')
+    parser.add_argument('--top', type=int, help='Only list the N detections with the highest counts')
+    parser.add_argument('--log', default=DEFAULT_LOG,
+                        help="Firewall log CSV, a directory or glob of shard CSVs, or '-' for stdin with --follow")
+    parser.add_argument('--workers', type=int, help='Analyse shards in this many processes (default: one per CPU when --log matches several files)')
+    parser.add_argument('--cache', action='store_true', help='Parse the log once into a memory-mapped column cache and reuse it on later runs')
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help='Directory for --cache files')
+    parser.add_argument('--follow', action='store_true', help='Tail the log (or stdin) and print sliding-window alerts as JSON lines')
+    parser.add_argument('--from-start', action='store_true', help='With --follow, read the existing file contents before tailing')
+    parser.add_argument('--stats-interval', type=float, default=10.0, help='With --follow, seconds between throughput/latency reports on stderr')
+    parser.add_argument('--sketch', action='store_true',
+                        help='Bounded-memory mode covering floods only: approximate top denying IPs and flood windows '
+                             '(Count-Min + Space-Saving) instead of exact tables; port scans, brute force and custom rules are not detected')
+    parser.add_argument('--sketch-k', type=int, default=10_000, help='With --sketch, IPs and (IP, window) pairs tracked as heavy-hitter candidates')
+    parser.add_argument('--sketch-epsilon', type=float, default=1e-4, help='With --sketch, per-window counts overcount by at most this fraction of all denies...')
+    parser.add_argument('--sketch-delta', type=float, default=1e-3, help='...except with this probability')
+    parser.add_argument('--ml', nargs='?', const='models/kdd_classifier.npz', metavar='MODEL',
+                        help='Also score every connection with the Task 1 classifier on KDD-style window features (default model: %(const)s)')
+    parser.add_argument('--ml-threshold', type=float, default=0.5, help='With --ml, attack probability above which a connection is flagged')
+    parser.add_argument('--ml-output', help='With --ml, write the verdicts of every (IP, window) to this CSV')
+    parser.add_argument('--profile', nargs='?', const='-', metavar='PATH',
+                        help='Record wall/CPU time and peak RSS per stage; write JSON to PATH (default: stderr)')
+    args = parser.parse_args(argv)
+    if args.sketch:
+        conflicting = [f"--{name.replace('_', '-')}" for name in SKETCH_UNSUPPORTED
+                       if getattr(args, name) != parser.get_default(name)]
+        if conflicting:
+            parser.error(f"--sketch only reports floods and cannot be combined with {', '.join(conflicting)}")
+    return args
+
+def generate_sample_logs(log_path):
     print("CSV missing—auto-generating synthetic logs...")
-    # Auto-generate here
-    np.random.seed(42)
-    n_logs = 1000
-    start_time = datetime(2025, 11, 28, 9, 0, 0)
-    timestamps = [start_time + timedelta(seconds=np.random.randint(0, 3600)) for _ in range(n_logs)]
-    src_ips = np.random.choice(['192.168.1.10', '192.168.1.20', '10.0.0.5', '203.0.113.50', '198.51.100.1'], n_logs, p=[0.3, 0.3, 0.2, 0.1, 0.1])
-    dst_ip = '192.168.1.1'
-    ports = np.random.choice([22, 80, 443, 3389, 21], n_logs)
-    actions = np.random.choice(['ACCEPT', 'DENY'], n_logs, p=[0.7, 0.3])
-    reasons = np.random.choice(['OK', 'INVALID', 'AUTH_FAIL', 'PORT_SCAN', 'FLOOD'], n_logs)
-    for i in range(n_logs):
-        if src_ips[i] == '203.0.113.50' and ports[i] == 22:
-            actions[i] = 'DENY'
-            reasons[i] = 'PORT_SCAN'
-        if src_ips[i] == '198.51.100.1' and ports[i] == 22:
-            actions[i] = 'DENY'
-            reasons[i] = 'AUTH_FAIL'
-    logs = pd.DataFrame({
-        'timestamp': timestamps,
-        'src_ip': src_ips,
-        'dst_ip': dst_ip,
-        'port': ports,
-        'action': actions,
-        'reason': reasons
-    })
+    logs = sample_logs()
     os.makedirs('task2/data', exist_ok=True)
     logs.to_csv(log_path, index=False)
     print(f"Generated and saved {len(logs)} logs to {log_path}")
-else:
-    logs = pd.read_csv(log_path, parse_dates=['timestamp'])
-
-print(f"Loaded {len(logs)} log entries.")
-print(logs.head())
-
-# Step 2: Extract patterns with regex
-ip_pattern = r'(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'
-logs['src_ip_extracted'] = logs['src_ip'].astype(str).str.extract(ip_pattern)[0].fillna('')
-logs['time_window'] = logs['timestamp'].dt.floor('1min')
-
-# Step 3: Detect threats
-threats = []
-
-# Pattern 1: Port Scan - >8 DENY from same IP on same port in 1 min
-scan_logs = logs[(logs['action'] == 'DENY') & (logs['reason'].str.contains('PORT_SCAN|INVALID', na=False))]
-scan_counts = scan_logs.groupby(['src_ip_extracted', 'port', 'time_window']).size().reset_index(name='count')
-scans = scan_counts[scan_counts['count'] > 8]
-for _, row in scans.iterrows():
-    threats.append({
-        'type': 'Port Scan',
-        'ip': row['src_ip_extracted'],
-        'port': row['port'],
-        'count': row['count'],
-        'window': row['time_window']
-    })
-
-# Pattern 2: Brute Force - >4 AUTH_FAIL from same IP on port 22 in 1 min
-brute_logs = logs[(logs['action'] == 'DENY') & (logs['reason'].str.contains('AUTH_FAIL', na=False)) & (logs['port'] == 22)]
-brute_counts = brute_logs.groupby(['src_ip_extracted', 'time_window']).size().reset_index(name='count')
-brutes = brute_counts[brute_counts['count'] > 4]
-for _, row in brutes.iterrows():
-    threats.append({
-        'type': 'Brute Force',
-        'ip': row['src_ip_extracted'],
-        'port': 22,
-        'count': row['count'],
-        'window': row['time_window']
-    })
-
-# Pattern 3: Flood/High Volume - >40 total DENY from IP in 1 min
-flood_counts = logs[logs['action'] == 'DENY'].groupby(['src_ip_extracted', 'time_window']).size().reset_index(name='count')
-floods = flood_counts[flood_counts['count'] > 40]
-for _, row in floods.iterrows():
-    threats.append({
-        'type': 'Traffic Flood',
-        'ip': row['src_ip_extracted'],
-        'port': 'N/A',
-        'count': row['count'],
-        'window': row['time_window']
-    })
-
-# Step 4: Summary table
-threat_df = pd.DataFrame(threats)
-if not threat_df.empty:
-    print("\nThreat Summary:")
-    print(threat_df)
-else:
-    print("\nNo threats detected in sample. (Try lowering thresholds or rerunning with different seed.)")
-
-# Overall stats
-deny_counts = logs[logs['action'] == 'DENY'].groupby('src_ip_extracted').size().sort_values(ascending=False)
-print(f"\nTop Deny IPs:\n{deny_counts.head()}")
-
-# Step 5: Plot denies per IP (batch mode skips show)
-plt.figure(figsize=(8, 5))
-deny_counts.head(10).plot(kind='bar')
-plt.title('Top 10 IPs by Number of Denies')
-plt.xlabel('Source IP')
-plt.ylabel('Deny Count')
-plt.xticks(rotation=45)
-plt.tight_layout()
-plt.savefig('task2/deny_counts_plot.png')
-if not args.batch:
-    plt.show()
-else:
-    plt.close()
-    
\ No newline at end of file
+
+def preview(logs):
+    """First rows for display, with cached packed IPs shown as dotted quads."""
+    head = logs.head().copy()
+    for col in ('src_ip', 'dst_ip'):
+        if pd.api.types.is_unsigned_integer_dtype(head[col].dtype):
+            head[col] = format_ipv4(head[col].to_numpy())
+    return head
+
+def read_chunks(path, chunksize, use_cache=False, cache_dir=CACHE_DIR):
+    """Yield the log in chunks, from the column cache (--cache) or the CSV."""
+    if use_cache:
+        logs, hit = load_logs(path, cache_dir)
+        print(f"{'Using' if hit else 'Built'} column cache for {path}")
+        for start in range(0, len(logs), chunksize):
+            yield logs.iloc[start:start + chunksize]
+    else:
+        yield from pd.read_csv(path, parse_dates=['timestamp'], chunksize=chunksize)
+
+def detect(args, log_path, shards, rules, profiler):
+    """Run the rules over the log the way the flags ask for; returns a DetectionResult.
+
+    Sharded and streamed runs read and detect in one pass, profiled as a
+    single 'load+detect' stage.
+    """
+    if len(shards) > 1 or args.workers:
+        # One worker process per shard at a time; partial results merge exactly
+        with profiler.stage('load+detect'):
+            rows, result = analyse_shards(shards, rules, args.workers, args.sliding,
+                                          args.chunksize if args.stream else None, args.cache, args.cache_dir)
+        print(f"Analysed {rows} log entries from {len(shards)} shard(s) with {args.workers or os.cpu_count()} worker(s).")
+        return result
+    if args.stream:
+        # Rolling state survives across chunk boundaries, so memory is bounded
+        # by the number of distinct keys (or, with --sliding, by the events
+        # inside the window) rather than the number of rows in the file.
+        # --sliding needs the log in time order.
+        with profiler.stage('load+detect'):
+            detector = ThreatDetector(rules)
+            streaming = StreamingDetector(rules)
+            counts = None
+            n_rows = 0
+            for chunk in read_chunks(log_path, args.chunksize, args.cache, args.cache_dir):
+                if n_rows == 0:
+                    print(preview(chunk))
+                n_rows += len(chunk)
+                if args.sliding:
+                    streaming.update(chunk)
+                    continue
+                chunk_counts = detector.count(chunk)
+                counts = chunk_counts if counts is None else counts + chunk_counts
+            if args.sliding:
+                result = streaming.finish()
+                if streaming.out_of_order:
+                    print("Warning: log is not in time order; --stream --sliding results may be incomplete. Sort the log or drop --stream.")
+            else:
+                result = detector.threshold(counts if counts is not None else detector.count(EMPTY_LOGS))
+        print(f"Streamed {n_rows} log entries in chunks of {args.chunksize}.")
+        return result
+    with profiler.stage('load'):
+        if args.cache:
+            logs, hit = load_logs(log_path, args.cache_dir)
+            print(f"{'Using' if hit else 'Built'} column cache for {log_path}")
+        else:
+            logs = pd.read_csv(log_path, parse_dates=['timestamp'])
+    print(f"Loaded {len(logs)} log entries.")
+    print(preview(logs))
+    with profiler.stage('detect'):
+        return ThreatDetector(rules, args.sliding).detect(logs)
+
+def sketch_denies(args, log_path, shards):
+    """(rows, DenySketch) of the log or shards, read in chunks of --chunksize rows."""
+    params = dict(window=args.window, k=args.sketch_k, epsilon=args.sketch_epsilon, delta=args.sketch_delta)
+    if len(shards) > 1 or args.workers:
+        return sketch_shards(shards, params, args.workers, args.chunksize, args.cache, args.cache_dir)
+    return sketch_shard(log_path, params, args.chunksize, args.cache, args.cache_dir)
+
+def report_sketch(args, log_path, shards, profiler):
+    """Bounded-memory run: approximate floods and top denying IPs; returns the deny counts to plot."""
+    with profiler.stage('load+detect'):
+        rows, sketch = sketch_denies(args, log_path, shards)
+    with profiler.stage('report'):
+        floods = sketch.floods(args.flood_threshold)
+        if args.top is not None:
+            floods = floods.head(args.top)
+    bounds = sketch.bounds()
+    print(f"Summarised {rows} log entries ({bounds['denies']} denies) in bounded memory.")
+    print(f"Deny counts per IP overcount by at most {bounds['top_ip_error']:.0f}; per IP and window by at most "
+          f"{bounds['window_error']:.0f} (with probability {1 - bounds['window_error_probability']:g}).")
+    if not floods.empty:
+        print(f"\nApproximate Traffic Floods (more than {args.flood_threshold} denies per IP in {args.window:g} s; "
+              "certain = lower bound also exceeds it):")
+        print(floods)
+    else:
+        print("\nNo floods detected.")
+    return sketch.top_ips(10).set_index('src_ip')['denies'].rename_axis('src_ip_extracted')
+
+def report_ml(args, shards, profiler):
+    """Score the log with the saved classifier and print the (IP, window)s it flags most."""
+    from kdd_model import load_model
+    from log_features import FeatureStream, merge_verdicts, verdict_table
+    model = load_model(args.ml)
+    tables = []
+    rows = 0
+    with profiler.stage('ml'):
+        for path in shards:
+            # Shards are separate streams (e.g. one per appliance), each with its own window context
+            stream = FeatureStream()
+            for chunk in read_chunks(path, args.chunksize, args.cache, args.cache_dir):
+                proba = model.score_records(stream.transform(chunk))
+                tables.append(verdict_table(chunk, proba, args.window, args.ml_threshold))
+                rows += len(chunk)
+        verdicts = merge_verdicts(tables).reset_index() if rows else pd.DataFrame(
+            columns=['src_ip', 'time_window', 'connections', 'proba_sum', 'max_proba', 'flagged'])
+    verdicts.insert(0, 'ip', format_ipv4(verdicts.pop('src_ip').to_numpy(dtype=np.uint32)))
+    verdicts.insert(3, 'mean_proba', (verdicts.pop('proba_sum') / verdicts['connections']).round(4))
+    verdicts = verdicts.sort_values(['flagged', 'mean_proba'], ascending=False, ignore_index=True)
+    if args.ml_output:
+        verdicts.to_csv(args.ml_output, index=False)
+        print(f"Saved ML verdicts to {args.ml_output}")
+    flagged = verdicts[verdicts['mean_proba'] > args.ml_threshold]
+    print(f"\nML verdicts ({model.meta['model']} from {args.ml}): {int(verdicts['flagged'].sum())} of {rows} connections "
+          f"flagged; {len(flagged)} (IP, window) pairs with mean attack probability above {args.ml_threshold}:")
+    print(flagged.head(args.top or 10))
+
+def main(argv=None):
+    args = parse_args(argv)
+    profiler = StageProfiler('task2', enabled=args.profile is not None)
+    if args.rules:
+        rules = load_rules(args.rules)
+    else:
+        rules = default_rules(args.window, args.scan_threshold, args.brute_threshold, args.flood_threshold,
+                              args.subnet_prefix, args.subnet_threshold)
+
+    # Live mode: runs until the input ends (stdin) or Ctrl-C
+    if args.follow:
+        from live_follow import follow
+        try:
+            asyncio.run(follow(args.log, rules, from_start=args.from_start,
+                               batch_size=args.chunksize, stats_interval=args.stats_interval))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    # Step 1: Load sample firewall logs (with auto-generate if missing)
+    log_path = args.log
+    if log_path == DEFAULT_LOG and not os.path.exists(log_path):
+        generate_sample_logs(log_path)
+
+    # Step 2: Run the detection rules (one shared plan, see threat_detection.py)
+    shards = expand_shards(log_path)
+    if not shards:
+        sys.exit(f"No log files match {log_path}")
+    if args.sketch:
+        deny_counts = report_sketch(args, log_path, shards, profiler)
+        plot_deny_counts(deny_counts, args, profiler)
+        profiler.emit(args.profile)
+        return
+    result = detect(args, log_path, shards, rules, profiler)
+
+    # Step 3: Detect threats (sliding results are one row per burst at its peak)
+    # Step 4: Summary table
+    with profiler.stage('report'):
+        threat_df = threat_table(result)
+        if args.top is not None:
+            threat_df = top_threats(threat_df, args.top)
+    if not threat_df.empty:
+        print("\nThreat Summary:")
+        print(threat_df)
+    else:
+        print("\nNo threats detected in sample. (Try lowering thresholds or rerunning with different seed.)")
+    if args.ml:
+        report_ml(args, shards, profiler)
+
+    plot_deny_counts(result.deny_counts, args, profiler)
+    profiler.emit(args.profile)
+
+def plot_deny_counts(deny_counts, args, profiler):
+    # Overall stats
+    print(f"\nTop Deny IPs:\n{deny_counts.head()}")
+
+    # Step 5: Plot denies per IP (batch mode skips show)
+    with profiler.stage('plot'):
+        plt.figure(figsize=(8, 5))
+        deny_counts.head(10).plot(kind='bar')
+        plt.title('Top 10 IPs by Number of Denies')
+        plt.xlabel('Source IP')
+        plt.ylabel('Deny Count')
+        plt.xticks(rotation=45)
+        plt.tight_layout()
+        plt.savefig('task2/deny_counts_plot.png')
+    if not args.batch:
+        plt.show()
+    else:
+        plt.close()
+
+if __name__ == '__main__':
+    main()
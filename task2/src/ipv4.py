@@ -0,0 +1,106 @@
+"""IPv4 addresses as packed uint32 values (0 stands for "no address").
+
+Packing canonicalises addresses, which differs from grouping the raw
+extracted strings as the original finder did:
+
+* leading zeros are dropped, so '01.2.3.4' and '1.2.3.4' are one address;
+* a value with an octet above 255 (e.g. '256.1.1.1') holds no address and
+  packs to 0, so its rows join those without an address (reported with
+  ip '') instead of forming a group of their own.
+"""
+import numpy as np
+import pandas as pd
+
+OCTETS_PATTERN = r'(\d{1,3})\.(\d{1,3})\.(\d{1,3})\.(\d{1,3})'
+
+# Longest dotted quad is 15 bytes; one more byte tells longer values apart
+WIDTH = 16
+
+def parse_dotted_bytes(raw):
+    """Parse a fixed-width bytes array (dtype 'S16') of dotted quads.
+
+    Works column by column on the (rows, 16) uint8 view of the buffer, so
+    the cost is 16 vector steps regardless of the number of rows: digits
+    accumulate into the current octet, and each dot (or the end of the
+    value) shifts the octet into the packed result. Returns (packed, ok);
+    rows that are not exactly a valid dotted quad get ok=False.
+    """
+    # Transposed so each step reads one contiguous column of bytes
+    b = np.ascontiguousarray(np.asarray(raw, dtype=f'S{WIDTH}').view(np.uint8).reshape(-1, WIDTH).T)
+    n = b.shape[1]
+    packed = np.zeros(n, dtype=np.uint32)
+    octet = np.zeros(n, dtype=np.uint32)
+    digits = np.zeros(n, dtype=np.uint8)
+    dots = np.zeros(n, dtype=np.uint8)
+    ended = np.zeros(n, dtype=bool)
+    ok = np.ones(n, dtype=bool)
+    for c in b:
+        d = c - np.uint8(ord('0'))
+        is_digit = d <= 9
+        is_end = c == 0
+        # The first padding byte closes the last octet like a dot does
+        flush = (c == ord('.')) | (is_end & ~ended)
+        ok &= (is_digit | flush | is_end) & ~(flush & (digits == 0)) & (octet <= 255)
+        packed = np.where(flush, (packed << 8) | octet, packed)
+        octet = np.where(is_digit, octet * 10 + d, np.where(flush, 0, octet))
+        digits = np.where(is_digit, digits + 1, np.where(flush, 0, digits))
+        dots += flush & ~is_end
+        ended |= is_end
+        ok &= digits <= 3
+    # A 16th byte that is not padding means the value was longer than a quad
+    ok &= ended & (dots == 3)
+    return np.where(ok, packed, 0).astype(np.uint32), ok
+
+def parse_ipv4_regex(values):
+    """Pack the first dotted quad found anywhere in each value (0 if none).
+
+    The regex runs once per distinct value, not once per row.
+    """
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object).astype(str))
+    octets = pd.Series(uniques, dtype=object).str.extract(OCTETS_PATTERN).astype(float).to_numpy()
+    valid = ~np.isnan(octets).any(axis=1) & (np.nan_to_num(octets) <= 255).all(axis=1)
+    octets = np.where(valid[:, None], np.nan_to_num(octets), 0).astype(np.uint32)
+    packed = (octets[:, 0] << 24) | (octets[:, 1] << 16) | (octets[:, 2] << 8) | octets[:, 3]
+    return np.append(packed, np.uint32(0))[codes]
+
+def parse_ipv4(values):
+    """Pack IPv4 addresses into uint32, 0 where a value holds no address.
+
+    Plain dotted quads (the normal case) go through the byte-level parser;
+    anything else (surrounding text, non-ASCII) falls back to regex
+    extraction of the first dotted quad in the value. Both paths merge
+    leading-zero forms and reject octets above 255 (see the module
+    docstring).
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_unsigned_integer_dtype(values.dtype):
+        return values.to_numpy(dtype=np.uint32)
+    # Hashing the strings is cheaper than parsing them, so parse each
+    # distinct value once; with spoofed sources this degrades gracefully to
+    # one byte-level parse per row
+    codes, uniques = pd.factorize(values)
+    uniques = pd.Series(uniques, dtype=object)
+    try:
+        raw = np.asarray(uniques.to_numpy(dtype=object), dtype=f'S{WIDTH}')
+    except UnicodeEncodeError:
+        return parse_ipv4_regex(values)
+    packed, ok = parse_dotted_bytes(raw)
+    if not ok.all():
+        packed[~ok] = parse_ipv4_regex(uniques[~ok])
+    return np.append(packed, np.uint32(0))[codes]
+
+def format_ipv4(packed):
+    """Dotted-quad strings for packed addresses, with '' for 0."""
+    packed = np.asarray(packed, dtype=np.uint32)
+    octets = [(packed >> shift) & 0xFF for shift in (24, 16, 8, 0)]
+    dotted = octets[0].astype(str).astype(object)
+    for octet in octets[1:]:
+        dotted = dotted + '.' + octet.astype(str).astype(object)
+    return np.where(packed == 0, '', dotted).astype(object)
+
+def subnet_mask(prefix):
+    """Netmask of a /prefix network as a uint32, e.g. 24 -> 255.255.255.0."""
+    return np.uint32((0xFFFFFFFF << (32 - prefix)) & 0xFFFFFFFF)
+
+def format_subnets(networks, prefix):
+    return np.asarray([f"{ip}/{prefix}" for ip in format_ipv4(networks)], dtype=object)
@@ -0,0 +1,224 @@
+"""Real-time follow mode: tail a growing firewall log and emit alerts as JSON lines."""
+import asyncio
+import io
+import json
+import os
+import sys
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from threat_detection import StreamingDetector
+
+LOG_COLUMNS = ['timestamp', 'src_ip', 'dst_ip', 'port', 'action', 'reason']
+
+class FollowStats:
+    """Throughput and end-to-end latency counters for follow mode.
+
+    Latency is measured per line from the moment it was read to the moment
+    the batch containing it has been analysed and its alerts written.
+    """
+
+    def __init__(self, reservoir=10_000):
+        self.started = time.monotonic()
+        self.lines = 0
+        self.bad_lines = 0
+        self.alerts = 0
+        self.batches = 0
+        self.latencies = deque(maxlen=reservoir)
+
+    def record(self, n_lines, n_bad, n_alerts, arrivals, done):
+        self.lines += n_lines
+        self.bad_lines += n_bad
+        self.alerts += n_alerts
+        self.batches += 1
+        self.latencies.extend(done - arrivals)
+
+    def snapshot(self):
+        elapsed = time.monotonic() - self.started
+        lat = np.fromiter(self.latencies, dtype=float) * 1000
+        return {
+            'event': 'stats',
+            'lines': self.lines,
+            'bad_lines': self.bad_lines,
+            'alerts': self.alerts,
+            'batches': self.batches,
+            'elapsed_s': round(elapsed, 3),
+            'lines_per_s': round(self.lines / elapsed, 1) if elapsed > 0 else 0.0,
+            'latency_ms_p50': round(float(np.percentile(lat, 50)), 3) if len(lat) else None,
+            'latency_ms_p99': round(float(np.percentile(lat, 99)), 3) if len(lat) else None,
+            'latency_ms_max': round(float(lat.max()), 3) if len(lat) else None,
+        }
+
+async def tail_file(path, queue, from_start=False, poll_interval=0.2):
+    """Put complete lines appended to `path` on the queue, following truncation and rotation."""
+    f = open(path, 'rb')
+    if not from_start:
+        f.seek(0, os.SEEK_END)
+    inode = os.fstat(f.fileno()).st_ino
+    pending = b''
+    n_read = 0
+    try:
+        while True:
+            line = f.readline()
+            if line:
+                pending += line
+                if pending.endswith(b'\n'):
+                    await queue.put((pending, time.monotonic()))
+                    pending = b''
+                    n_read += 1
+                    if n_read % 1000 == 0:
+                        # A non-full queue never suspends put(); let analysis run
+                        await asyncio.sleep(0)
+                continue
+            await asyncio.sleep(poll_interval)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if st.st_ino != inode:
+                # Log rotated: first drain what was written to the old file
+                # since the last read (as tail -F does), then continue with
+                # the new file from its beginning
+                for line in (pending + f.read()).splitlines(keepends=True):
+                    await queue.put((line if line.endswith(b'\n') else line + b'\n', time.monotonic()))
+                f.close()
+                f = open(path, 'rb')
+                inode = os.fstat(f.fileno()).st_ino
+                pending = b''
+            elif st.st_size < f.tell():
+                # Truncated in place
+                f.seek(0)
+                pending = b''
+    finally:
+        f.close()
+
+async def read_stream(stream, queue):
+    """Put every line of a pipe (e.g. stdin from a syslog relay) on the queue, then None."""
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=2 ** 20)
+    try:
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), stream)
+        while line := await reader.readline():
+            await queue.put((line, time.monotonic()))
+    except ValueError:
+        # Regular files redirected to stdin cannot be registered as pipes;
+        # read them in blocks of lines off the event loop instead
+        while lines := await loop.run_in_executor(None, stream.buffer.readlines, 1 << 16):
+            arrived = time.monotonic()
+            for line in lines:
+                await queue.put((line, arrived))
+    await queue.put(None)
+
+def parse_lines(lines):
+    """Parse raw CSV lines into a log frame; returns (logs, number of unusable lines)."""
+    lines = [line for line in lines if line.strip() and not line.startswith(b'timestamp,')]
+    if not lines:
+        return pd.DataFrame(columns=LOG_COLUMNS), 0
+    logs = pd.read_csv(io.BytesIO(b''.join(lines)), names=LOG_COLUMNS, header=None,
+                       dtype=str, on_bad_lines='skip')
+    logs['timestamp'] = pd.to_datetime(logs['timestamp'], errors='coerce', format='mixed')
+    logs['port'] = pd.to_numeric(logs['port'], errors='coerce')
+    bad = len(lines) - int(logs['timestamp'].notna().sum())
+    return logs, bad
+
+def alert_record(event, rule, key, count, start_ns):
+    ip, port = rule.display(key)
+    return {
+        'event': event,
+        'type': rule.name,
+        'ip': ip,
+        'port': None if port == 'N/A' else int(port),
+        'count': int(count),
+        'window_start': pd.Timestamp(start_ns).isoformat(),
+    }
+
+async def next_batch(queue, batch_size, linger):
+    """Wait for a line, then gather more for at most `linger` seconds.
+
+    Returns (batch, done). A quiet feed gives small batches after `linger`
+    (low latency); under load batches fill up to `batch_size` (throughput).
+    """
+    item = await queue.get()
+    if item is None:
+        return [], True
+    batch = [item]
+    deadline = time.monotonic() + linger
+    while len(batch) < batch_size:
+        if queue.empty():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+        else:
+            item = queue.get_nowait()
+        if item is None:
+            return batch, True
+        batch.append(item)
+    return batch, False
+
+async def analyse(queue, detector, stats, out, batch_size, linger):
+    """Analyse queued lines batch by batch and write alerts as JSON lines."""
+    rules = {rule.name: rule for rule in detector.rules}
+    while True:
+        batch, done = await next_batch(queue, batch_size, linger)
+        if batch:
+            logs, bad = parse_lines([line for line, _ in batch])
+            alerts = detector.update(logs) if len(logs) else []
+            if detector.last_ts is not None:
+                detector.evict(detector.last_ts)
+            for name, key, count, start_ns, ts_ns in alerts:
+                record = alert_record('alert', rules[name], key, count, start_ns)
+                record['detected_at'] = pd.Timestamp(ts_ns).isoformat()
+                out.write(json.dumps(record) + '\n')
+            for name, episodes in detector.pop_episodes().items():
+                for key, count, start_ns in episodes:
+                    out.write(json.dumps(alert_record('episode_end', rules[name], key, count, start_ns)) + '\n')
+            out.flush()
+            arrivals = np.fromiter((arrived for _, arrived in batch), dtype=float, count=len(batch))
+            stats.record(len(batch), bad, len(alerts), arrivals, time.monotonic())
+        if done:
+            break
+    detector.finish()
+    for name, episodes in detector.pop_episodes().items():
+        for key, count, start_ns in episodes:
+            out.write(json.dumps(alert_record('episode_end', rules[name], key, count, start_ns)) + '\n')
+    out.flush()
+
+async def report_stats(stats, interval, err):
+    while True:
+        await asyncio.sleep(interval)
+        err.write(json.dumps(stats.snapshot()) + '\n')
+        err.flush()
+
+async def follow(path, rules=None, from_start=False, batch_size=5000, stats_interval=10.0, poll_interval=0.2,
+                 linger=0.05, out=sys.stdout, err=sys.stderr):
+    """Follow `path` ('-' for stdin) until the input ends or the task is cancelled.
+
+    `rules` defaults to the built-in patterns. Alerts are written to `out`
+    as soon as a key crosses its rule's threshold (event "alert") and again
+    with the peak count once the burst is over (event "episode_end"). Stats
+    snapshots go to `err` every `stats_interval` seconds and once at exit.
+    """
+    detector = StreamingDetector(rules)
+    stats = FollowStats()
+    # Bounded so a slow analysis step pushes back on the reader
+    queue = asyncio.Queue(maxsize=batch_size * 4)
+    if path == '-':
+        reader = asyncio.create_task(read_stream(sys.stdin, queue))
+    else:
+        reader = asyncio.create_task(tail_file(path, queue, from_start, poll_interval))
+    reporter = asyncio.create_task(report_stats(stats, stats_interval, err))
+    try:
+        await analyse(queue, detector, stats, out, batch_size, linger)
+    finally:
+        reader.cancel()
+        reporter.cancel()
+        err.write(json.dumps(stats.snapshot()) + '\n')
+        err.flush()
+    return stats
@@ -0,0 +1,169 @@
+"""Columnar on-disk cache of parsed firewall logs.
+
+Each source CSV is parsed once into one raw binary file per column
+(int64 nanosecond timestamps, uint32 IPs, int32 ports, uint8 codes for
+action and reason) plus a small JSON header. Later runs memory-map the
+columns instead of re-parsing dates and IPs, so re-analysing the same log
+with different thresholds skips the dominant parse cost.
+
+The cache key is the source's absolute path, size and mtime, so an edited
+or replaced log is re-parsed automatically.
+"""
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from ipv4 import parse_ipv4
+
+CACHE_DIR = 'task2/data/.cache'
+# Bump when the on-disk layout or parsing changes to invalidate old caches
+CACHE_VERSION = 2
+# Stored for missing ports; load_cache turns it back into NaN
+MISSING_PORT = np.iinfo(np.int32).min
+
+COLUMN_DTYPES = {
+    'timestamp': 'int64',
+    'src_ip': 'uint32',
+    'dst_ip': 'uint32',
+    'port': 'int32',
+    'action': 'uint8',
+    'reason': 'uint8',
+}
+CATEGORICAL_COLUMNS = ['action', 'reason']
+
+def cache_key(path):
+    st = os.stat(path)
+    ident = f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}|{CACHE_VERSION}"
+    return hashlib.sha1(ident.encode()).hexdigest()[:16]
+
+def cache_path(path, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, f"{os.path.basename(path)}.{cache_key(path)}")
+
+def build_cache(path, cache_dir=CACHE_DIR, chunksize=1_000_000, progress=None):
+    """Parse `path` chunk by chunk into a column cache; returns the cache directory.
+
+    `progress`, if given, is called after each chunk with the fraction of
+    the file read so far.
+    """
+    size = os.path.getsize(path)
+    target = cache_path(path, cache_dir)
+    tmp = target + '.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    vocab = {col: [] for col in CATEGORICAL_COLUMNS}
+    n_rows = 0
+    missing_ports = 0
+    files = {col: open(os.path.join(tmp, f'{col}.bin'), 'wb') for col in COLUMN_DTYPES}
+    source = open(path, 'rb')
+    try:
+        for chunk in pd.read_csv(source, parse_dates=['timestamp'], chunksize=chunksize):
+            columns = {
+                'timestamp': chunk['timestamp'].to_numpy().astype('datetime64[ns]').astype('int64'),
+                'src_ip': parse_ipv4(chunk['src_ip']),
+                'dst_ip': parse_ipv4(chunk['dst_ip']),
+                'port': port_values(chunk['port']),
+            }
+            missing_ports += int((columns['port'] == MISSING_PORT).sum())
+            for col in CATEGORICAL_COLUMNS:
+                # Code 0 is reserved for missing values; new categories are
+                # appended so codes written by earlier chunks stay valid
+                values = chunk[col].astype(object)
+                known = {v: i + 1 for i, v in enumerate(vocab[col])}
+                for v in pd.unique(values.dropna()):
+                    if v not in known:
+                        vocab[col].append(v)
+                        known[v] = len(vocab[col])
+                if len(vocab[col]) > 255:
+                    raise ValueError(f"Column '{col}' has more than 255 distinct values; cannot cache it as uint8 codes")
+                columns[col] = values.map(known).fillna(0).astype('uint8').to_numpy()
+            for col, values in columns.items():
+                values.astype(COLUMN_DTYPES[col]).tofile(files[col])
+            n_rows += len(chunk)
+            if progress is not None:
+                progress(min(source.tell() / max(size, 1), 1.0))
+    finally:
+        source.close()
+        for f in files.values():
+            f.close()
+    with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+        json.dump({'source': os.path.abspath(path), 'rows': n_rows, 'version': CACHE_VERSION,
+                   'dtypes': COLUMN_DTYPES, 'vocab': vocab, 'missing_ports': missing_ports}, f)
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp, target)
+    return target
+
+def port_values(ports):
+    """Ports as int32 with MISSING_PORT for gaps, as the CSV path reads them.
+
+    Values that int32 cannot hold exactly (fractions, out of range) would
+    be reported differently from an uncached run, so they are rejected.
+    """
+    values = pd.to_numeric(ports, errors='coerce').to_numpy(dtype='float64')
+    present = ~np.isnan(values)
+    valid = (values[present] == np.floor(values[present])) & (values[present] > MISSING_PORT) \
+        & (values[present] <= np.iinfo(np.int32).max)
+    if not valid.all():
+        raise ValueError(f"Port {values[present][~valid][0]!r} is not an integer the cache can store")
+    return np.where(present, values, MISSING_PORT).astype('int32')
+
+def load_cache(target):
+    """Memory-map a column cache as a log frame.
+
+    `src_ip` and `dst_ip` stay packed uint32 (0 = no address), `action` and
+    `reason` are categoricals over the cached vocabularies. `port` is the
+    int32 column, or float64 with NaN for gaps if the log had missing ports,
+    as pandas reads such a CSV column.
+    """
+    with open(os.path.join(target, 'meta.json')) as f:
+        meta = json.load(f)
+    n_rows = meta['rows']
+
+    def column(col):
+        if n_rows == 0:
+            return np.empty(0, dtype=meta['dtypes'][col])
+        return np.memmap(os.path.join(target, f'{col}.bin'), dtype=meta['dtypes'][col], mode='r', shape=(n_rows,))
+
+    port = column('port')
+    if meta['missing_ports']:
+        port = np.where(port == MISSING_PORT, np.nan, port)
+    logs = pd.DataFrame({
+        'timestamp': pd.to_datetime(column('timestamp').view('datetime64[ns]')),
+        'src_ip': column('src_ip'),
+        'dst_ip': column('dst_ip'),
+        'port': port,
+    }, copy=False)
+    for col in CATEGORICAL_COLUMNS:
+        # Shift codes down by one so the reserved 0 becomes pandas' -1 (NaN)
+        codes = column(col).astype('int16') - 1
+        logs[col] = pd.Categorical.from_codes(codes, categories=meta['vocab'][col])
+    return logs
+
+def remove_stale(path, cache_dir=CACHE_DIR):
+    """Delete caches built from earlier versions of the same source file."""
+    if not os.path.isdir(cache_dir):
+        return
+    source = os.path.abspath(path)
+    for name in os.listdir(cache_dir):
+        meta_path = os.path.join(cache_dir, name, 'meta.json')
+        if not name.startswith(f"{os.path.basename(path)}.") or not os.path.exists(meta_path):
+            continue
+        with open(meta_path) as f:
+            if json.load(f).get('source') == source:
+                shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+
+def load_logs(path, cache_dir=CACHE_DIR, chunksize=1_000_000, progress=None):
+    """Load a firewall log through the column cache, building it on first use.
+
+    Returns (logs, hit) where `hit` tells whether an existing cache was used.
+    `progress` is passed on to `build_cache`.
+    """
+    target = cache_path(path, cache_dir)
+    hit = os.path.exists(os.path.join(target, 'meta.json'))
+    if not hit:
+        remove_stale(path, cache_dir)
+        build_cache(path, cache_dir, chunksize, progress)
+    return load_cache(target), hit
@@ -0,0 +1,172 @@
+"""KDD Cup 99 style connection features computed from firewall logs.
+
+Each log row is treated as one connection and described with the columns
+the Task 1 classifier was trained on, so its saved model
+(models/kdd_classifier.npz) can score firewall traffic:
+
+* intrinsic: protocol 'tcp', service from the destination port, flag
+  'SF' for accepted connections, 'S0' (half-open) for denied floods and
+  'REJ' for other denies; num_failed_logins for AUTH_FAIL;
+* time-based, over the trailing 2 seconds: `count` (same destination
+  host), `srv_count` (same service) and their SYN-error / reject /
+  same-service / different-host rates;
+* host-based, over the trailing 100 connections: the `dst_host_*` counts
+  and rates.
+
+Payload features (bytes, content, duration) are not in firewall logs and
+are left at 0, so verdicts are a learned second opinion next to the
+threshold rules rather than a replacement for them. All windows come from
+one lexsort + searchsorted per grouping (`sliding_window_counts`), and
+`FeatureStream` carries the trailing context across chunks, so features
+of a streamed log equal those of the whole log (which must be in time
+order, as for --stream --sliding).
+"""
+import numpy as np
+import pandas as pd
+
+from ipv4 import parse_ipv4
+from threat_detection import category_flags, code_column, sliding_window_counts
+
+# KDD's time-based features look back 2 seconds, host-based ones 100 connections
+TIME_WINDOW_SECONDS = 2
+HOST_WINDOW_CONNECTIONS = 100
+
+# KDD service names of common ports; anything else is 'other'
+SERVICES = {20: 'ftp_data', 21: 'ftp', 22: 'ssh', 23: 'telnet', 25: 'smtp', 53: 'domain', 79: 'finger', 80: 'http',
+            110: 'pop_3', 111: 'sunrpc', 113: 'auth', 119: 'nntp', 143: 'imap4', 179: 'bgp', 389: 'ldap',
+            443: 'http_443', 513: 'login', 514: 'shell', 8001: 'http_8001'}
+FLAGS = ['SF', 'S0', 'REJ']
+
+def window_sums(group, ts, window, weights):
+    """Per-event count of its group's events in the trailing window, plus weighted sums over the same events.
+
+    Returns (counts, [sums]) in the events' original order.
+    """
+    order, counts, starts = sliding_window_counts(group, ts, window)
+    out = np.empty(len(order), dtype=np.int64)
+    out[order] = counts
+    sums = []
+    for w in weights:
+        cum = np.concatenate([[0], np.cumsum(w[order], dtype=np.int64)])
+        s = np.empty(len(order), dtype=np.int64)
+        s[order] = cum[np.arange(1, len(order) + 1)] - cum[starts]
+        sums.append(s)
+    return out, sums
+
+def rate(part, whole):
+    return np.divide(part, whole, out=np.zeros(len(part)), where=whole > 0).round(2)
+
+def connection_columns(logs):
+    """Per-row arrays the features are computed from: times, hosts, services, flags, failed logins."""
+    ts = logs['timestamp']
+    ports = pd.to_numeric(pd.Series(logs['port']), errors='coerce').fillna(-1).to_numpy(dtype=np.int64)
+    action_codes, action_uniques = code_column(logs['action'], sort=False)
+    reason_codes, reason_uniques = code_column(logs['reason'], sort=False)
+    deny = np.append(action_uniques == 'DENY', False)[action_codes]
+    flood = category_flags(reason_uniques, 'FLOOD')[reason_codes]
+    return {
+        'ts': ts.to_numpy().astype('datetime64[ns]').astype(np.int64),
+        'host': parse_ipv4(logs['dst_ip']).astype(np.int64),
+        'port': ports,
+        'serror': deny & flood,
+        'rerror': deny & ~flood,
+        'failed_login': category_flags(reason_uniques, 'AUTH_FAIL')[reason_codes],
+    }
+
+def kdd_features(cols, index):
+    """KDD records frame (standard column names) from `connection_columns` arrays.
+
+    `index` numbers the connections in stream order for the 100-connection
+    windows.
+    """
+    n = len(cols['ts'])
+    ts, port = cols['ts'], cols['port']
+    serror, rerror = cols['serror'].astype(np.int64), cols['rerror'].astype(np.int64)
+    # Dense group codes keep the composite keys of sliding_window_counts small
+    host = pd.factorize(cols['host'])[0].astype(np.int64)
+    host_port = pd.factorize(cols['host'] * 65536 + (port + 1))[0].astype(np.int64)
+    port_group = pd.factorize(port)[0].astype(np.int64)
+    # Time-based: same host, same service, same host and service in the last 2 s
+    count, (c_serror, c_rerror) = window_sums(host, ts, TIME_WINDOW_SECONDS * 10 ** 9, [serror, rerror])
+    srv_count, (s_serror, s_rerror) = window_sums(port_group, ts, TIME_WINDOW_SECONDS * 10 ** 9, [serror, rerror])
+    same_srv, _ = window_sums(host_port, ts, TIME_WINDOW_SECONDS * 10 ** 9, [])
+    # Host-based: the same, over the last 100 connections
+    dh_count, (dh_serror, dh_rerror) = window_sums(host, index, HOST_WINDOW_CONNECTIONS, [serror, rerror])
+    dh_srv_count, (dhs_serror, dhs_rerror) = window_sums(host_port, index, HOST_WINDOW_CONNECTIONS, [serror, rerror])
+    srv_any_host, _ = window_sums(port_group, index, HOST_WINDOW_CONNECTIONS, [])
+
+    service = pd.Categorical(pd.Series(port).map(SERVICES).fillna('other'))
+    flag = pd.Categorical.from_codes(np.where(serror == 1, 1, np.where(rerror == 1, 2, 0)), categories=FLAGS)
+    zeros = np.zeros(n, dtype=np.float32)
+    return pd.DataFrame({
+        'duration': zeros, 'protocol_type': pd.Categorical.from_codes(np.zeros(n, dtype=np.int8), ['tcp']),
+        'service': service, 'flag': flag, 'src_bytes': zeros, 'dst_bytes': zeros, 'land': zeros,
+        'wrong_fragment': zeros, 'urgent': zeros, 'hot': zeros,
+        'num_failed_logins': cols['failed_login'].astype(np.float32), 'logged_in': zeros,
+        'num_compromised': zeros, 'root_shell': zeros, 'su_attempted': zeros, 'num_root': zeros,
+        'num_file_creations': zeros, 'num_shells': zeros, 'num_access_files': zeros, 'num_outbound_cmds': zeros,
+        'is_host_login': zeros, 'is_guest_login': zeros,
+        # KDD caps the 2-second counts at 511
+        'count': np.minimum(count, 511), 'srv_count': np.minimum(srv_count, 511),
+        'serror_rate': rate(c_serror, count), 'srv_serror_rate': rate(s_serror, srv_count),
+        'rerror_rate': rate(c_rerror, count), 'srv_rerror_rate': rate(s_rerror, srv_count),
+        'same_srv_rate': rate(same_srv, count), 'diff_srv_rate': rate(count - same_srv, count),
+        'srv_diff_host_rate': rate(srv_count - same_srv, srv_count),
+        'dst_host_count': dh_count, 'dst_host_srv_count': dh_srv_count,
+        'dst_host_same_srv_rate': rate(dh_srv_count, dh_count),
+        'dst_host_diff_srv_rate': rate(dh_count - dh_srv_count, dh_count),
+        # Source ports are not logged
+        'dst_host_same_src_port_rate': zeros,
+        'dst_host_srv_diff_host_rate': rate(srv_any_host - dh_srv_count, srv_any_host),
+        'dst_host_serror_rate': rate(dh_serror, dh_count), 'dst_host_srv_serror_rate': rate(dhs_serror, dh_srv_count),
+        'dst_host_rerror_rate': rate(dh_rerror, dh_count), 'dst_host_srv_rerror_rate': rate(dhs_rerror, dh_srv_count),
+    })
+
+class FeatureStream:
+    """KDD features of a time-ordered log fed in chunks.
+
+    The rows of the previous chunk that can still fall inside a window
+    (the last 2 seconds and the last 100 connections) are kept as context
+    and prepended to the next chunk, so chunk boundaries do not change any
+    feature. Memory is bounded by the chunk plus that context.
+    """
+
+    def __init__(self):
+        self.context = None
+        self.seen = 0
+
+    def transform(self, logs):
+        """Features of the rows of `logs` (a records frame aligned with it)."""
+        cols = connection_columns(logs)
+        n_context = 0
+        if self.context is not None:
+            n_context = len(self.context['ts'])
+            cols = {name: np.concatenate([self.context[name], values]) for name, values in cols.items()}
+        index = np.arange(self.seen - n_context, self.seen + len(logs), dtype=np.int64)
+        features = kdd_features(cols, index).iloc[n_context:].reset_index(drop=True)
+        self.seen += len(logs)
+
+        ts = cols['ts']
+        if len(ts):
+            # Keep what the next chunk's windows can still reach
+            keep_from = min(max(len(ts) - HOST_WINDOW_CONNECTIONS, 0),
+                            int(np.searchsorted(ts, ts[-1] - TIME_WINDOW_SECONDS * 10 ** 9, side='right')))
+            self.context = {name: values[keep_from:] for name, values in cols.items()}
+        return features
+
+def verdict_table(logs, proba, window=60, threshold=0.5):
+    """Per (source IP, window) connections, summed and max attack probability, and connections above `threshold`.
+
+    Tables of separate chunks combine with `merge_verdicts`.
+    """
+    ts = logs['timestamp'].dt.floor(f'{window}s')
+    frame = pd.DataFrame({'src_ip': parse_ipv4(logs['src_ip']), 'time_window': ts.to_numpy(),
+                          'proba': proba, 'flagged': proba > threshold})
+    return frame.groupby(['src_ip', 'time_window']).agg(connections=('proba', 'size'), proba_sum=('proba', 'sum'),
+                                                        max_proba=('proba', 'max'), flagged=('flagged', 'sum'))
+
+def merge_verdicts(tables):
+    """Combine `verdict_table`s of separate chunks or shards."""
+    merged = pd.concat(tables).groupby(level=[0, 1])
+    return merged.agg(connections=('connections', 'sum'), proba_sum=('proba_sum', 'sum'),
+                      max_proba=('max_proba', 'max'), flagged=('flagged', 'sum'))
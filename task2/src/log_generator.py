@@ -0,0 +1,180 @@
+"""Synthetic firewall logs at any volume, built with array operations only.
+
+`generate_logs` draws background traffic from a skewed (Zipf-like)
+population of source addresses and overlays attack bursts described by
+`Attack` specs: which pattern, what share of all rows, how many attacking
+addresses, how many bursts each, and the burst length and shape. The
+returned frame uses the column cache layout (packed uint32 addresses,
+categorical action/reason), so 10M+ rows fit in a few hundred MB and feed
+ThreatDetector directly; `write_logs` writes it as a CSV in the
+sample_firewall_logs.csv format.
+
+`sample_logs` reproduces the original 1000-row sample exactly.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from ipv4 import format_ipv4, parse_ipv4
+
+ACTIONS = ['ACCEPT', 'DENY']
+REASONS = ['OK', 'INVALID', 'AUTH_FAIL', 'PORT_SCAN', 'FLOOD']
+PORTS = [22, 80, 443, 3389, 21]
+ATTACK_KINDS = ('port_scan', 'brute_force', 'flood')
+BURST_SHAPES = ('flat', 'decay', 'ramp')
+START = '2025-11-28 09:00:00'
+DST_IP = '192.168.1.1'
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Background sources live in 10.0.0.0/8, attackers in 198.18.0.0/15 (the
+# benchmarking range), so the two never collide
+BACKGROUND_NET = 10 << 24
+ATTACKER_NET = (198 << 24) | (18 << 16)
+
+@dataclass(frozen=True)
+class Attack:
+    """A family of attack bursts mixed into generated logs.
+
+    `share` is the fraction of all rows it contributes, spread over
+    `attackers` source addresses with `bursts` bursts each. Events of a
+    burst fall within `burst_seconds`: evenly ('flat'), front-loaded
+    ('decay') or building up towards the end ('ramp').
+    """
+    kind: str
+    share: float
+    attackers: int = 10
+    bursts: int = 3
+    burst_seconds: int = 60
+    shape: str = 'flat'
+
+    def __post_init__(self):
+        if self.kind not in ATTACK_KINDS:
+            raise ValueError(f"Unknown attack kind '{self.kind}'; expected one of {', '.join(ATTACK_KINDS)}")
+        if self.shape not in BURST_SHAPES:
+            raise ValueError(f"Unknown burst shape '{self.shape}'; expected one of {', '.join(BURST_SHAPES)}")
+        if not 0 <= self.share < 1 or self.attackers < 1 or self.bursts < 1 or self.burst_seconds < 1:
+            raise ValueError(f"Invalid attack spec: {self}")
+
+DEFAULT_ATTACKS = (
+    Attack('port_scan', 0.01),
+    Attack('brute_force', 0.005, shape='ramp'),
+    Attack('flood', 0.02, shape='decay'),
+)
+
+def logs_frame(offsets, src_ip, port, action, reason, start=START, dst_ip=DST_IP):
+    """Log frame in the column cache layout.
+
+    `offsets` are whole seconds after `start`; `action` and `reason` are
+    codes into ACTIONS and REASONS.
+    """
+    n = len(offsets)
+    return pd.DataFrame({
+        'timestamp': pd.Timestamp(start) + pd.to_timedelta(np.asarray(offsets, dtype=np.int64), unit='s'),
+        'src_ip': np.asarray(src_ip, dtype=np.uint32),
+        'dst_ip': np.full(n, parse_ipv4([dst_ip])[0], dtype=np.uint32),
+        'port': np.asarray(port, dtype=np.uint16),
+        'action': pd.Categorical.from_codes(np.asarray(action, dtype=np.int8), categories=ACTIONS),
+        'reason': pd.Categorical.from_codes(np.asarray(reason, dtype=np.int8), categories=REASONS),
+    })
+
+def sample_logs(n_logs=1000, seed=42):
+    """The original 1000-row sample (task2/data/sample_firewall_logs.csv), row for row."""
+    # Legacy global seeding and draw order keep the output identical
+    np.random.seed(seed)
+    offsets = np.random.randint(0, 3600, n_logs)
+    src_ips = np.random.choice(['192.168.1.10', '192.168.1.20', '10.0.0.5', '203.0.113.50', '198.51.100.1'], n_logs,
+                               p=[0.3, 0.3, 0.2, 0.1, 0.1])
+    ports = np.random.choice(PORTS, n_logs)
+    actions = np.random.choice(ACTIONS, n_logs, p=[0.7, 0.3])
+    reasons = np.random.choice(REASONS, n_logs)
+    # Embed threats
+    scan = (src_ips == '203.0.113.50') & (ports == 22)
+    brute = (src_ips == '198.51.100.1') & (ports == 22)
+    actions[scan | brute] = 'DENY'
+    reasons[scan] = 'PORT_SCAN'
+    reasons[brute] = 'AUTH_FAIL'
+    return pd.DataFrame({
+        'timestamp': pd.Timestamp('2025-11-28 09:00:00') + pd.to_timedelta(offsets, unit='s'),
+        'src_ip': src_ips,
+        'dst_ip': DST_IP,
+        'port': ports,
+        'action': actions,
+        'reason': reasons,
+    })
+
+def burst_offsets(u, shape, burst_seconds):
+    """Offsets within a burst for uniform draws `u` in [0, 1)."""
+    if shape == 'decay':
+        # Truncated exponential: most events early in the burst
+        u = -np.log1p(-u * (1 - np.exp(-5.0))) / 5.0
+    elif shape == 'ramp':
+        # Density grows linearly towards the end of the burst
+        u = np.sqrt(u)
+    return (u * burst_seconds).astype(np.int64)
+
+def attack_rows(attack, n_events, duration, rng, first_attacker):
+    """(offsets, src_ip, port, action, reason) arrays for one attack family."""
+    attacker = rng.integers(0, attack.attackers, n_events)
+    burst = rng.integers(0, attack.bursts, n_events)
+    starts = rng.integers(0, max(duration - attack.burst_seconds, 1), (attack.attackers, attack.bursts))
+    offsets = starts[attacker, burst] + burst_offsets(rng.random(n_events), attack.shape, attack.burst_seconds)
+    src_ip = ATTACKER_NET + first_attacker + attacker
+    deny = np.full(n_events, ACTIONS.index('DENY'))
+    if attack.kind == 'port_scan':
+        # Each scanner hammers one target port, as the Port Scan rule counts per IP and port
+        port = np.asarray(PORTS)[rng.integers(0, len(PORTS), attack.attackers)][attacker]
+        reason = np.full(n_events, REASONS.index('PORT_SCAN'))
+    elif attack.kind == 'brute_force':
+        port = np.full(n_events, 22)
+        reason = np.full(n_events, REASONS.index('AUTH_FAIL'))
+    else:
+        port = np.asarray(PORTS)[rng.integers(0, len(PORTS), n_events)]
+        reason = np.full(n_events, REASONS.index('FLOOD'))
+    return offsets, src_ip, port, deny, reason
+
+def generate_logs(n_rows, n_ips=10_000, ip_skew=1.1, attacks=DEFAULT_ATTACKS, duration=3600, deny_ratio=0.3,
+                  seed=0, start=START, sort=True):
+    """Synthetic log frame of `n_rows` rows (see the module docstring).
+
+    Background sources are `n_ips` distinct addresses whose activity
+    follows a Zipf law with exponent `ip_skew` (0 = uniform). Background
+    denies carry a random deny reason, accepts carry 'OK'. With `sort`, rows
+    are in time order (needed for streamed sliding-window analysis).
+    """
+    rng = np.random.default_rng(seed)
+    n_attack = [int(round(attack.share * n_rows)) for attack in attacks]
+    n_background = n_rows - sum(n_attack)
+    if n_background < 0:
+        raise ValueError("Attack shares add up to more than all rows")
+
+    # Distinct background addresses, each with a Zipf weight by (random) rank
+    pool = BACKGROUND_NET + 1 + rng.choice(2 ** 24 - 2, n_ips, replace=False)
+    weights = 1.0 / np.arange(1, n_ips + 1) ** ip_skew
+    src_ip = pool[rng.choice(n_ips, n_background, p=weights / weights.sum())]
+    action = (rng.random(n_background) < deny_ratio).astype(np.int64)
+    deny_reasons = np.array([REASONS.index(r) for r in REASONS if r != 'OK'])
+    reason = np.where(action == 1, deny_reasons[rng.integers(0, len(deny_reasons), n_background)], REASONS.index('OK'))
+    parts = [(rng.integers(0, duration, n_background), src_ip,
+              np.asarray(PORTS)[rng.integers(0, len(PORTS), n_background)], action, reason)]
+
+    first_attacker = 0
+    for attack, n_events in zip(attacks, n_attack):
+        parts.append(attack_rows(attack, n_events, duration, rng, first_attacker))
+        first_attacker += attack.attackers
+
+    offsets, src_ip, port, action, reason = (np.concatenate(column) for column in zip(*parts))
+    # Unsorted output still interleaves attack rows with the background
+    order = np.argsort(offsets, kind='stable') if sort else rng.permutation(n_rows)
+    return logs_frame(offsets[order], src_ip[order], port[order], action[order], reason[order], start)
+
+def write_logs(logs, path, chunksize=1_000_000):
+    """Write a log frame as CSV with dotted-quad addresses, in bounded-size chunks."""
+    for i, begin in enumerate(range(0, max(len(logs), 1), chunksize)):
+        chunk = logs.iloc[begin:begin + chunksize].copy()
+        for col in ('src_ip', 'dst_ip'):
+            if pd.api.types.is_unsigned_integer_dtype(chunk[col].dtype):
+                # Format each distinct address once
+                codes, uniques = pd.factorize(chunk[col])
+                chunk[col] = format_ipv4(uniques)[codes]
+        chunk.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False, date_format=TIMESTAMP_FORMAT)
@@ -0,0 +1,107 @@
+"""Parallel analysis of firewall logs split into many shard files.
+
+Each shard is analysed in a worker process and only compact partial
+results travel back to the parent:
+
+* fixed windows: the `WindowCounts` of the shard, which are additive, so
+  summing them is exact, including windows that span shard boundaries or
+  shards that overlap in time (several appliances logging the same hour);
+* sliding windows: `EventTable` multiplicity tables, concatenated in the
+  parent, which then runs the sliding detection once over the combined
+  events;
+* bounded-memory mode: a `DenySketch` per shard, merged in the parent.
+"""
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from log_cache import CACHE_DIR, load_logs
+from sketches import DenySketch
+from threat_detection import ThreatDetector
+
+EMPTY_LOGS = pd.DataFrame({'timestamp': pd.Series(dtype='datetime64[ns]'), 'src_ip': pd.Series(dtype=object),
+                           'dst_ip': pd.Series(dtype=object), 'port': pd.Series(dtype='int64'),
+                           'action': pd.Series(dtype=object), 'reason': pd.Series(dtype=object)})
+
+def expand_shards(spec):
+    """Shard files for a path spec: a single file, a directory (*.csv in it) or a glob."""
+    if os.path.isdir(spec):
+        paths = glob.glob(os.path.join(spec, '*.csv'))
+    elif any(ch in spec for ch in '*?['):
+        paths = glob.glob(spec)
+    else:
+        paths = [spec]
+    return sorted(paths)
+
+def read_shard(path, chunksize=None, use_cache=False, cache_dir=CACHE_DIR):
+    """Yield a shard as one frame, or in chunks of `chunksize` rows."""
+    if use_cache:
+        logs, _ = load_logs(path, cache_dir)
+        step = chunksize or max(len(logs), 1)
+        for start in range(0, len(logs), step):
+            yield logs.iloc[start:start + step]
+    elif chunksize:
+        yield from pd.read_csv(path, parse_dates=['timestamp'], chunksize=chunksize)
+    else:
+        yield pd.read_csv(path, parse_dates=['timestamp'])
+
+def partial_result(detector, logs):
+    return detector.events(logs) if detector.sliding else detector.count(logs)
+
+def analyse_shard(path, rules, sliding=False, chunksize=None, use_cache=False, cache_dir=CACHE_DIR):
+    """Partial result for one shard (runs in a worker process).
+
+    Returns (rows, partial) where partial is the shard's `WindowCounts`, or
+    its `EventTable` in sliding mode.
+    """
+    detector = ThreatDetector(rules, sliding)
+    rows = 0
+    partial = None
+    for chunk in read_shard(path, chunksize, use_cache, cache_dir):
+        rows += len(chunk)
+        part = partial_result(detector, chunk)
+        partial = part if partial is None else partial + part
+    if partial is None:
+        partial = partial_result(detector, EMPTY_LOGS)
+    return rows, partial
+
+def analyse_shards(paths, rules, workers=None, sliding=False, chunksize=None, use_cache=False, cache_dir=CACHE_DIR):
+    """Analyse shards in a process pool and merge the partial results.
+
+    Returns (rows, result) with the `DetectionResult` of the combined log.
+    """
+    detector = ThreatDetector(rules, sliding)
+    kwargs = dict(sliding=sliding, chunksize=chunksize, use_cache=use_cache, cache_dir=cache_dir)
+    rows = 0
+    partials = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(analyse_shard, path, detector.rules, **kwargs) for path in paths]
+        for future in futures:
+            shard_rows, partial = future.result()
+            rows += shard_rows
+            partials.append(partial)
+    if not partials:
+        partials.append(partial_result(detector, EMPTY_LOGS))
+    # Combined in one pass: merging pairwise would grow quadratically with the shard count
+    merged = type(partials[0]).merge(partials)
+    if sliding:
+        return rows, detector.detect_events(merged)
+    return rows, detector.threshold(merged)
+
+def sketch_shard(path, params, chunksize=None, use_cache=False, cache_dir=CACHE_DIR):
+    """(rows, `DenySketch`) of one shard; `params` are DenySketch keyword arguments."""
+    sketch = DenySketch(**params)
+    for chunk in read_shard(path, chunksize, use_cache, cache_dir):
+        sketch.update(chunk)
+    return sketch.rows, sketch
+
+def sketch_shards(paths, params, workers=None, chunksize=None, use_cache=False, cache_dir=CACHE_DIR):
+    """Summarise shards in a process pool and merge their sketches; returns (rows, sketch)."""
+    merged = DenySketch(**params)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(sketch_shard, path, params, chunksize, use_cache, cache_dir) for path in paths]
+        for future in futures:
+            merged = merged + future.result()[1]
+    return merged.rows, merged
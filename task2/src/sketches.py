@@ -0,0 +1,262 @@
+"""Bounded-memory, mergeable summaries of DENY traffic.
+
+An exact per-IP deny table grows with the number of distinct sources, which
+a spoofed-source flood makes unbounded. The structures here use fixed
+memory whatever the traffic looks like:
+
+* `CountMinSketch` estimates the count of any key. Estimates never
+  undercount, and overcount by at most `epsilon * total` with probability
+  at least `1 - delta`; memory is about e/epsilon * ln(1/delta) counters.
+* `SpaceSaving` keeps the `k` heaviest keys with an overestimate and a
+  per-key error, so `count - error <= true count <= count`. Any key with a
+  true count above total/k is guaranteed to be kept.
+
+`DenySketch` combines them: the top-K denying source IPs and approximate
+deny counts per (IP, window), including the heavy windows a Flood rule
+would report. Every structure merges with `a + b` (equal parameters
+required), so chunks, shards and worker processes can be summarised
+separately and combined, as with `WindowCounts`.
+"""
+import math
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from ipv4 import format_ipv4, parse_ipv4
+from threat_detection import FLOOD_THRESHOLD, WINDOW_SECONDS, to_timestamps
+
+def mix64(keys):
+    """splitmix64 finalizer: spreads structured keys (packed IPs, window numbers) over all 64 bits."""
+    x = np.asarray(keys, dtype=np.uint64).copy()
+    x ^= x >> np.uint64(30)
+    x *= np.uint64(0xBF58476D1CE4E5B9)
+    x ^= x >> np.uint64(27)
+    x *= np.uint64(0x94D049BB133111EB)
+    x ^= x >> np.uint64(31)
+    return x
+
+def aggregate(keys, counts=None):
+    """(distinct keys, summed counts) of a batch."""
+    if counts is None:
+        return np.unique(np.asarray(keys, dtype=np.uint64), return_counts=True)
+    uniq, inverse = np.unique(np.asarray(keys, dtype=np.uint64), return_inverse=True)
+    return uniq, np.bincount(inverse, weights=counts, minlength=len(uniq)).astype(np.int64)
+
+class CountMinSketch:
+    """Count-Min sketch over uint64 keys; see the module docstring for its error bound."""
+
+    def __init__(self, epsilon=1e-4, delta=1e-3, seed=0):
+        if not 0 < epsilon < 1 or not 0 < delta < 1:
+            raise ValueError("epsilon and delta must be in (0, 1)")
+        self.epsilon = epsilon
+        self.delta = delta
+        self.seed = seed
+        # Width rounded up to a power of two for multiply-shift hashing
+        self.bits = max(math.ceil(math.log2(math.e / epsilon)), 1)
+        depth = max(math.ceil(math.log(1 / delta)), 1)
+        rng = np.random.default_rng(seed)
+        self.multipliers = rng.integers(1, 2 ** 63, depth, dtype=np.uint64) | np.uint64(1)
+        self.offsets = rng.integers(0, 2 ** 63, depth, dtype=np.uint64)
+        self.table = np.zeros((depth, 1 << self.bits), dtype=np.int64)
+        self.total = 0
+
+    @property
+    def error_bound(self):
+        """Maximum overcount of any estimate (with probability 1 - delta)."""
+        return self.epsilon * self.total
+
+    def _rows(self, keys):
+        x = mix64(keys)
+        shift = np.uint64(64 - self.bits)
+        for row, (a, b) in enumerate(zip(self.multipliers, self.offsets)):
+            yield row, ((x * a + b) >> shift).astype(np.intp)
+
+    def update(self, keys, counts=None):
+        keys, counts = aggregate(keys, counts)
+        width = self.table.shape[1]
+        for row, cols in self._rows(keys):
+            self.table[row] += np.bincount(cols, weights=counts, minlength=width).astype(np.int64)
+        self.total += int(counts.sum())
+        return self
+
+    def query(self, keys):
+        """Estimated counts of `keys` (never below the true counts)."""
+        estimate = None
+        for row, cols in self._rows(keys):
+            values = self.table[row, cols]
+            estimate = values if estimate is None else np.minimum(estimate, values)
+        return estimate
+
+    def __add__(self, other):
+        if (self.epsilon, self.delta, self.seed) != (other.epsilon, other.delta, other.seed):
+            raise ValueError("Only sketches with the same epsilon, delta and seed can be merged")
+        merged = CountMinSketch(self.epsilon, self.delta, self.seed)
+        merged.table = self.table + other.table
+        merged.total = self.total + other.total
+        return merged
+
+class SpaceSaving:
+    """Space-Saving heavy hitters over uint64 keys, updated and merged a batch at a time.
+
+    Merging follows the mergeable Space-Saving rule: a key missing from a
+    full summary may have up to that summary's smallest count, so it is
+    charged that amount (as count and as error) before the union is cut
+    back to the `k` largest counts.
+    """
+
+    def __init__(self, k=1000):
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        self.k = k
+        self.keys = np.empty(0, dtype=np.uint64)
+        self.counts = np.empty(0, dtype=np.int64)
+        self.errors = np.empty(0, dtype=np.int64)
+        self.total = 0
+
+    @property
+    def floor(self):
+        """Largest count a key outside the summary can have."""
+        return int(self.counts.min()) if len(self.keys) >= self.k else 0
+
+    @property
+    def error_bound(self):
+        """Maximum overcount of any kept key."""
+        return self.total / self.k
+
+    def update(self, keys, counts=None):
+        keys, counts = aggregate(keys, counts)
+        # A batch is exact: keys missing from it have count 0
+        self._merge(keys, counts, np.zeros(len(keys), dtype=np.int64), 0, int(counts.sum()))
+        return self
+
+    def _merge(self, keys, counts, errors, other_floor, other_total):
+        own_floor = self.floor
+        n_own = len(self.keys)
+        uniq, inverse = np.unique(np.concatenate([self.keys, keys]), return_inverse=True)
+        in_own = np.zeros(len(uniq), dtype=bool)
+        in_own[inverse[:n_own]] = True
+        in_other = np.zeros(len(uniq), dtype=bool)
+        in_other[inverse[n_own:]] = True
+        charge = np.where(in_own, 0, own_floor) + np.where(in_other, 0, other_floor)
+        count = np.bincount(inverse, weights=np.concatenate([self.counts, counts]), minlength=len(uniq))
+        error = np.bincount(inverse, weights=np.concatenate([self.errors, errors]), minlength=len(uniq))
+        count = count.astype(np.int64) + charge
+        error = error.astype(np.int64) + charge
+        if len(uniq) > self.k:
+            keep = np.argpartition(-count, self.k - 1)[:self.k]
+            uniq, count, error = uniq[keep], count[keep], error[keep]
+        self.keys, self.counts, self.errors = uniq, count, error
+        self.total += other_total
+
+    def __add__(self, other):
+        if self.k != other.k:
+            raise ValueError("Only summaries with the same k can be merged")
+        merged = SpaceSaving(self.k)
+        merged.keys, merged.counts, merged.errors, merged.total = self.keys, self.counts, self.errors, self.total
+        merged._merge(other.keys, other.counts, other.errors, other.floor, other.total)
+        return merged
+
+    def top(self, n=None):
+        """(keys, counts, errors) of the `n` heaviest keys, highest count first."""
+        order = np.argsort(-self.counts, kind='stable')[:n]
+        return self.keys[order], self.counts[order], self.errors[order]
+
+@dataclass
+class DenySketch:
+    """Top denying source IPs and per-window deny counts in bounded memory.
+
+    `k` is the number of IPs (and of (IP, window) pairs) tracked exactly
+    enough to rank; `epsilon`/`delta` bound the error of per-window count
+    estimates. Update with log frames or chunks, merge with `+`.
+    """
+    window: float = WINDOW_SECONDS
+    k: int = 10_000
+    epsilon: float = 1e-4
+    delta: float = 1e-3
+    seed: int = 0
+
+    def __post_init__(self):
+        self.ips = SpaceSaving(self.k)
+        self.windows = SpaceSaving(self.k)
+        self.window_counts = CountMinSketch(self.epsilon, self.delta, self.seed)
+        self.rows = 0
+
+    def window_keys(self, ips, ts_ns):
+        """uint64 (window number, packed IP) keys."""
+        buckets = np.asarray(ts_ns, dtype=np.int64) // int(self.window * 1e9)
+        return (buckets.astype(np.uint64) << np.uint64(32)) | np.asarray(ips, dtype=np.uint64)
+
+    def update(self, logs):
+        ts = logs['timestamp']
+        ts_ns = ts.to_numpy().astype('datetime64[ns]').astype(np.int64)
+        ips = parse_ipv4(logs['src_ip'])
+        deny = (logs['action'].astype(object) == 'DENY').to_numpy()
+        # Like the exact deny counts, every DENY row counts for its IP, with
+        # rows without a usable address under 0 (reported as ''); only rows
+        # with a timestamp fall into a window
+        self.ips.update(ips[deny])
+        timed = deny & ts.notna().to_numpy()
+        keys = self.window_keys(ips[timed], ts_ns[timed])
+        self.windows.update(keys)
+        self.window_counts.update(keys)
+        self.rows += len(logs)
+        return self
+
+    def __add__(self, other):
+        if (self.window, self.k, self.epsilon, self.delta, self.seed) != \
+                (other.window, other.k, other.epsilon, other.delta, other.seed):
+            raise ValueError("Only sketches with the same parameters can be merged")
+        merged = DenySketch(self.window, self.k, self.epsilon, self.delta, self.seed)
+        merged.ips = self.ips + other.ips
+        merged.windows = self.windows + other.windows
+        merged.window_counts = self.window_counts + other.window_counts
+        merged.rows = self.rows + other.rows
+        return merged
+
+    @property
+    def denies(self):
+        return self.ips.total
+
+    def top_ips(self, n=10):
+        """The `n` top denying IPs: estimated denies and a guaranteed lower bound."""
+        keys, counts, errors = self.ips.top(n)
+        return pd.DataFrame({'src_ip': format_ipv4(keys.astype(np.uint32)), 'denies': counts,
+                             'min_denies': counts - errors})
+
+    def deny_count(self, src_ip, time):
+        """Estimated denies of `src_ip` (addresses) in the windows holding `time` (timestamps)."""
+        ips = parse_ipv4(np.atleast_1d(src_ip))
+        ts_ns = pd.to_datetime(np.atleast_1d(time)).to_numpy().astype('datetime64[ns]').astype(np.int64)
+        return self.window_counts.query(self.window_keys(ips, ts_ns))
+
+    def floods(self, threshold=FLOOD_THRESHOLD):
+        """(IP, window) pairs estimated to have more than `threshold` denies.
+
+        Candidates are the heavy pairs kept by Space-Saving; each count is
+        the smaller of the two structures' overestimates. `certain` marks
+        pairs whose guaranteed lower bound already exceeds the threshold.
+        Every pair with more than max(threshold, denies/k) true denies is
+        reported.
+        """
+        keys, counts, errors = self.windows.top()
+        estimate = np.minimum(counts, self.window_counts.query(keys))
+        hot = estimate > threshold
+        keys, estimate, lower = keys[hot], estimate[hot], (counts - errors)[hot]
+        window_ns = int(self.window * 1e9)
+        floods = pd.DataFrame({
+            'src_ip': format_ipv4((keys & np.uint64(0xFFFFFFFF)).astype(np.uint32)),
+            'time_window': to_timestamps((keys >> np.uint64(32)).astype(np.int64) * window_ns, 'datetime64[ns]'),
+            'count': estimate,
+            'certain': lower > threshold,
+        })
+        return floods.sort_values(['count', 'src_ip'], ascending=[False, True], ignore_index=True)
+
+    def bounds(self):
+        """Error bounds of the current estimates, in denies."""
+        return {
+            'denies': self.denies,
+            'top_ip_error': self.ips.error_bound,
+            'window_error': self.window_counts.error_bound,
+            'window_error_probability': self.delta,
+        }
@@ -0,0 +1,749 @@
+"""Rule-based, vectorized threat detection shared by the firewall log tools.
+
+Threat patterns are declarative `Rule`s: which log events to count, how to
+group them, the window and the threshold. A `ThreatDetector` compiles its
+rules into one execution plan over integer-coded columns and returns typed
+results:
+
+    detector = ThreatDetector(default_rules())
+    result = detector.detect(logs)
+    result.hits['Port Scan']    # src_ip, port, time_window, count
+    result.deny_counts          # denies per source IP
+
+The CLI, the Streamlit app and the sharded and live modes all run through
+this module, so they agree on both the rules and the results.
+"""
+import json
+from collections import deque
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from ipv4 import format_ipv4, format_subnets, parse_ipv4, subnet_mask
+
+# Default detection window (seconds) and "more than N events" thresholds
+WINDOW_SECONDS = 60
+SCAN_THRESHOLD = 8
+BRUTE_THRESHOLD = 4
+FLOOD_THRESHOLD = 40
+
+# Columns a rule can group events by; 'subnet' is the source IP's network
+GROUP_KEYS = ('src_ip', 'port', 'subnet')
+
+# Columns of the combined threat table
+THREAT_COLUMNS = ['type', 'ip', 'port', 'count', 'window']
+
+# Rule matches of one event are packed into a uint64 in event tables
+MAX_RULES = 64
+
+@dataclass(frozen=True)
+class Rule:
+    """A threat pattern: more than `threshold` matching events per group in a window.
+
+    The filters are ANDed: `action` must equal the log action (None matches
+    any), `reason` is a regex searched in the log reason, and `ports`
+    restricts the destination port. `group_by` names the key columns (see
+    GROUP_KEYS); 'subnet' groups source IPs by their /`subnet_prefix`
+    network.
+    """
+    name: str
+    threshold: int
+    group_by: tuple = ('src_ip',)
+    action: str | None = 'DENY'
+    reason: str | None = None
+    ports: tuple | None = None
+    window: float = WINDOW_SECONDS
+    subnet_prefix: int = 24
+
+    def __post_init__(self):
+        # Lists (e.g. from a JSON rules file) become tuples so rules stay hashable
+        object.__setattr__(self, 'group_by', tuple(self.group_by))
+        if self.ports is not None:
+            object.__setattr__(self, 'ports', tuple(self.ports))
+        unknown = set(self.group_by) - set(GROUP_KEYS)
+        if not self.group_by or unknown:
+            raise ValueError(f"Rule '{self.name}': group_by must be a non-empty subset of {GROUP_KEYS}")
+        if self.window <= 0:
+            raise ValueError(f"Rule '{self.name}': window must be positive")
+        if not 0 <= self.subnet_prefix <= 32:
+            raise ValueError(f"Rule '{self.name}': subnet_prefix must be between 0 and 32")
+
+    @property
+    def ip_key(self):
+        """Group key reported as a detection's ip ('src_ip' or 'subnet'), or None."""
+        return next((key for key in ('src_ip', 'subnet') if key in self.group_by), None)
+
+    @property
+    def fixed_port(self):
+        """Port reported when the rule does not group by port: its only port, else 'N/A'."""
+        return self.ports[0] if self.ports is not None and len(self.ports) == 1 else 'N/A'
+
+    def display(self, key):
+        """(ip, port) to report for a group key, a tuple aligned with `group_by`."""
+        values = dict(zip(self.group_by, key))
+        ip = values[self.ip_key] if self.ip_key else ''
+        return ip, values.get('port', self.fixed_port)
+
+def default_rules(window=WINDOW_SECONDS, scan_threshold=SCAN_THRESHOLD, brute_threshold=BRUTE_THRESHOLD,
+                  flood_threshold=FLOOD_THRESHOLD, subnet_prefix=None, subnet_threshold=FLOOD_THRESHOLD):
+    """The built-in patterns, plus subnet floods when `subnet_prefix` is given."""
+    rules = [
+        # Port Scan - >scan-threshold DENY from same IP on same port in a window
+        Rule('Port Scan', scan_threshold, ('src_ip', 'port'), reason='PORT_SCAN|INVALID', window=window),
+        # Brute Force - >brute-threshold AUTH_FAIL from same IP on port 22 in a window
+        Rule('Brute Force', brute_threshold, reason='AUTH_FAIL', ports=(22,), window=window),
+        # Flood/High Volume - >flood-threshold total DENY from IP in a window
+        Rule('Traffic Flood', flood_threshold, window=window),
+    ]
+    if subnet_prefix is not None:
+        # Subnet Flood - >subnet-threshold total DENY from one /prefix network in a window
+        rules.append(Rule('Subnet Flood', subnet_threshold, ('subnet',), window=window, subnet_prefix=subnet_prefix))
+    return rules
+
+def load_rules(path):
+    """Rules from a JSON file holding a list of `Rule` keyword objects."""
+    with open(path) as f:
+        return [Rule(**spec) for spec in json.load(f)]
+
+@dataclass
+class DetectionResult:
+    """Thresholded detections of a set of rules.
+
+    `hits[rule.name]` has one column per group key, then `time_window` (the
+    bucket start, or in sliding mode the start of the peak window) and
+    `count`. `deny_counts` holds the DENY rows per source IP, highest first.
+    """
+    rules: list
+    hits: dict
+    deny_counts: pd.Series
+
+    def __post_init__(self):
+        self.deny_counts = self.deny_counts.rename(None).sort_values(ascending=False)
+
+def sum_counts(tables):
+    """Sum Series of counts over the union of their keys, in one concat and groupby."""
+    combined = pd.concat(tables)
+    return combined.groupby(level=list(range(combined.index.nlevels)), dropna=False).sum().astype('int64')
+
+@dataclass
+class WindowCounts:
+    """Fixed-window event counts per rule, before thresholding.
+
+    Counts are additive: the counts of separate chunks or shards of one log
+    add up (`a + b`, or `WindowCounts.merge` for many) to exactly the counts
+    of the whole log.
+    """
+    counts: dict
+    deny_counts: pd.Series
+
+    def __add__(self, other):
+        counts = {name: table.add(other.counts[name], fill_value=0).astype('int64')
+                  for name, table in self.counts.items()}
+        return WindowCounts(counts, self.deny_counts.add(other.deny_counts, fill_value=0).astype('int64'))
+
+    @classmethod
+    def merge(cls, parts):
+        """Sum of many counts in one pass (repeated `+` re-adds the growing total each time)."""
+        counts = {name: sum_counts([part.counts[name] for part in parts]) for name in parts[0].counts}
+        return cls(counts, sum_counts([part.deny_counts for part in parts]))
+
+@dataclass
+class EventTable:
+    """Compact, mergeable list of the events matched by a detector's rules.
+
+    One row per distinct (packed ip, port, time, matched-rules bitmask) with
+    its multiplicity `n`. Identical events are interchangeable for
+    detection, so tables from shards of one log can be concatenated
+    (`a + b`) and handed to `ThreatDetector.detect_events` to get exactly
+    the result for the combined log. The bitmask refers to rule positions,
+    so only a detector with the same rules can read it.
+    """
+    table: pd.DataFrame
+    deny_counts: pd.Series
+    ts_dtype: object = 'datetime64[ns]'
+
+    def __add__(self, other):
+        return EventTable(pd.concat([self.table, other.table], ignore_index=True),
+                          self.deny_counts.add(other.deny_counts, fill_value=0).astype('int64'), self.ts_dtype)
+
+    @classmethod
+    def merge(cls, parts):
+        """Concatenation of many tables in one pass (repeated `+` copies the growing table each time)."""
+        return cls(pd.concat([part.table for part in parts], ignore_index=True),
+                   sum_counts([part.deny_counts for part in parts]), parts[0].ts_dtype)
+
+@dataclass
+class SlidingCounts:
+    """Sliding-window event counts per rule, before thresholding.
+
+    For each rule, `counts[rule.name]` holds its events sorted by group and
+    time (`group`, `ts`), the number of events of the group in each event's
+    trailing window (`count`), the sorted position where that window
+    begins (`start`) and the key code tables (`dims`). None of it depends
+    on the threshold, so `ThreatDetector.threshold` can re-evaluate any
+    threshold with one scan over the counts.
+    """
+    counts: dict
+    deny_counts: pd.Series
+    ts_dtype: object = 'datetime64[ns]'
+
+def code_column(values, sort=True):
+    """Integer-code a column: returns (codes, uniques), with -1 for missing."""
+    codes, uniques = pd.factorize(values, sort=sort)
+    return codes, np.asarray(uniques)
+
+def category_flags(uniques, pattern):
+    """Evaluate a regex once per category instead of once per row.
+
+    An extra False is appended so that the -1 code of missing values maps to
+    False when the flags are indexed with the codes.
+    """
+    flags = pd.Series(uniques, dtype=object).astype(str).str.contains(pattern, na=False).to_numpy()
+    return np.append(flags, False)
+
+def ip_column(src_ip):
+    """Integer-code source IPs via their packed uint32 form.
+
+    Accepts raw strings or packed addresses as stored by the log cache.
+    Grouping happens on the integers; only the distinct addresses are
+    formatted as dotted quads, and codes are numbered in the order those
+    strings sort so results line up with a groupby on strings. Returns
+    (codes, dotted uniques, packed uniques); a missing address is ''/0.
+    """
+    codes, packed = code_column(parse_ipv4(src_ip), sort=False)
+    dotted = format_ipv4(packed)
+    order = np.argsort(dotted, kind='stable')
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return rank[codes], dotted[order], packed[order]
+
+def port_column(ports):
+    """Integer-code ports; missing ports get code len(uniques) rather than -1.
+
+    The extra code keeps them countable by rules that do not group by port.
+    Float ports (a column with gaps) are reported as integers.
+    """
+    codes, uniques = code_column(ports)
+    if uniques.dtype.kind == 'f' and (uniques == np.floor(uniques)).all():
+        uniques = uniques.astype('int64')
+    return np.where(codes < 0, len(uniques), codes).astype('int64'), uniques
+
+def to_timestamps(ts_ns, dtype):
+    return pd.DatetimeIndex(np.asarray(ts_ns, dtype='int64').astype('datetime64[ns]')).astype(dtype)
+
+def deny_totals(ip_codes, ip_uniques, is_deny):
+    """DENY rows per source IP, over the whole log regardless of time and port."""
+    totals = pd.Series(np.bincount(ip_codes[is_deny], minlength=len(ip_uniques)),
+                       index=pd.Index(ip_uniques, name='src_ip_extracted'))
+    return totals[totals > 0]
+
+def prepare(logs):
+    """Integer-code a log frame once for all rules.
+
+    Returns a dict of aligned per-row code arrays plus the code tables that
+    turn codes back into values, the nanosecond timestamps and the per-IP
+    deny totals.
+    """
+    ip_codes, ip_uniques, ip_packed = ip_column(logs['src_ip'])
+    port_codes, port_uniques = port_column(logs['port'])
+    reason_codes, reason_uniques = code_column(logs['reason'], sort=False)
+    action_codes, action_uniques = code_column(logs['action'], sort=False)
+    ts = logs['timestamp']
+    is_deny = np.append(action_uniques == 'DENY', False)[action_codes]
+    return {
+        'ip': ip_codes.astype('int64'),
+        'ip_uniques': ip_uniques,
+        'ip_packed': ip_packed,
+        'port': port_codes,
+        'port_uniques': port_uniques,
+        'reason': reason_codes,
+        'reason_uniques': reason_uniques,
+        'action': action_codes,
+        'action_uniques': action_uniques,
+        'ts': ts.to_numpy().astype('datetime64[ns]').astype('int64'),
+        'valid': ts.notna().to_numpy(),
+        'ts_dtype': ts.dtype,
+        'deny': deny_totals(ip_codes, ip_uniques, is_deny),
+    }
+
+def prepare_events(events):
+    """`prepare` output rebuilt from an `EventTable`, with the rule bitmask per event."""
+    table = events.table
+    n = table['n'].to_numpy()
+    ip_codes, ip_uniques, ip_packed = ip_column(pd.Series(table['ip'].to_numpy(dtype=np.uint32)))
+    port_codes, port_uniques = port_column(table['port'])
+    return {
+        'ip': np.repeat(ip_codes.astype('int64'), n),
+        'ip_uniques': ip_uniques,
+        'ip_packed': ip_packed,
+        'port': np.repeat(port_codes, n),
+        'port_uniques': port_uniques,
+        'ts': np.repeat(table['ts'].to_numpy(dtype='int64'), n),
+        'ts_dtype': events.ts_dtype,
+        'rule_bits': np.repeat(table['rules'].to_numpy(dtype=np.uint64), n),
+        'deny': events.deny_counts,
+    }
+
+def rule_masks(rules, prep):
+    """Boolean mask per rule of the prepared events it counts.
+
+    Regexes and value tests run once per distinct action, reason and port;
+    rows only pay for an indexed lookup. Masks of event tables come from
+    their rule bitmask instead.
+    """
+    if 'rule_bits' in prep:
+        return {rule.name: ((prep['rule_bits'] >> np.uint64(i)) & np.uint64(1)).astype(bool)
+                for i, rule in enumerate(rules)}
+    flags = {}
+
+    def lookup(column, test):
+        if (column, test) not in flags:
+            uniques = prep[f'{column}_uniques']
+            if column == 'reason':
+                values = category_flags(uniques, test)
+            elif column == 'port':
+                values = np.append(np.isin(uniques, test), False)
+            else:
+                values = np.append(uniques == test, False)
+            flags[column, test] = values[prep[column]]
+        return flags[column, test]
+
+    masks = {}
+    for rule in rules:
+        mask = prep['valid'].copy()
+        if rule.action is not None:
+            mask &= lookup('action', rule.action)
+        if rule.reason is not None:
+            mask &= lookup('reason', rule.reason)
+        if rule.ports is not None:
+            mask &= lookup('port', rule.ports)
+        masks[rule.name] = mask
+    return masks
+
+def key_dimension(prep, name, subnet_prefix, cache):
+    """(codes, labels) of one group key column; codes are -1 where the key is undefined."""
+    ident = (name, subnet_prefix if name == 'subnet' else None)
+    if ident not in cache:
+        if name == 'src_ip':
+            cache[ident] = prep['ip'], prep['ip_uniques']
+        elif name == 'port':
+            n_ports = len(prep['port_uniques'])
+            cache[ident] = np.where(prep['port'] < n_ports, prep['port'], -1), prep['port_uniques']
+        else:
+            # One AND with the netmask per distinct address
+            networks = prep['ip_packed'] & subnet_mask(subnet_prefix)
+            net_codes, net_uniques = code_column(np.where(prep['ip_packed'] == 0, np.nan, networks))
+            cache[ident] = (net_codes[prep['ip']].astype('int64'),
+                            format_subnets(net_uniques.astype(np.uint32), subnet_prefix))
+    return cache[ident]
+
+def group_codes(dims):
+    """Combine per-column key codes into one int64 code per event (-1 if any is undefined).
+
+    Codes are mixed-radix, so sorting them sorts by the key columns in order.
+    """
+    codes = np.zeros(len(dims[0][0]), dtype='int64')
+    valid = np.ones(len(codes), dtype=bool)
+    for column, labels in dims:
+        codes = codes * max(len(labels), 1) + column
+        valid &= column >= 0
+    return np.where(valid, codes, -1)
+
+def decode_groups(codes, dims):
+    """Label arrays of the key columns for composite codes from `group_codes`."""
+    columns = []
+    for _, labels in reversed(dims):
+        radix = max(len(labels), 1)
+        columns.append(labels[codes % radix])
+        codes = codes // radix
+    return columns[::-1]
+
+def sliding_window_counts(group, ts_ns, window_ns):
+    """Events per group in the trailing window (t - window, t] of each event.
+
+    Returns (order, counts, starts): `order` sorts the events by group then
+    time, and for the i-th sorted event `counts[i]` is the number of events
+    of its group in its trailing window, which begins at sorted position
+    `starts[i]`. Both window edges are found with one searchsorted over a
+    composite (group, time-rank) key, so no per-group Python loop is needed.
+    """
+    order = np.lexsort((ts_ns, group))
+    g, t = group[order], ts_ns[order]
+    n = len(t)
+    # Dense-rank event times and window edges together so the composite key
+    # stays within int64 regardless of timestamp resolution
+    ranks = np.unique(np.concatenate([t, t - window_ns]), return_inverse=True)[1].reshape(-1)
+    n_ranks = 2 * n + 1
+    composite = g * n_ranks + ranks[:n]
+    starts = np.searchsorted(composite, g * n_ranks + ranks[n:], side='right')
+    counts = np.arange(n) - starts + 1
+    return order, counts, starts
+
+def sliding_episodes(group, ts_ns, window_ns, threshold):
+    """Bursts where a group has more than `threshold` events in any window.
+
+    An episode is a run of consecutive events of one group whose trailing
+    window count exceeds the threshold; each is reported once, at its peak.
+    Returns a DataFrame with the group code, peak count and the time of the
+    first event inside the peak window.
+    """
+    order, counts, starts = sliding_window_counts(group, ts_ns, window_ns)
+    return peak_episodes(group[order], ts_ns[order], counts, starts, threshold)
+
+def peak_episodes(g, t, counts, starts, threshold):
+    """`sliding_episodes` over events already sorted by `sliding_window_counts`."""
+    hot = counts > threshold
+    prev_hot = np.concatenate([[False], hot[:-1] & (g[1:] == g[:-1])]) if len(hot) else hot
+    episode = np.cumsum(hot & ~prev_hot)
+    hot_idx = np.flatnonzero(hot)
+    if not len(hot_idx):
+        return pd.DataFrame({'group': np.array([], dtype='int64'), 'count': np.array([], dtype='int64'),
+                             'start': np.array([], dtype='int64')})
+    peaks = pd.Series(counts[hot_idx], index=hot_idx).groupby(episode[hot_idx]).idxmax().to_numpy()
+    return pd.DataFrame({'group': g[peaks], 'count': counts[peaks], 'start': t[starts[peaks]]})
+
+class ThreatDetector:
+    """Runs a set of rules over firewall logs as one shared vectorized plan.
+
+    The log is integer-coded once, each rule becomes a boolean mask, and
+    rules that group by the same keys over the same window share a single
+    composite-key np.unique; each of them then only adds a weighted
+    bincount. With `sliding=True` a rule reports bursts of more than
+    `threshold` events in any `window`-second span instead of counting per
+    fixed clock bucket, so a burst straddling a bucket boundary is not split
+    in two.
+    """
+
+    def __init__(self, rules=None, sliding=False):
+        self.rules = list(default_rules() if rules is None else rules)
+        names = [rule.name for rule in self.rules]
+        if len(set(names)) != len(names):
+            raise ValueError("Rule names must be unique")
+        if len(self.rules) > MAX_RULES:
+            raise ValueError(f"At most {MAX_RULES} rules are supported")
+        self.sliding = sliding
+        # Execution plan: rules grouped by (key columns, subnet prefix, window)
+        plan = {}
+        for rule in self.rules:
+            prefix = rule.subnet_prefix if 'subnet' in rule.group_by else None
+            plan.setdefault((rule.group_by, prefix, rule.window), []).append(rule)
+        self.plan = list(plan.items())
+
+    def detect(self, logs):
+        """Detections for a whole log frame."""
+        prep = prepare(logs)
+        masks = rule_masks(self.rules, prep)
+        if self.sliding:
+            return self._episodes(prep, masks)
+        return self.threshold(self._count(prep, masks))
+
+    def count(self, logs):
+        """Fixed-window counts of one log frame or chunk, for summing before `threshold`."""
+        prep = prepare(logs)
+        return self._count(prep, rule_masks(self.rules, prep))
+
+    def window_counts(self, logs):
+        """Threshold-independent counts of a log frame: `WindowCounts`, or `SlidingCounts` in sliding mode.
+
+        `threshold` turns them into detections for these rules or any rules
+        that differ from them only in their thresholds, so trying other
+        thresholds does not rescan the log.
+        """
+        prep = prepare(logs)
+        masks = rule_masks(self.rules, prep)
+        if self.sliding:
+            return self._sliding_counts(prep, masks)
+        return self._count(prep, masks)
+
+    def threshold(self, counts):
+        """Keep the windows of a `WindowCounts` (or bursts of a `SlidingCounts`) that exceed each rule's threshold."""
+        if isinstance(counts, SlidingCounts):
+            return self._threshold_sliding(counts)
+        hits = {}
+        for rule in self.rules:
+            table = counts.counts[rule.name]
+            hits[rule.name] = table[table > rule.threshold].reset_index(name='count')
+        return DetectionResult(self.rules, hits, counts.deny_counts)
+
+    def events(self, logs):
+        """The events of one log frame or chunk any rule matches, as an `EventTable`."""
+        prep = prepare(logs)
+        masks = rule_masks(self.rules, prep)
+        bits = np.zeros(len(prep['ts']), dtype=np.uint64)
+        for i, rule in enumerate(self.rules):
+            bits |= masks[rule.name].astype(np.uint64) << np.uint64(i)
+        keep = bits != 0
+        table = pd.DataFrame({
+            'ip': prep['ip_packed'][prep['ip'][keep]],
+            'port': np.append(prep['port_uniques'].astype(float), np.nan)[prep['port'][keep]],
+            'ts': prep['ts'][keep],
+            'rules': bits[keep],
+        })
+        table = table.groupby(list(table.columns), sort=False, dropna=False).size().reset_index(name='n')
+        return EventTable(table, prep['deny'], prep['ts_dtype'])
+
+    def detect_events(self, events):
+        """Detections for (merged) event tables built by `events`."""
+        prep = prepare_events(events)
+        masks = rule_masks(self.rules, prep)
+        if self.sliding:
+            return self._episodes(prep, masks)
+        return self.threshold(self._count(prep, masks))
+
+    def _count(self, prep, masks):
+        dims_cache = {}
+        counts = {}
+        for (group_by, prefix, window), rules in self.plan:
+            dims = [key_dimension(prep, name, prefix, dims_cache) for name in group_by]
+            group = group_codes(dims)
+            union = np.zeros(len(group), dtype=bool)
+            for rule in rules:
+                union |= masks[rule.name]
+            union &= group >= 0
+
+            # One composite int64 key per (group, window); np.unique sorts it
+            # in the same order a groupby over the key columns would
+            window_ns = int(window * 1e9)
+            buckets = prep['ts'][union] // window_ns
+            bucket_base = buckets.min() if len(buckets) else 0
+            n_buckets = (buckets.max() - bucket_base + 1) if len(buckets) else 1
+            keys, inverse = np.unique(group[union] * n_buckets + (buckets - bucket_base), return_inverse=True)
+            columns = decode_groups(keys // n_buckets, dims)
+            windows = to_timestamps((keys % n_buckets + bucket_base) * window_ns, prep['ts_dtype'])
+            for rule in rules:
+                n = np.bincount(inverse, weights=masks[rule.name][union], minlength=len(keys)).astype('int64')
+                hit = n > 0
+                index = pd.MultiIndex.from_arrays([column[hit] for column in columns] + [windows[hit]],
+                                                  names=list(group_by) + ['time_window'])
+                counts[rule.name] = pd.Series(n[hit], index=index)
+        return WindowCounts({rule.name: counts[rule.name] for rule in self.rules}, prep['deny'])
+
+    def _episodes(self, prep, masks):
+        return self._threshold_sliding(self._sliding_counts(prep, masks))
+
+    def _sliding_counts(self, prep, masks):
+        dims_cache = {}
+        counts = {}
+        for rule in self.rules:
+            dims = [key_dimension(prep, name, rule.subnet_prefix, dims_cache) for name in rule.group_by]
+            group = group_codes(dims)
+            mask = masks[rule.name] & (group >= 0)
+            group, ts = group[mask], prep['ts'][mask]
+            order, count, start = sliding_window_counts(group, ts, int(rule.window * 1e9))
+            counts[rule.name] = {'group': group[order], 'ts': ts[order], 'count': count, 'start': start, 'dims': dims}
+        return SlidingCounts(counts, prep['deny'], prep['ts_dtype'])
+
+    def _threshold_sliding(self, counts):
+        hits = {}
+        for rule in self.rules:
+            c = counts.counts[rule.name]
+            found = peak_episodes(c['group'], c['ts'], c['count'], c['start'], rule.threshold)
+            table = dict(zip(rule.group_by, decode_groups(found['group'].to_numpy(), c['dims'])))
+            table['time_window'] = to_timestamps(found['start'], counts.ts_dtype)
+            table['count'] = found['count'].to_numpy()
+            hits[rule.name] = pd.DataFrame(table)
+        return DetectionResult(self.rules, hits, counts.deny_counts)
+
+def threat_table(result):
+    """One row per detection: type, ip, port, count, window, in rule order.
+
+    Built column by column from the per-rule hit tables and concatenated
+    once, so the cost does not grow with a Python loop over detections.
+    """
+    frames = []
+    for rule in result.rules:
+        hits = result.hits[rule.name]
+        frames.append(pd.DataFrame({
+            'type': np.full(len(hits), rule.name, dtype=object),
+            'ip': hits[rule.ip_key].to_numpy() if rule.ip_key else np.full(len(hits), '', dtype=object),
+            'port': hits['port'].to_numpy() if 'port' in rule.group_by else np.full(len(hits), rule.fixed_port, dtype=object),
+            'count': hits['count'].to_numpy(),
+            'window': hits['time_window'].to_numpy(),
+        }))
+    if not frames:
+        return pd.DataFrame(columns=THREAT_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+def top_threats(threats, k=10, by='count'):
+    """The `k` rows of a threat table with the highest `by`, highest first.
+
+    Same rows and order as a stable descending sort followed by head(k)
+    (ties keep table order), but only the k selected rows are sorted: the
+    cut-off value comes from an O(n) partition.
+    """
+    values = threats[by].to_numpy()
+    if k >= len(values):
+        selected = np.arange(len(values))
+    elif k <= 0:
+        selected = np.array([], dtype='int64')
+    else:
+        kth = np.partition(values, len(values) - k)[len(values) - k]
+        above = np.flatnonzero(values > kth)
+        ties = np.flatnonzero(values == kth)[:k - len(above)]
+        selected = np.concatenate([above, ties])
+    return threats.iloc[selected[np.lexsort((selected, -values[selected]))]]
+
+class SlidingWindowCounter:
+    """Incremental per-key counter over a trailing time window.
+
+    Keeps a deque of event times per key, so each event costs O(1) amortized
+    and memory is bounded by the events inside the window. Events must
+    arrive in time order per key. Bursts (more than `threshold` events in
+    the window) are tracked as episodes; an episode closes when an event
+    leaves the count at or below the threshold, or eviction drops it below
+    the threshold, and is then available from `pop_closed`,
+    reported at its peak exactly like `sliding_episodes`.
+    """
+
+    def __init__(self, window_ns, threshold):
+        self.window_ns = window_ns
+        self.threshold = threshold
+        self.events = {}
+        self.open = {}
+        self.closed = []
+
+    def add(self, key, ts_ns):
+        """Record one event; returns True if it opens a new episode for `key`."""
+        q = self.events.get(key)
+        if q is None:
+            q = self.events[key] = deque()
+        q.append(ts_ns)
+        while q[0] <= ts_ns - self.window_ns:
+            q.popleft()
+        count = len(q)
+        if count <= self.threshold:
+            self._close(key)
+            return False
+        episode = self.open.get(key)
+        if episode is None:
+            self.open[key] = (count, q[0])
+            return True
+        if count > episode[0]:
+            self.open[key] = (count, q[0])
+        return False
+
+    def count(self, key):
+        q = self.events.get(key)
+        return len(q) if q else 0
+
+    def evict(self, now_ns):
+        """Drop events that fell out of the window and keys with nothing left."""
+        for key in list(self.events):
+            q = self.events[key]
+            while q and q[0] <= now_ns - self.window_ns:
+                q.popleft()
+            # At exactly the threshold the next event still continues the
+            # episode (as in `peak_episodes`); below it, it cannot
+            if len(q) < self.threshold:
+                self._close(key)
+            if not q:
+                del self.events[key]
+
+    def flush(self):
+        """Close every open episode (end of input)."""
+        for key in list(self.open):
+            self._close(key)
+
+    def pop_closed(self):
+        """Return and forget the episodes closed so far as (key, count, start_ns)."""
+        closed, self.closed = self.closed, []
+        return closed
+
+    def _close(self, key):
+        episode = self.open.pop(key, None)
+        if episode is not None:
+            self.closed.append((key, episode[0], episode[1]))
+
+class StreamingDetector:
+    """Chunk-at-a-time sliding-window detection for logs too big to load and live feeds.
+
+    Feeds each matched event into one `SlidingWindowCounter` per rule, so
+    bursts spanning chunk boundaries are found exactly as a sliding
+    `ThreatDetector` finds them, provided the log is in time order.
+    `update` returns the alerts opened by the chunk; `finish` returns the
+    final `DetectionResult`.
+    """
+
+    def __init__(self, rules=None):
+        self.rules = list(default_rules() if rules is None else rules)
+        self.counters = {rule.name: SlidingWindowCounter(int(rule.window * 1e9), rule.threshold)
+                         for rule in self.rules}
+        # Late events are only safe within the shortest window
+        self.window_ns = min(counter.window_ns for counter in self.counters.values())
+        self.deny = pd.Series(dtype='int64')
+        self.ts_dtype = None
+        self.last_ts = None
+        self.out_of_order = False
+        self.episodes = {name: [] for name in self.counters}
+
+    def update(self, logs):
+        """Count one chunk; returns the new alerts.
+
+        Each alert is (rule name, key, count, window_start_ns, ts_ns) for the
+        event that pushed `key`, a tuple aligned with the rule's `group_by`,
+        over the threshold. Alerts are in event order.
+        """
+        prep = prepare(logs)
+        masks = rule_masks(self.rules, prep)
+        self.ts_dtype = prep['ts_dtype']
+        self.deny = self.deny.add(prep['deny'], fill_value=0).astype('int64')
+        matched = np.zeros(len(prep['ts']), dtype=bool)
+        for mask in masks.values():
+            matched |= mask
+        rows = np.flatnonzero(matched)
+        order = rows[np.argsort(prep['ts'][rows], kind='stable')]
+        ts = prep['ts'][order]
+        if len(ts):
+            # Events older than the window behind the newest one seen can no
+            # longer be counted correctly by the per-key deques
+            if self.last_ts is not None and ts[0] <= self.last_ts - self.window_ns:
+                self.out_of_order = True
+            self.last_ts = int(ts[-1]) if self.last_ts is None else max(self.last_ts, int(ts[-1]))
+        dims_cache = {}
+        found = []
+        for r, rule in enumerate(self.rules):
+            dims = [key_dimension(prep, name, rule.subnet_prefix, dims_cache) for name in rule.group_by]
+            hit = masks[rule.name][order] & (group_codes(dims)[order] >= 0)
+            events = order[hit]
+            keys = zip(*[np.append(labels, None)[codes[events]].tolist() for codes, labels in dims])
+            counter = self.counters[rule.name]
+            for i, key, t in zip(np.flatnonzero(hit).tolist(), keys, ts[hit].tolist()):
+                if counter.add(key, t):
+                    found.append((i, r, (rule.name, key) + counter.open[key] + (t,)))
+        self._collect()
+        found.sort(key=lambda alert: alert[:2])
+        return [alert for _, _, alert in found]
+
+    def evict(self, now_ns):
+        for counter in self.counters.values():
+            counter.evict(now_ns)
+        self._collect()
+
+    def pop_episodes(self):
+        """Return and forget the finished episodes as {rule name: [(key, count, start_ns)]}.
+
+        Long-running callers use this instead of `finish` so that finished
+        bursts do not pile up in memory.
+        """
+        episodes = self.episodes
+        self.episodes = {name: [] for name in self.counters}
+        return episodes
+
+    def finish(self):
+        for counter in self.counters.values():
+            counter.flush()
+        self._collect()
+        dtype = self.ts_dtype or 'datetime64[ns]'
+        hits = {}
+        for rule in self.rules:
+            found = sorted(self.episodes[rule.name], key=lambda e: (e[0], e[2]))
+            table = {name: [e[0][j] for e in found] for j, name in enumerate(rule.group_by)}
+            table['time_window'] = to_timestamps([e[2] for e in found], dtype)
+            table['count'] = np.array([e[1] for e in found], dtype='int64')
+            hits[rule.name] = pd.DataFrame(table)
+        return DetectionResult(self.rules, hits, self.deny.rename_axis('src_ip_extracted'))
+
+    def _collect(self):
+        for name, counter in self.counters.items():
+            self.episodes[name].extend(counter.pop_closed())
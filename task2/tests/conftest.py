@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from log_generator import generate_logs, write_logs
+
+@pytest.fixture(scope='session')
+def log_csv(tmp_path_factory):
+    """A time-ordered 50k-row synthetic log with every attack pattern, as CSV."""
+    path = tmp_path_factory.mktemp('logs') / 'firewall.csv'
+    write_logs(generate_logs(50_000, seed=1), path)
+    return path
+
+@pytest.fixture(scope='session')
+def logs(log_csv):
+    return pd.read_csv(log_csv, parse_dates=['timestamp'])
+
+def rows(threats):
+    """A threat table as a sorted list of plain tuples, for order-insensitive comparison."""
+    return sorted((t, ip, str(port), int(count), pd.Timestamp(window))
+                  for t, ip, port, count, window in threats.itertuples(index=False))
@@ -0,0 +1,41 @@
+import io
+import os
+import time
+
+from analysis_cache import last_used, prune_uploads, spool_upload
+
+def spool(directory, text):
+    return spool_upload(io.BytesIO(text.encode()), directory)[0]
+
+def age(path, seconds):
+    """Pretend `path` was written and last used `seconds` ago."""
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+def test_reupload_keeps_file_and_mtime(tmp_path):
+    first = spool(tmp_path, 'a\n')
+    age(first, 3600)
+    mtime = os.stat(first).st_mtime_ns
+    assert spool(tmp_path, 'a\n') == first
+    # Marked as used without changing the mtime the column cache is keyed on
+    assert os.stat(first).st_mtime_ns == mtime
+    assert time.time() - last_used(first) < 60
+
+def test_prune_keeps_recently_used(tmp_path):
+    paths = []
+    for i, text in enumerate(['a\n', 'b\n', 'c\n']):
+        paths.append(spool(tmp_path, text))
+        age(paths[-1], 3600 - i)
+    # Re-uploading the oldest makes it the most recently used
+    spool(tmp_path, 'a\n')
+    prune_uploads(tmp_path, keep=2, grace=60)
+    assert [os.path.exists(path) for path in paths] == [True, False, True]
+
+def test_prune_spares_uploads_in_grace_period(tmp_path):
+    paths = [spool(tmp_path, text) for text in ['a\n', 'b\n', 'c\n']]
+    prune_uploads(tmp_path, keep=1, grace=60)
+    assert all(os.path.exists(path) for path in paths)
+    for path in paths:
+        age(path, 3600)
+    prune_uploads(tmp_path, keep=1, grace=60)
+    assert sum(os.path.exists(path) for path in paths) == 1
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import rows
+from log_features import FeatureStream, connection_columns, kdd_features
+from sharded import analyse_shards
+from sketches import DenySketch
+from threat_detection import ThreatDetector, default_rules, threat_table
+
+RULES = default_rules(subnet_prefix=24)
+
+@pytest.fixture(scope='module')
+def shards(log_csv, tmp_path_factory):
+    """The log split round-robin into three shard files, so every window spans shards."""
+    directory = tmp_path_factory.mktemp('shards')
+    logs = pd.read_csv(log_csv)
+    paths = []
+    for i in range(3):
+        path = directory / f'shard{i}.csv'
+        logs.iloc[i::3].to_csv(path, index=False)
+        paths.append(str(path))
+    return paths
+
+@pytest.mark.parametrize('chunksize', [1_000, 7_919])
+def test_streamed_counts_match_in_memory(log_csv, logs, chunksize):
+    detector = ThreatDetector(RULES)
+    counts = None
+    for chunk in pd.read_csv(log_csv, parse_dates=['timestamp'], chunksize=chunksize):
+        part = detector.count(chunk)
+        counts = part if counts is None else counts + part
+    streamed, whole = detector.threshold(counts), detector.detect(logs)
+    assert rows(threat_table(streamed)) == rows(threat_table(whole))
+    pd.testing.assert_series_equal(streamed.deny_counts, whole.deny_counts, check_dtype=False)
+
+@pytest.mark.parametrize('sliding', [False, True])
+def test_merge_matches_pairwise_sum(logs, sliding):
+    detector = ThreatDetector(RULES, sliding)
+    partial = detector.events if sliding else detector.count
+    parts = [partial(logs.iloc[begin:begin + 4_999]) for begin in range(0, len(logs), 4_999)]
+    pairwise = parts[0]
+    for part in parts[1:]:
+        pairwise = pairwise + part
+    merged = type(parts[0]).merge(parts)
+    finish = detector.detect_events if sliding else detector.threshold
+    assert rows(threat_table(finish(merged))) == rows(threat_table(finish(pairwise)))
+    pd.testing.assert_series_equal(merged.deny_counts, pairwise.deny_counts)
+
+@pytest.mark.parametrize('sliding', [False, True])
+@pytest.mark.parametrize('chunksize, use_cache', [(None, False), (4_000, False), (None, True)])
+def test_sharded_matches_single_process(logs, shards, tmp_path, sliding, chunksize, use_cache):
+    n_rows, result = analyse_shards(shards, RULES, workers=2, sliding=sliding, chunksize=chunksize,
+                                    use_cache=use_cache, cache_dir=tmp_path)
+    whole = ThreatDetector(RULES, sliding).detect(logs)
+    assert n_rows == len(logs)
+    assert rows(threat_table(result)) == rows(threat_table(whole))
+    pd.testing.assert_series_equal(result.deny_counts, whole.deny_counts, check_dtype=False)
+
+@pytest.mark.parametrize('sliding', [False, True])
+def test_rethresholded_counts_match_detect(logs, sliding):
+    # The dashboard counts once per window setting and re-thresholds on every slider move
+    counts = ThreatDetector(default_rules(), sliding).window_counts(logs)
+    for thresholds in [(10, 5, 100), (3, 2, 40)]:
+        detector = ThreatDetector(default_rules(60, *thresholds), sliding)
+        assert rows(threat_table(detector.threshold(counts))) == rows(threat_table(detector.detect(logs)))
+
+def test_merged_sketches_cover_exact_floods(logs):
+    exact = threat_table(ThreatDetector(default_rules()).detect(logs))
+    exact = exact[exact['type'] == 'Traffic Flood']
+    merged = DenySketch(k=500)
+    for begin in range(0, len(logs), 7_919):
+        merged = merged + DenySketch(k=500).update(logs.iloc[begin:begin + 7_919])
+    floods = merged.floods().set_index(['src_ip', 'time_window'])['count']
+    estimates = floods.reindex(pd.MultiIndex.from_arrays([exact['ip'], exact['window']]))
+    # Never missed, never undercounted
+    assert estimates.notna().all()
+    assert (estimates.to_numpy() >= exact['count'].to_numpy()).all()
+
+def test_sketch_deny_totals_match_exact(logs):
+    # Rows without a usable address or timestamp still count, as in deny_counts
+    logs = logs.copy()
+    logs.loc[::97, 'src_ip'] = 'unknown'
+    logs.loc[::89, 'timestamp'] = pd.NaT
+    exact = ThreatDetector(default_rules()).detect(logs).deny_counts
+    sketch = DenySketch(k=len(exact) + 1).update(logs)
+    assert sketch.denies == exact.sum()
+    # With room for every IP, Space-Saving is exact
+    top = sketch.top_ips(len(exact)).set_index('src_ip')['denies']
+    pd.testing.assert_series_equal(top.sort_index(), exact.sort_index(), check_names=False, check_index_type=False)
+
+def test_feature_stream_matches_whole_log(logs):
+    whole = kdd_features(connection_columns(logs), np.arange(len(logs)))
+    stream = FeatureStream()
+    streamed = pd.concat([stream.transform(logs.iloc[begin:begin + 3_001]) for begin in range(0, len(logs), 3_001)],
+                         ignore_index=True)
+    pd.testing.assert_frame_equal(streamed, whole)
@@ -0,0 +1,14 @@
+import pytest
+
+from firewall_threat_finder import parse_args
+
+def test_sketch_accepts_flood_options():
+    args = parse_args(['--sketch', '--flood-threshold', '50', '--window', '30', '--top', '5', '--stream'])
+    assert args.sketch and args.flood_threshold == 50
+
+@pytest.mark.parametrize('option', [['--rules', 'rules.json'], ['--sliding'], ['--scan-threshold', '3'],
+                                    ['--brute-threshold', '3'], ['--subnet-prefix', '24'], ['--follow'], ['--ml']])
+def test_sketch_rejects_options_it_cannot_honour(option, capsys):
+    with pytest.raises(SystemExit):
+        parse_args(['--sketch'] + option)
+    assert 'only reports floods' in capsys.readouterr().err
@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+
+from ipv4 import format_ipv4, parse_ipv4, parse_ipv4_regex
+from threat_detection import ThreatDetector, threat_table
+
+VALUES = ['1.2.3.4', '01.2.3.4', '001.002.003.004', '256.1.1.1', '1.2.3.999', 'src=10.0.0.1 ', '10.0.0.1',
+          '255.255.255.255', '1.2.3', '', 'not an ip', '1.2.3.4.5', '192.168.1.100']
+
+def test_byte_parser_matches_regex():
+    assert (parse_ipv4(VALUES) == parse_ipv4_regex(VALUES)).all()
+
+def test_round_trip():
+    dotted = ['0.0.0.1', '10.0.0.1', '192.168.1.100', '255.255.255.255']
+    assert list(format_ipv4(parse_ipv4(dotted))) == dotted
+
+@pytest.mark.parametrize('value, expected', [
+    # Leading zeros are the same address
+    ('01.2.3.4', '1.2.3.4'),
+    ('001.002.003.004', '1.2.3.4'),
+    # Out-of-range octets hold no address
+    ('256.1.1.1', ''),
+    ('1.2.3.999', ''),
+    ('src=10.0.0.1 ', '10.0.0.1'),
+])
+def test_canonical_forms(value, expected):
+    assert format_ipv4(parse_ipv4([value]))[0] == expected
+
+def test_detection_groups_canonical_addresses():
+    # 6 + 6 denies from two spellings of one address make one port scan;
+    # an out-of-range address joins the rows without one ('')
+    times = pd.date_range('2025-11-28 09:00:00', periods=12, freq='s')
+    logs = pd.DataFrame({'timestamp': times.append(times), 'src_ip': ['1.2.3.4', '01.2.3.4'] * 6 + ['256.1.1.1'] * 12,
+                         'dst_ip': '192.168.1.1', 'port': 22, 'action': 'DENY', 'reason': 'PORT_SCAN'})
+    threats = threat_table(ThreatDetector().detect(logs))
+    found = list(threats[['type', 'ip', 'count']].itertuples(index=False, name=None))
+    assert found == [('Port Scan', '', 12), ('Port Scan', '1.2.3.4', 12)]
@@ -0,0 +1,27 @@
+import asyncio
+import os
+
+from live_follow import tail_file
+
+def test_tail_drains_old_file_on_rotation(tmp_path):
+    path = tmp_path / 'firewall.csv'
+    path.write_bytes(b'')
+
+    async def run():
+        queue = asyncio.Queue()
+        tailer = asyncio.create_task(tail_file(str(path), queue, poll_interval=0.2))
+        await asyncio.sleep(0.05)
+        with open(path, 'ab') as f:
+            f.write(b'a\n')
+        assert (await asyncio.wait_for(queue.get(), 2))[0] == b'a\n'
+        # Between the tailer's EOF read and its next check: a last write to
+        # the old file, then logrotate moves it and creates a new one
+        with open(path, 'ab') as f:
+            f.write(b'b\nc')
+        os.rename(path, tmp_path / 'firewall.csv.1')
+        path.write_bytes(b'd\n')
+        lines = [(await asyncio.wait_for(queue.get(), 2))[0] for _ in range(3)]
+        tailer.cancel()
+        return lines
+
+    assert asyncio.run(run()) == [b'b\n', b'c\n', b'd\n']
@@ -0,0 +1,42 @@
+import pandas as pd
+import pytest
+
+from conftest import rows
+from log_cache import build_cache, load_logs
+from threat_detection import ThreatDetector, threat_table
+
+def detections(logs, sliding=False):
+    return rows(threat_table(ThreatDetector(sliding=sliding).detect(logs)))
+
+@pytest.mark.parametrize('sliding', [False, True])
+def test_cache_matches_csv(log_csv, logs, tmp_path, sliding):
+    cached, hit = load_logs(log_csv, cache_dir=tmp_path, chunksize=7_919)
+    assert not hit
+    assert detections(cached, sliding) == detections(logs, sliding)
+    assert load_logs(log_csv, cache_dir=tmp_path)[1]
+
+def test_missing_ports_stay_missing(tmp_path):
+    # Without a port there is no port scan; a cached run must not invent port 0
+    path = tmp_path / 'no_ports.csv'
+    times = pd.date_range('2025-11-28 09:00:00', periods=12, freq='s')
+    pd.DataFrame({'timestamp': times, 'src_ip': '1.1.1.1', 'dst_ip': '192.168.1.1', 'port': None,
+                  'action': 'DENY', 'reason': 'PORT_SCAN'}).to_csv(path, index=False)
+    cached, _ = load_logs(path, cache_dir=tmp_path / 'cache')
+    assert cached['port'].isna().all()
+    assert detections(cached) == detections(pd.read_csv(path, parse_dates=['timestamp']))
+
+def test_large_ports_are_kept(tmp_path):
+    path = tmp_path / 'large_ports.csv'
+    times = pd.date_range('2025-11-28 09:00:00', periods=12, freq='s')
+    pd.DataFrame({'timestamp': times, 'src_ip': '1.1.1.1', 'dst_ip': '192.168.1.1', 'port': 65536 + 22,
+                  'action': 'DENY', 'reason': 'PORT_SCAN'}).to_csv(path, index=False)
+    cached, _ = load_logs(path, cache_dir=tmp_path / 'cache')
+    assert detections(cached) == detections(pd.read_csv(path, parse_dates=['timestamp']))
+    assert detections(cached)[0][2] == str(65536 + 22)
+
+def test_fractional_ports_are_rejected(tmp_path):
+    path = tmp_path / 'bad_ports.csv'
+    path.write_text("timestamp,src_ip,dst_ip,port,action,reason\n"
+                    "2025-11-28 09:00:00,1.1.1.1,192.168.1.1,22.5,DENY,PORT_SCAN\n")
+    with pytest.raises(ValueError):
+        build_cache(path, cache_dir=tmp_path / 'cache')
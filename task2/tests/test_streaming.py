@@ -0,0 +1,44 @@
+import asyncio
+import io
+import json
+
+import pandas as pd
+import pytest
+
+from conftest import rows
+from live_follow import FollowStats, analyse
+from threat_detection import StreamingDetector, ThreatDetector, threat_table
+
+@pytest.fixture(scope='module')
+def batch_sliding(logs):
+    return rows(threat_table(ThreatDetector(sliding=True).detect(logs)))
+
+@pytest.mark.parametrize('chunksize', [1_000, 7_919, 50_000])
+def test_streaming_detector_matches_batch_sliding(logs, batch_sliding, chunksize):
+    detector = StreamingDetector()
+    for begin in range(0, len(logs), chunksize):
+        detector.update(logs.iloc[begin:begin + chunksize])
+        # As follow mode does after every batch
+        detector.evict(detector.last_ts)
+    assert not detector.out_of_order
+    assert rows(threat_table(detector.finish())) == batch_sliding
+
+def follow_episodes(log_csv, batch_size):
+    """episode_end records of follow mode fed the log's lines in batches of `batch_size`."""
+    async def run():
+        queue = asyncio.Queue()
+        with open(log_csv, 'rb') as f:
+            for line in f:
+                queue.put_nowait((line, 0.0))
+        queue.put_nowait(None)
+        out = io.StringIO()
+        await analyse(queue, StreamingDetector(), FollowStats(), out, batch_size, linger=0)
+        return [json.loads(line) for line in out.getvalue().splitlines()]
+    records = [r for r in asyncio.run(run()) if r['event'] == 'episode_end']
+    return sorted((r['type'], r['ip'], 'N/A' if r['port'] is None else str(r['port']), r['count'],
+                   pd.Timestamp(r['window_start'])) for r in records)
+
+@pytest.mark.parametrize('batch_size', [100, 997, 5_000])
+def test_follow_episodes_match_batch_sliding(log_csv, batch_sliding, batch_size):
+    # Eviction between batches must not split an episode the batch detector keeps whole
+    assert follow_episodes(log_csv, batch_size) == batch_sliding
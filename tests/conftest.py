@@ -0,0 +1,25 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from kdd_features import CATEGORICAL_COLUMNS, COLUMNS, NUMERIC_COLUMNS, VOCABULARIES
+
+@pytest.fixture(scope='session')
+def kdd_file(tmp_path_factory):
+    """A 5000-row kddcup.data-format file whose attacks (SYN floods) are learnable from flag and count."""
+    rng = np.random.default_rng(0)
+    n = 5_000
+    attack = rng.random(n) < 0.4
+    records = pd.DataFrame({col: rng.random(n).round(2) for col in NUMERIC_COLUMNS})
+    records['count'] = np.where(attack, rng.integers(100, 511, n), rng.integers(1, 20, n))
+    for col in CATEGORICAL_COLUMNS:
+        records[col] = rng.choice(VOCABULARIES[col], n)
+    records['flag'] = np.where(attack, 'S0', 'SF')
+    records['label'] = np.where(attack, 'neptune.', 'normal.')
+    path = tmp_path_factory.mktemp('kdd') / 'kddcup.data'
+    records[COLUMNS + ['label']].to_csv(path, header=False, index=False)
+    return path
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+from kdd_features import binary_labels, encode_features, encode_sparse, read_kdd
+from kdd_model import load_model, save_model
+
+@pytest.fixture(scope='module')
+def records(kdd_file):
+    records = read_kdd(kdd_file)
+    # Values outside the vocabularies encode as all-zero one-hot blocks
+    records['service'] = records['service'].cat.add_categories(['not_a_service'])
+    records.loc[:9, 'service'] = 'not_a_service'
+    return records
+
+@pytest.fixture(scope='module')
+def fitted(records):
+    scaler = StandardScaler(with_mean=False).fit(encode_sparse(records))
+    model = LogisticRegression(max_iter=1000).fit(scaler.transform(encode_sparse(records)),
+                                                  binary_labels(records['label']))
+    return scaler, model
+
+@pytest.fixture(scope='module')
+def loaded(fitted, tmp_path_factory):
+    path = tmp_path_factory.mktemp('model') / 'model.npz'
+    save_model(str(path), *fitted)
+    return load_model(str(path))
+
+def test_sparse_encoding_matches_dense(records):
+    X = encode_sparse(records)
+    assert X.dtype == np.float32
+    np.testing.assert_array_equal(X.toarray(), encode_features(records).astype(np.float32))
+
+def test_loaded_model_matches_sklearn(records, fitted, loaded):
+    scaler, model = fitted
+    X = encode_features(records)
+    expected = model.predict_proba(scaler.transform(X))[:, 1]
+    np.testing.assert_allclose(loaded.predict_proba(X), expected, rtol=0, atol=1e-9)
+    np.testing.assert_array_equal(loaded.predict(X), model.predict(scaler.transform(X)))
+
+def test_score_records_matches_encoded_scoring(records, loaded):
+    # The fused path sums the same terms in a different order, so it agrees
+    # with the encoded matrix only to rounding
+    expected = loaded.predict_proba(loaded.encode(records))
+    np.testing.assert_allclose(loaded.score_records(records), expected, rtol=0, atol=1e-6)
@@ -0,0 +1,50 @@
+import json
+
+import numpy as np
+import pytest
+
+import train_incremental
+
+ARGS = ['--chunksize', '500', '--epochs', '2', '--checkpoint-every', '2']
+
+def artifact(path):
+    with np.load(path, allow_pickle=False) as f:
+        arrays = {name: f[name] for name in ('mean', 'scale', 'coef', 'intercept')}
+        return arrays, json.loads(str(f['meta']))['metrics']
+
+@pytest.fixture(scope='module')
+def uninterrupted(kdd_file, tmp_path_factory):
+    model = tmp_path_factory.mktemp('full') / 'model.npz'
+    train_incremental.main([str(kdd_file), '--model', str(model)] + ARGS)
+    return artifact(model)
+
+# 10 chunks per epoch, checkpoints after every second one: stop between
+# checkpoints in the first epoch, and in the second
+@pytest.mark.parametrize('fail_at_chunk, resumed_at', [(5, 'epoch 1, row 2,000'), (13, 'epoch 2, row 1,000')])
+def test_resumed_training_matches_uninterrupted(kdd_file, tmp_path, monkeypatch, capsys, uninterrupted, fail_at_chunk,
+                                                 resumed_at):
+    model = tmp_path / 'model.npz'
+    calls = []
+    train_chunk = train_incremental.train_chunk
+
+    def interrupted(*args):
+        calls.append(1)
+        if len(calls) == fail_at_chunk:
+            raise KeyboardInterrupt
+        train_chunk(*args)
+
+    monkeypatch.setattr(train_incremental, 'train_chunk', interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        train_incremental.main([str(kdd_file), '--model', str(model)] + ARGS)
+    monkeypatch.setattr(train_incremental, 'train_chunk', train_chunk)
+    capsys.readouterr()
+    train_incremental.main([str(kdd_file), '--model', str(model), '--resume'] + ARGS)
+    # Picked up at the last checkpoint rather than starting over
+    assert resumed_at in capsys.readouterr().out.splitlines()[0]
+
+    arrays, metrics = artifact(model)
+    expected_arrays, expected_metrics = uninterrupted
+    for name, values in expected_arrays.items():
+        np.testing.assert_array_equal(arrays[name], values, err_msg=name)
+    assert metrics == expected_metrics
+    assert metrics['accuracy'] > 0.9